@@ -8,6 +8,22 @@ class Config(BaseSettings):
     PROXY: str = None
     DEBUG: bool
     MAX_WORKERS: int
+    PROXY_COOLDOWN: float = 5
+    REQUEST_DEADLINE: float = 120
+    CACHE_TTL: int = 86400
+    TOKEN_REFRESH_MARGIN: int = 300
+    ACCOUNT_COOLDOWN: int = 600
+    CATEGORY_WORKERS: int = 4
+    HOST_LIMIT: int = 40
+    INCREMENTAL: bool = False
+    PROCESS_WORKERS: int = 1
+    OLX_BASE_URL: str = 'https://www.olx.ua'
+    DISTRIBUTED: bool = False
+    COORDINATOR: str = '127.0.0.1:8780'
+    LEASE_TTL: int = 60
+    PHONE_WORKERS: int = 20
+    PHONE_ATTEMPTS: int = 4
+    PHONE_RETRY_DELAY: float = 15
 
     model_config = SettingsConfigDict(env_file=os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), '.env'))
 
@@ -1,10 +1,11 @@
+import asyncio
 import os
 import sys
 import time
 
 from Src.app.colors import *
 from Src.app.logging_config import logger
-from Src.parser.authorization import get_session_id_pw
+from Src.parser.authorization import get_session_id
 from Src.parser.credentials import get_auth_code, get_access_token, get_token
 from Src.parser.utils import create_banner
 
@@ -168,11 +169,12 @@ def choose_parsed_city():
         ]
 
 
-def authorize():
-    sid = get_session_id()
+async def authorize():
+    # Вход через undetected_chromedriver синхронный (ожидание входа - `time.sleep`), поэтому идет в отдельном потоке
+    sid = await asyncio.to_thread(get_session_id)
     if sid:
-        auth_code = get_auth_code(login_sid=sid)
-        get_access_token(auth_code)
+        auth_code = await get_auth_code(login_sid=sid)
+        await get_access_token(auth_code)
         print("✔️  Вы успешно вошли в аккаунт")
 
     else:
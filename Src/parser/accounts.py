@@ -0,0 +1,149 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from Src.app.colors import *
+from Src.app.config import app_config
+from Src.app.logging_config import logger
+from Src.parser.credentials import TokenManager, get_token_manager
+from Src.parser.proxies import proxy_pool
+
+
+@dataclass
+class Account:
+    """Аккаунт OLX (профиль браузера) со своим токеном, подмножеством прокси и статистикой"""
+    user: str
+    tokens: TokenManager
+    proxies: list[str] = field(default_factory=list)
+    requests: int = 0
+    phones: int = 0
+    captchas: int = 0
+    disallowed: int = 0
+    in_flight: int = 0
+    retirements: int = 0
+    cooldown_until: float = 0.0
+    recent: deque = field(default_factory=deque)
+
+    @property
+    def captcha_rate(self) -> float:
+        return sum(self.recent) / len(self.recent) if self.recent else 0.0
+
+    def is_available(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+
+class AccountPool:
+    """
+    Пул аккаунтов для получения номеров телефонов.
+
+    Аккаунты - папки профилей в `chrome/profiles/*` (если папок нет, то используется один профиль `guest`).
+    У каждого аккаунта свой токен (`TokenManager`) и свое подмножество прокси из `proxy_pool`.
+    Запрос получает наименее загруженный доступный аккаунт. Если среди последних `window` ответов аккаунта
+    доля капчи и "Disallowed for this user" достигла `threshold`, то аккаунт уходит на паузу
+    (`ACCOUNT_COOLDOWN` секунд, удваивается при каждом повторе).
+
+    :param users: Список профилей (по умолчанию папки из `chrome/profiles`).
+    :param window: Количество последних ответов для расчета доли капчи.
+    :param threshold: Доля капчи, при которой аккаунт уходит на паузу.
+    :param cooldown: Пауза в секундах (по умолчанию `ACCOUNT_COOLDOWN`).
+    :param max_cooldown: Максимальная пауза в секундах.
+    """
+
+    def __init__(self, users: list[str] = None, window: int = 20, threshold: float = 0.5, cooldown: float = None, max_cooldown: float = 3600):
+        self._users = users
+        self.window = window
+        self.threshold = threshold
+        self.cooldown = cooldown or app_config.ACCOUNT_COOLDOWN
+        self.max_cooldown = max_cooldown
+        self._accounts: dict[str, Account] | None = None
+
+    @staticmethod
+    def _profiles() -> list[str]:
+        profiles_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'chrome', 'profiles')
+        if not os.path.isdir(profiles_dir):
+            return []
+        return sorted(name for name in os.listdir(profiles_dir) if os.path.isdir(os.path.join(profiles_dir, name)))
+
+    @property
+    def accounts(self) -> dict[str, Account]:
+        if self._accounts is None:
+            users = self._users or self._profiles() or ['guest']
+            proxies = list(proxy_pool.states) if app_config.USE_PROXY else []
+
+            self._accounts = {}
+            for n, user in enumerate(users):
+                # Прокси делятся между аккаунтами поровну, если прокси меньше, чем аккаунтов, то они общие
+                subset = proxies[n::len(users)] or ([proxies[n % len(proxies)]] if proxies else [])
+                self._accounts[user] = Account(user=user, tokens=get_token_manager(user), proxies=subset, recent=deque(maxlen=self.window))
+
+            logger.debug(f"👤  Аккаунтов: {len(users)} · {', '.join(users)}")
+        return self._accounts
+
+    def pick(self, exclude: set[str] = None) -> Account:
+        """
+        Возвращает наименее загруженный доступный аккаунт.
+        Если все аккаунты на паузе, то возвращается тот, у которого пауза закончится раньше всех.
+
+        :param exclude: Аккаунты, которые не нужно выбирать (если есть другие доступные).
+        """
+        accounts = list(self.accounts.values())
+
+        now = time.monotonic()
+        available = [a for a in accounts if a.is_available(now)]
+        if not available:
+            return min(accounts, key=lambda a: a.cooldown_until)
+
+        available = [a for a in available if not exclude or a.user not in exclude] or available
+        return min(available, key=lambda a: (a.in_flight, a.captcha_rate, a.requests))
+
+    @asynccontextmanager
+    async def lease(self, exclude: set[str] = None):
+        """Занимает аккаунт на время запроса. Если все аккаунты на паузе, то ждет окончания паузы"""
+        account = self.pick(exclude)
+        wait = account.cooldown_until - time.monotonic()
+        if wait > 0:
+            logger.debug(f"👤  Все аккаунты на паузе · Ожидание {wait:.0f}c")
+            await asyncio.sleep(wait)
+
+        account.in_flight += 1
+        try:
+            yield account
+        finally:
+            account.in_flight -= 1
+
+    def outcome(self, account: Account, result: str) -> None:
+        """
+        Учитывает результат запроса номера
+
+        :param account: Аккаунт.
+        :param result: ok - номер получен, captcha - капча, disallowed - "Disallowed for this user", error - другая ошибка.
+        """
+        account.requests += 1
+        if result == 'ok':
+            account.phones += 1
+        elif result == 'captcha':
+            account.captchas += 1
+        elif result == 'disallowed':
+            account.disallowed += 1
+
+        account.recent.append(result in ('captcha', 'disallowed'))
+        if len(account.recent) == account.recent.maxlen and account.captcha_rate >= self.threshold:
+            self._retire(account)
+
+    def _retire(self, account: Account) -> None:
+        pause = min(self.cooldown * 2 ** account.retirements, self.max_cooldown)
+        account.retirements += 1
+        account.cooldown_until = time.monotonic() + pause
+        logger.warning(f"👤  Аккаунт {account.user} на паузе {pause / 60:.0f} мин. · Капча: {account.captcha_rate:.0%}")
+        account.recent.clear()
+
+    def report(self) -> None:
+        for account in (self._accounts or {}).values():
+            logger.info(f"👤  {account.user.ljust(14)} · Номеров: {LIGHT_GREEN}{account.phones}{WHITE} / {account.requests} · "
+                        f"Капча: {account.captchas} · Disallowed: {account.disallowed} · Пауз: {account.retirements}")
+
+
+account_pool = AccountPool()
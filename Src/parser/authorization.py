@@ -3,7 +3,7 @@ import os
 import time
 
 import undetected_chromedriver as uc
-from playwright.async_api import async_playwright
+from playwright.async_api import BrowserContext, TimeoutError as PlaywrightTimeoutError, async_playwright
 
 from Src.app.colors import *
 from Src.app.logging_config import logger
@@ -103,79 +103,190 @@ def get_session_id(user_dir='guest') -> str | None:
             driver.close()
 
 
-async def get_session_id_pw(user_dir: str = "guest") -> str | None:
+class BrowserPool:
+    """
+    Пул "теплых" контекстов Playwright для получения SID.
+
+    Браузер запускается один раз и живет до завершения работы, для каждого профиля открывается один
+    постоянный контекст (`launch_persistent_context`). Вход определяется по условию (появилась кука `SID`
+    и страница не является страницей входа), а не по фиксированным паузам.
+    `prefetch` получает свежий SID в фоне заранее, до того как истечет refresh token.
+
+    :param login_timeout: Сколько секунд ждать ручного входа в новом профиле.
+    :param check_timeout: Сколько секунд ждать SID в уже авторизованном профиле.
+    """
+    settings_url = "https://www.olx.ua/uk/myaccount/settings"
+    user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0.0.0 Safari/537.36"
+
+    def __init__(self, login_timeout: float = 120, check_timeout: float = 20):
+        self.login_timeout = login_timeout
+        self.check_timeout = check_timeout
+        self._playwright = None
+        self._contexts: dict[str, BrowserContext] = {}
+        self._headless: dict[str, bool] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._prefetch_tasks: dict[str, asyncio.Task] = {}
+
+    @staticmethod
+    def profile_dir(user: str) -> str:
+        return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "chrome", "profiles", user)
+
+    @staticmethod
+    def auth_file(user: str) -> str:
+        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+        return os.path.join(data_dir, "common", "authorize.json" if user == "guest" else f"authorize_{user}.json")
+
+    def _lock(self, user: str) -> asyncio.Lock:
+        if user not in self._locks:
+            self._locks[user] = asyncio.Lock()
+        return self._locks[user]
+
+    async def _context(self, user: str, headless: bool) -> BrowserContext:
+        """Возвращает открытый контекст профиля или запускает новый (видимый контекст нужен для ручного входа)"""
+        context = self._contexts.get(user)
+        if context is not None and (self._headless[user] or not headless):
+            return context
+        if context is not None:
+            await context.close()
+
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+
+        user_data_dir = self.profile_dir(user)
+        context = await self._playwright.chromium.launch_persistent_context(
+            user_data_dir=user_data_dir,
+            headless=headless,
+            args=["--disable-blink-features=AutomationControlled"],
+            user_agent=self.user_agent,
+        )
+        context.on("close", lambda _: self._contexts.pop(user, None))
+        self._contexts[user] = context
+        self._headless[user] = headless
+
+        logger.info(f"⚙️  [{DARK_GRAY}Profile: {BOLD}{user_data_dir}{RESET}{WHITE}]")
+        logger.info(f"⚙️  [{DARK_GRAY}Chrome:  {BOLD}{self._playwright.chromium.executable_path}{RESET}{WHITE}]")
+        logger.info(f"⚙️  [{DARK_GRAY}Version: {BOLD}{context.browser.version if context.browser else '—'}{RESET}{WHITE}]")
+        return context
+
+    @staticmethod
+    async def _find_sid(context: BrowserContext) -> str | None:
+        cookies = await context.cookies()
+        return next((cookie["value"] for cookie in cookies if cookie["name"] == "SID" and "login.olx.ua" in cookie["domain"]), None)
+
+    async def _wait_for_login(self, context: BrowserContext, page, timeout: float) -> str | None:
+        """
+        Ждет входа в аккаунт: кука `SID` есть и открыта не страница входа.
+        Проверка повторяется после каждой навигации страницы (или раз в секунду), но не дольше `timeout`
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while True:
+            title = await page.title()
+            if "satisfied" in title.lower():
+                print("❌  Сработала блокировка CloudFront. Попробуйте позже")
+                return None
+
+            session_id = await self._find_sid(context)
+            if session_id and "Увійти" not in title:
+                print(f"✔️  {title}")
+                return session_id
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                print("❌  Не удалось получить токен · Возможно сработала капча или вы не успели войти")
+                return None
+
+            try:
+                await page.wait_for_event("framenavigated", timeout=min(remaining, 1) * 1000)
+            except PlaywrightTimeoutError:
+                pass
+
+    async def session_id(self, user: str = "guest", headless: bool = True) -> str | None:
+        """
+        Получает SID профиля в теплом контексте и сохраняет его в файл авторизации
+
+        :param user: Название профиля.
+        :param headless: Без окна браузера. Для первого входа в новый профиль нужен видимый браузер.
+        """
+        async with self._lock(user):
+            context = await self._context(user, headless)
+            page = await context.new_page()
+            try:
+                await page.goto(self.settings_url, wait_until="domcontentloaded")
+                session_id = await self._wait_for_login(context, page, self.check_timeout if headless else self.login_timeout)
+            finally:
+                await page.close()
+
+        if session_id:
+            save_json({"login_sid": session_id, "timestamp": int(time.time())}, self.auth_file(user))
+            print(f"\n✔️  SID получен · {session_id}")
+        return session_id
+
+    def prefetch(self, user: str = "guest") -> asyncio.Task | None:
+        """Получает свежий SID в фоне (только для уже авторизованных профилей). Возвращает задачу, которую можно дождаться"""
+        if not (os.path.exists(self.profile_dir(user)) and os.path.exists(self.auth_file(user))):
+            return None
+
+        task = self._prefetch_tasks.get(user)
+        if task is None or task.done():
+            task = asyncio.get_running_loop().create_task(self._prefetch(user))
+            self._prefetch_tasks[user] = task
+        return task
+
+    async def _prefetch(self, user: str) -> None:
+        try:
+            await self.session_id(user, headless=True)
+        except Exception as e:
+            logger.error(f"⚠️  Не удалось заранее получить SID · {user} · {e}")
+
+    async def close(self) -> None:
+        """Закрывает все контексты и браузер"""
+        for task in self._prefetch_tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._prefetch_tasks.values(), return_exceptions=True)
+        self._prefetch_tasks.clear()
+
+        for context in list(self._contexts.values()):
+            await context.close()
+        self._contexts.clear()
+
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+browser_pool = BrowserPool()
+
+
+async def get_session_id_pw(user_dir: str = "guest", max_age: float = None) -> str | None:
     """
     Получает ID сессии аккаунта OLX после входа или возвращает уже существующий,
-    используя указанный профиль браузера (Playwright sync).
+    используя указанный профиль браузера (теплый контекст Playwright из `browser_pool`).
 
     :param user_dir: Имя директории с пользовательским профилем Chrome (по умолчанию 'guest').
+    :param max_age: Сохраненный SID используется, только если он получен не раньше, чем `max_age` секунд назад.
     """
     base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-    data_dir = os.path.join(base_dir, "data")
-    os.makedirs(data_dir, exist_ok=True)
+    os.makedirs(os.path.join(base_dir, "data"), exist_ok=True)
 
-    auth_file = os.path.join(data_dir, "common", "authorize.json")
-
-    chrome_dir = os.path.join(os.path.dirname(data_dir), "chrome")
-    user_data_dir = os.path.join(chrome_dir, "profiles", user_dir)
-    user_dir_existed = os.path.exists(user_data_dir)
+    auth_file = browser_pool.auth_file(user_dir)
+    user_dir_existed = os.path.exists(browser_pool.profile_dir(user_dir))
     headless = True if os.path.exists(auth_file) and user_dir_existed else False
 
     if not user_dir_existed:
         print(f"‼️  {LIGHT_YELLOW}Файл {WHITE}`authorize.json`{LIGHT_YELLOW} не найден{WHITE} · Получаем новый Идентификатор сессии")
         if os.path.exists(auth_file):
             os.remove(auth_file)
-        await asyncio.sleep(5)
 
     if os.path.exists(auth_file):
-        session_id = open_json(auth_file).get("login_sid")
-        if session_id:
+        auth = open_json(auth_file)
+        session_id = auth.get("login_sid")
+        if session_id and (max_age is None or time.time() - (auth.get("timestamp") or 0) <= max_age):
             print(f"✔️  Текущий SID · {session_id}")
             return session_id
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch_persistent_context(
-            user_data_dir=user_data_dir,
-            headless=headless,
-            args=["--disable-blink-features=AutomationControlled"],
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/116.0.0.0 Safari/537.36",
-        )
-
-        logger.info(f"⚙️  [{DARK_GRAY}Profile: {BOLD}{user_data_dir}{RESET}{WHITE}]")
-        logger.info(f"⚙️  [{DARK_GRAY}Chrome:  {BOLD}{p.chromium.executable_path}{RESET}{WHITE}]")
-        logger.info(f"⚙️  [{DARK_GRAY}Version: {BOLD}{browser.browser.version}{RESET}{WHITE}]")
-        await asyncio.sleep(3)
-
-        page = await browser.new_page()
-        await page.goto("https://www.olx.ua/uk/myaccount/settings")
-
-        if not user_dir_existed:
-            await asyncio.sleep(60)
-
-        if not os.path.exists(auth_file):
-            await asyncio.sleep(30)
-
-        title = await page.title()
-        if "Увійти" in title:
-            print("❌  Не удалось получить токен · Возможно сработала капча или вы не успели войти")
-            await browser.close()
-            return None
-        elif "satisfied" in title.lower():
-            print("❌  Сработала блокировка CloudFront. Попробуйте позже")
-            await browser.close()
-            return None
-        else:
-            print(f"✔️  {title}")
-
-        cookies = await browser.cookies()
-        session_id = next((cookie["value"] for cookie in cookies if cookie["name"] == "SID" and "login.olx.ua" in cookie["domain"]), None)
-
-        if session_id:
-            save_json({"login_sid": session_id}, auth_file)
-            print(f"\n✔️  SID получен · {session_id}")
-            await browser.close()
-            return session_id
-        else:
-            print("❌  Не удалось получить идентификатор сессии")
-            await browser.close()
-            return None
+    session_id = await browser_pool.session_id(user_dir, headless=headless)
+    if not session_id:
+        print("❌  Не удалось получить идентификатор сессии")
+    return session_id
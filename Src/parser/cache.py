@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import time
+
+from Src.app.colors import *
+from Src.app.logging_config import logger
+from Src.parser.jsonlib import loads
+from Src.parser.utils import normalize_url, save_json
+
+
+class ResponseCache:
+    """
+    Кеш ответов API на диске с ограниченным временем жизни (TTL).
+
+    Используется для справочных данных, которые почти не меняются: регионы, города, категории, targeting.
+    Ключ - нормализованный URL (с отсортированными параметрами) и тело POST запроса.
+    Если запись устарела, но сервер вернул `ETag` или `Last-Modified`, то запрос повторяется с условными
+    заголовками и при ответе 304 запись продлевается без повторной загрузки.
+
+    :param cache_dir: Папка кеша (по умолчанию `data/common/http_cache`).
+    """
+
+    def __init__(self, cache_dir: str = None):
+        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data')
+        self.cache_dir = cache_dir or os.path.join(data_dir, 'common', 'http_cache')
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0}
+
+    @staticmethod
+    def key(url: str, payload: dict = None) -> str:
+        raw = normalize_url(url)
+        if payload:
+            raw += json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def get(self, key: str) -> dict | None:
+        """Возвращает запись кеша (свежую или устаревшую) или None"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, 'rb') as file:
+                return loads(file.read())
+        except (OSError, ValueError) as e:
+            logger.debug(f"🗃  Повреждена запись кеша `{path}` · {e}")
+            return None
+
+    def is_fresh(self, entry: dict) -> bool:
+        fresh = time.time() < entry.get('stored', 0) + entry.get('ttl', 0)
+        if fresh:
+            self.stats['hits'] += 1
+        return fresh
+
+    @staticmethod
+    def validators(entry: dict) -> dict:
+        """Заголовки для условного запроса (если сервер их поддерживает)"""
+        headers = {}
+        if entry.get('etag'):
+            headers['if-none-match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['if-modified-since'] = entry['last_modified']
+        return headers
+
+    def put(self, key: str, url: str, body: dict | list, headers: dict, ttl: int) -> None:
+        """Сохраняет загруженный ответ (считается промахом кеша)"""
+        self.stats['misses'] += 1
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = dict(
+            url=url,
+            stored=time.time(),
+            ttl=ttl,
+            etag=headers.get('etag'),
+            last_modified=headers.get('last-modified'),
+            body=body,
+        )
+        save_json(entry, self._path(key))
+
+    def revalidated(self, key: str, entry: dict, ttl: int) -> dict | list:
+        """Продлевает запись после ответа 304 и возвращает сохраненное тело"""
+        self.stats['revalidated'] += 1
+        entry.update(stored=time.time(), ttl=ttl)
+        save_json(entry, self._path(key))
+        return entry['body']
+
+    def report(self) -> None:
+        logger.info(f"🗃  Кеш · Попаданий: {LIGHT_GREEN}{self.stats['hits']}{WHITE} · Подтверждено (304): {self.stats['revalidated']} · Промахов: {self.stats['misses']}")
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,196 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+from Src.app.colors import *
+from Src.app.config import app_config
+from Src.app.logging_config import logger
+
+
+class AdaptiveLimiter:
+    """
+    Ограничитель количества одновременных запросов с адаптивным лимитом (AIMD).
+
+    Пока запросы проходят успешно и задержка не растет, лимит увеличивается примерно на 1 за каждое "окно" запросов.
+    При признаках перегрузки (429, блокировка CloudFront, капча, таймаут) лимит уменьшается в `decrease` раз,
+    но не чаще одного раза за `cooldown` секунд, чтобы пачка ответов из одного окна не обнуляла лимит.
+
+    :param name: Название группы эндпоинтов (для логов).
+    :param initial: Начальный лимит.
+    :param minimum: Минимальный лимит.
+    :param maximum: Максимальный лимит.
+    :param decrease: Множитель уменьшения лимита.
+    :param tolerance: Во сколько раз задержка может превышать лучшую наблюдаемую, чтобы лимит еще рос.
+    :param cooldown: Минимальный интервал между уменьшениями лимита в секундах.
+    """
+
+    def __init__(self, name: str, initial: int, minimum: int = 1, maximum: int = None, decrease: float = 0.5, tolerance: float = 2.0, cooldown: float = 2.0, alpha: float = 0.2):
+        self.name = name
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum or initial * 4
+        self.decrease = decrease
+        self.tolerance = tolerance
+        self.cooldown = cooldown
+        self.alpha = alpha
+
+        self.in_flight = 0
+        self.latency: float | None = None
+        self.best_latency: float | None = None
+        self.cuts = 0
+        self.peak = self.limit
+        self._last_cut = 0.0
+        self._condition: asyncio.Condition | None = None
+
+    @property
+    def _cond(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.release()
+
+    def on_success(self, latency: float) -> None:
+        """Успешный ответ: лимит растет, если задержка в пределах нормы"""
+        self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+        self.best_latency = self.latency if self.best_latency is None else min(self.best_latency, self.latency)
+
+        if self.latency <= max(self.best_latency * self.tolerance, self.best_latency + 0.25):
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.peak = max(self.peak, self.limit)
+
+    def on_congestion(self, reason: str = '') -> None:
+        """Признак перегрузки: лимит уменьшается"""
+        now = time.monotonic()
+        if now - self._last_cut < self.cooldown:
+            return
+
+        self._last_cut = now
+        self.cuts += 1
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        logger.debug(f"🚦  {self.name} · Лимит снижен до {int(self.limit)} · {reason}")
+
+
+class Limiters:
+    """Адаптивные ограничители по группам эндпоинтов: listing, metadata, phones, graphql"""
+    families = {
+        'listing': 'listing',
+        'html': 'listing',
+        'phones': 'phones',
+        'graphql': 'graphql',
+    }
+
+    def __init__(self, initial: int = None):
+        self._initial = initial or app_config.MAX_WORKERS
+        self._limiters: dict[str, AdaptiveLimiter] = {}
+
+    def get(self, endpoint: str) -> AdaptiveLimiter:
+        """Возвращает ограничитель для эндпоинта (см. `utils.endpoint_of`). Все остальные эндпоинты относятся к metadata"""
+        family = self.families.get(endpoint, 'metadata')
+        limiter = self._limiters.get(family)
+        if limiter is None:
+            limiter = AdaptiveLimiter(family, self._initial)
+            self._limiters[family] = limiter
+        return limiter
+
+    def report(self) -> None:
+        for limiter in self._limiters.values():
+            logger.info(f"🚦  {limiter.name.ljust(14)} · Лимит: {LIGHT_CYAN}{int(limiter.limit)}{WHITE} · Максимум: {int(limiter.peak)} · Снижений: {limiter.cuts}")
+
+
+class HostLimits:
+    """
+    Ограничение количества одновременных запросов к одному хосту (`HOST_LIMIT`), общее для всех групп эндпоинтов
+
+    :param limit: Максимум запросов к одному хосту.
+    """
+
+    def __init__(self, limit: int = None):
+        self.limit = limit or app_config.HOST_LIMIT
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def get(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.limit)
+            self._semaphores[host] = semaphore
+        return semaphore
+
+
+class LoopLagProbe:
+    """
+    Измеряет задержку event loop (насколько позже срабатывает `asyncio.sleep`) на время выполнения операций.
+
+    Пока открыт хотя бы один `track`, в фоне работает задача, которая каждые `interval` секунд засыпает
+    и сравнивает фактическое время пробуждения с ожидаемым. Максимальная задержка запоминается для каждого названия.
+
+    :param interval: Интервал проверки в секундах.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.max_lag: dict[str, float] = {}
+        self._active: dict[str, int] = {}
+        self._wake_at: float | None = None
+        self._task: asyncio.Task | None = None
+
+    def _record(self, names, lag: float) -> None:
+        for name in names:
+            self.max_lag[name] = max(self.max_lag[name], lag)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._active:
+            names = set(self._active)
+            self._wake_at = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            # Задержка относится только к операциям, которые уже выполнялись до начала проверки
+            self._record(names & set(self._active), max(0.0, loop.time() - self._wake_at))
+        self._wake_at = None
+
+    @asynccontextmanager
+    async def track(self, name: str):
+        """Учитывает задержку event loop, пока выполняется блок, под названием `name`"""
+        loop = asyncio.get_running_loop()
+        entered = loop.time()
+        self._active[name] = self._active.get(name, 0) + 1
+        self.max_lag.setdefault(name, 0.0)
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+        try:
+            yield
+        finally:
+            # Задержку, которая еще не дошла до проверки, учитываем сразу
+            if self._wake_at is not None:
+                self._record([name], max(0.0, loop.time() - max(self._wake_at, entered)))
+
+            self._active[name] -= 1
+            if not self._active[name]:
+                del self._active[name]
+
+    def report(self) -> None:
+        for name, lag in self.max_lag.items():
+            logger.debug(f"⏱  Максимальная задержка event loop · {name} · {lag * 1000:.0f} мс")
+
+
+limiters = Limiters()
+host_limits = HostLimits()
+loop_lag = LoopLagProbe()
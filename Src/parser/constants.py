@@ -3,5 +3,9 @@ from Src.parser.schemas import Limit, Offset
 lim = Limit(40)
 limit = lim.value
 
+# Максимальный размер страницы, который принимает API
+max_lim = Limit(50)
+max_limit = max_lim.value
+
 off = Offset(1000)
 offset = off.value
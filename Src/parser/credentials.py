@@ -1,18 +1,26 @@
 import asyncio
 import datetime
-import json
 import os
+from random import uniform
 
-from curl_cffi import requests
 from yarl import URL
 
 from Src.app.colors import *
+from Src.app.config import app_config
 from Src.app.logging_config import logger
-from Src.parser.authorization import get_session_id_pw
+from Src.parser.authorization import browser_pool, get_session_id_pw
+from Src.parser.concurrency import loop_lag
+from Src.parser.jsonlib import loads
+from Src.parser.session import session_pool
+from Src.parser.singleflight import token_flight
 from Src.parser.utils import save_json, open_json
 
 
-def save_token(token_data: dict, updated=None):
+data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data')
+default_creds_file = os.path.join(data_dir, 'common', 'credentials.json')
+
+
+def save_token(token_data: dict, updated=None, creds_file: str = None) -> dict:
     seconds = token_data.get('expires_in')
     minutes = seconds // 60
     expire_date = datetime.datetime.now() + datetime.timedelta(seconds=seconds)
@@ -25,16 +33,43 @@ def save_token(token_data: dict, updated=None):
         time=formatted_time,
         date=str(expire_date)
     ))
+    if token_data.get('refresh_expires_in'):
+        token_data['refresh_timestamp'] = int(datetime.datetime.now().timestamp()) + int(token_data['refresh_expires_in'])
 
     action = 'обновлен' if updated else 'получен'
     print(f"\n⌛️  {LIGHT_GREEN}Токен {action}{WHITE} · Истекает через {LIGHT_YELLOW}{minutes} мин{WHITE} в {LIGHT_MAGENTA}{formatted_time}{WHITE}")
 
-    data_dir = os.path.join(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data'))
-    creds_file = os.path.join(data_dir, 'common', 'credentials.json')
-    save_json(token_data, creds_file)
+    save_json(token_data, creds_file or default_creds_file)
+    return token_data
+
+
+async def _oauth_request(method: str, url: str, retries: int = 3, timeout: float = 15, **kwargs):
+    """
+    Запрос к `login.olx.ua` через общий пул асинхронных сессий (`session_pool`), не блокируя event loop.
+    Повторяется при сетевых ошибках и ответах 5xx, после последней попытки ошибка пробрасывается.
+
+    :param method: HTTP метод.
+    :param url: URL запроса.
+    :param retries: Количество попыток.
+    :param timeout: Таймаут одной попытки в секундах.
+    """
+    for attempt in range(1, retries + 1):
+        try:
+            response = await session_pool.get(url).request(method.upper(), url, timeout=timeout, **kwargs)
+            session_pool.record(response)
+            if response.status_code < 500 or attempt == retries:
+                return response
+            logger.debug(f"⚠️  [{attempt}/{retries}] Ошибка сервера авторизации · {response.status_code} · {url}")
+
+        except Exception as e:
+            if attempt == retries:
+                raise
+            logger.debug(f"⚠️  [{attempt}/{retries}] Не удалось выполнить запрос авторизации · {type(e).__name__}. {e}")
+
+        await asyncio.sleep(uniform(0.5, 2 ** attempt))
 
 
-def get_auth_code(login_sid: str) -> str | None:
+async def get_auth_code(login_sid: str) -> str | None:
     cookies = {'SID': login_sid}
     headers = {
         'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
@@ -66,7 +101,7 @@ def get_auth_code(login_sid: str) -> str | None:
     url = str(URL('https://login.olx.ua/oauth2/authorize').with_query(params))
 
     try:
-        response = requests.get(url, headers=headers, cookies=cookies, impersonate='chrome')
+        response = await _oauth_request('get', url, headers=headers, cookies=cookies)
         status = response.status_code
 
         if status == 200:
@@ -74,7 +109,7 @@ def get_auth_code(login_sid: str) -> str | None:
             if 'SID' in cookies:
                 logger.debug(f"ℹ️  Account status: {cookies}")
                 match = re.search(r'authorizationResponse = (.*?);', string=response.text)
-                authotization_code = json.loads(match.group(1)).get('response', {}).get('code')
+                authotization_code = loads(match.group(1)).get('response', {}).get('code')
 
                 if not authotization_code:
                     logger.error(f"⚠️  Не удалось найти код авторизации")
@@ -93,7 +128,7 @@ def get_auth_code(login_sid: str) -> str | None:
         logger.error(f"⚠️  Failed to get authorization code · {e}")
 
 
-def update_token(refresh_token: str) -> str | None:
+async def update_token(refresh_token: str, creds_file: str = None) -> str | None:
     headers = {
         'accept': '*/*',
         'accept-language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
@@ -121,12 +156,13 @@ def update_token(refresh_token: str) -> str | None:
     }
 
     try:
-        response = requests.post('https://login.olx.ua/oauth2/token', headers=headers, data=payload, impersonate='chrome')
+        url = 'https://login.olx.ua/oauth2/token'
+        response = await _oauth_request('post', url, headers=headers, data=payload)
         status = response.status_code
-        data = response.json()
+        data = loads(response.content)
 
         if status == 200:
-            save_token(data, updated=True)
+            save_token(data, updated=True, creds_file=creds_file)
             logger.debug("✅  Acces token updated by refresh token")
             return data.get('access_token')
         else:
@@ -137,7 +173,7 @@ def update_token(refresh_token: str) -> str | None:
         logger.error(f"❌  Failed to update token · {e}")
 
 
-def get_access_token(authorization_code: str) -> str | None:
+async def get_access_token(authorization_code: str, creds_file: str = None) -> str | None:
     headers = {
         'accept': '*/*',
         'accept-language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
@@ -166,12 +202,13 @@ def get_access_token(authorization_code: str) -> str | None:
     }
 
     try:
-        response = requests.post('https://login.olx.ua/oauth2/token', headers=headers, data=payload, impersonate='chrome')
+        url = 'https://login.olx.ua/oauth2/token'
+        response = await _oauth_request('post', url, headers=headers, data=payload)
         status = response.status_code
-        data = response.json()
+        data = loads(response.content)
 
         if status == 200:
-            save_token(data)
+            save_token(data, creds_file=creds_file)
             logger.debug("✅  Access token recieved")
             return data.get('access_token')
         else:
@@ -181,59 +218,180 @@ def get_access_token(authorization_code: str) -> str | None:
         logger.error(f"⚠️  Failed to get access token · {e}")
 
 
-async def get_token(user='guest', exp_time_only=None, show_info=True) -> str | None:
+class TokenManager:
     """
-    Получает токен доступа для OLX, используя указанный профиль браузера.
-
-    Если папка пользователя не найдена, то пытаемся получить SID через браузер и сохраняем в файл,
-    Зачем с ним получаем код авторизации и после этого с кодом получаем access_token и сохраняем в файл
+    Токен доступа профиля в памяти.
 
-    Если файл уже есть, то проверяем не истекло ли время действия, если истекло то обновляем через refresh_token
-    Если файла нет, то делаем повторно авторизацию для получения SID и кода доступа
+    Файл с токеном читается один раз, после этого `get` отдает токен из памяти без обращения к диску.
+    Фоновая задача обновляет токен за `margin` секунд до истечения, поэтому задачи не ждут обновления.
+    Если сервер отклонил токен (401, `invalid_token`), то `invalidate` запускает одно обновление на всех (`token_flight`).
+    Файл перезаписывается только при обновлении токена.
 
-    :return: Строка токена в формате "Bearer ..." или None, если получение не удалось.
+    :param user: Название профиля браузера (папка в `chrome/profiles`).
+    :param creds_file: Файл с токеном (по умолчанию `data/common/credentials.json`).
+    :param margin: За сколько секунд до истечения обновлять токен (по умолчанию `TOKEN_REFRESH_MARGIN`).
     """
-    data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data')
-    os.makedirs(data_dir, exist_ok=True)
-
-    creds_file = os.path.join(data_dir, 'common', 'credentials.json')
-    user_dir = os.path.join(os.path.dirname(data_dir), 'chrome', 'profiles', user)
-    user_dir_existed = os.path.exists(user_dir)
-
-    if not user_dir_existed:
-        login_sid = await get_session_id_pw()
-        get_access_token(get_auth_code(login_sid))
-
-    if os.path.exists(creds_file):
-        data = open_json(creds_file)
-        expire_ts = int(data.get('timestamp'))
-        now_ts = int(datetime.datetime.now().timestamp())
-
-        if expire_ts and now_ts < expire_ts:
-            remaining = int(expire_ts - now_ts)
-            hours = remaining // 3600
-            minutes = (remaining % 3600) // 60
-            seconds = remaining % 60
-            formatted_time = f'{hours:02}:{minutes:02}:{seconds:02}'
-
-            token = data.get('access_token')
-            if exp_time_only:
-                tasks = asyncio.all_tasks()
-                print(f"\n⌛️  Время действия токена: {LIGHT_MAGENTA}{formatted_time}{WHITE} | Количество задач: {len(tasks)}")
-                return token
+
+    def __init__(self, user: str = 'guest', creds_file: str = None, margin: int = None):
+        self.user = user
+        self.creds_file = creds_file or default_creds_file
+        self.user_dir = os.path.join(os.path.dirname(data_dir), 'chrome', 'profiles', user)
+        self.margin = app_config.TOKEN_REFRESH_MARGIN if margin is None else margin
+
+        self._data: dict | None = None
+        self._refresher: asyncio.Task | None = None
+        self.stats = {'refreshes': 0, 'rejected': 0}
+
+    @property
+    def token(self) -> str | None:
+        if self._data and self._data.get('access_token'):
+            return f"Bearer {self._data['access_token']}"
+        return None
+
+    @property
+    def remaining(self) -> int:
+        """Сколько секунд осталось до истечения токена"""
+        expire_ts = int((self._data or {}).get('timestamp') or 0)
+        return expire_ts - int(datetime.datetime.now().timestamp())
+
+    @property
+    def refresh_remaining(self) -> int | None:
+        """Сколько секунд осталось до истечения refresh token (None, если сервер не сообщил срок)"""
+        refresh_ts = (self._data or {}).get('refresh_timestamp')
+        if not refresh_ts:
+            return None
+        return int(refresh_ts) - int(datetime.datetime.now().timestamp())
+
+    def _load(self) -> None:
+        """Читает файл с токеном при первом обращении. Без профиля браузера токен считается отсутствующим"""
+        if self._data is None:
+            has_profile = os.path.exists(self.user_dir)
+            self._data = open_json(self.creds_file) if has_profile and os.path.exists(self.creds_file) else {}
+
+    async def get(self, show_info: bool = True) -> str | None:
+        """Возвращает действующий токен в формате "Bearer ...". Обновляет его, только если он уже истек или его нет"""
+        self._load()
+
+        token = self.token if self.remaining > 0 else await self.refresh(show_info=show_info)
+        if token:
+            self._start_refresher()
+        return token
+
+    async def refresh(self, show_info: bool = True) -> str | None:
+        """Обновляет токен. Одновременные вызовы объединяются в одно обновление"""
+        return await token_flight.do((self.user, 'refresh'), lambda: self._refresh(show_info))
+
+    async def invalidate(self, rejected: str | None) -> str | None:
+        """
+        Сервер отклонил токен `rejected`. Если токен уже обновили другие задачи, то возвращает новый,
+        иначе обновляет его (один раз на всех)
+        """
+        self.stats['rejected'] += 1
+        if self.token and self.token != rejected and self.remaining > 0:
+            return self.token
+        return await self.refresh(show_info=False)
+
+    async def _refresh(self, show_info: bool = True) -> str | None:
+        async with loop_lag.track('auth'):
+            return await self._refresh_token(show_info)
+
+    async def _refresh_token(self, show_info: bool = True) -> str | None:
+        self._load()
+        self.stats['refreshes'] += 1
+
+        if not self._data:
+            if show_info:
+                print(f"\n⚠️  {YELLOW}Файл с токеном не найден{WHITE} · Получаем новый")
+            token = None
+        elif self.refresh_remaining is not None and self.refresh_remaining <= self.margin:
+            # refresh token скоро истечет, поэтому получаем новую пару токенов через SID (получен заранее в `browser_pool`)
+            token = None
         else:
             if show_info:
                 print(f"\n⚠️  {YELLOW}Время действия токена истекло{WHITE} · Обновляем")
-            token = update_token(data.get('refresh_token'))
+            token = await update_token(self._data.get('refresh_token'), creds_file=self.creds_file)
+
+        if not token:
+            # Сохраненный SID подходит, только если он получен заранее в этом окне обновления (`prefetch`)
+            login_sid = await get_session_id_pw(self.user, max_age=self.margin)
+            token = await get_access_token(await get_auth_code(login_sid), creds_file=self.creds_file)
+
+        if token:
+            self._data = open_json(self.creds_file)
+        return self.token if token else None
+
+    def _start_refresher(self) -> None:
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        """
+        Обновляет токен в фоне за `margin` секунд до истечения.
+        Если обновить не удалось, то задача завершается, и токен обновит следующий вызов `get` после истечения
+        """
+        while self.token:
+            # Если токен живет меньше, чем `margin`, то обновляем его на половине срока
+            margin = min(self.margin, int(self._data.get('expires_in') or 0) // 2)
+            delay = self.remaining - margin
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            try:
+                # Если refresh token скоро истечет, то свежий SID получаем заранее, чтобы повторный вход не задерживал обновление
+                if self.refresh_remaining is not None and self.refresh_remaining <= self.margin:
+                    prefetch = browser_pool.prefetch(self.user)
+                    if prefetch:
+                        await prefetch
+                token = await self.refresh(show_info=False)
+            except Exception as e:
+                logger.error(f"⚠️  Не удалось обновить токен в фоне · {e}")
+                return
+
             if not token:
-                login_sid = await get_session_id_pw()
-                token = get_access_token(get_auth_code(login_sid))
+                return
+
+    async def close(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            await asyncio.gather(self._refresher, return_exceptions=True)
+            self._refresher = None
+
+    def report(self) -> None:
+        if self.stats['refreshes'] or self.stats['rejected']:
+            logger.info(f"🔑  Токен {self.user.ljust(8)} · Обновлений: {LIGHT_GREEN}{self.stats['refreshes']}{WHITE} · Отклонено сервером: {self.stats['rejected']}")
+
+
+token_manager = TokenManager()
+token_managers = {'guest': token_manager}
+
 
-    else:
-        if show_info:
-            print(f"\n⚠️  {YELLOW}Файл с токеном не найден{WHITE} · Получаем новый")
-        login_sid = await get_session_id_pw()
-        token = get_access_token(get_auth_code(login_sid))
+def get_token_manager(user: str = 'guest') -> TokenManager:
+    """Возвращает `TokenManager` профиля (создается при первом обращении)"""
+    if user not in token_managers:
+        token_managers[user] = TokenManager(user, creds_file=os.path.join(data_dir, 'common', f'credentials_{user}.json'))
+    return token_managers[user]
 
-    if token:
-        return f"Bearer {token}"
+
+async def get_token(user='guest', exp_time_only=None, show_info=True) -> str | None:
+    """
+    Получает токен доступа для OLX, используя указанный профиль браузера (см. `TokenManager`).
+    Токен берется из памяти, файл `credentials.json` читается только при первом обращении.
+
+    :param user: Название профиля браузера.
+    :param exp_time_only: Вывести оставшееся время действия токена.
+    :param show_info: Выводить сообщения об обновлении токена.
+    :return: Строка токена в формате "Bearer ..." или None, если получение не удалось.
+    """
+    manager = get_token_manager(user)
+    token = await manager.get(show_info=show_info)
+
+    if token and exp_time_only:
+        remaining = max(0, manager.remaining)
+        hours = remaining // 3600
+        minutes = (remaining % 3600) // 60
+        seconds = remaining % 60
+        formatted_time = f'{hours:02}:{minutes:02}:{seconds:02}'
+
+        tasks = asyncio.all_tasks()
+        print(f"\n⌛️  Время действия токена: {LIGHT_MAGENTA}{formatted_time}{WHITE} | Количество задач: {len(tasks)}")
+    return token
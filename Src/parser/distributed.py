@@ -0,0 +1,399 @@
+import argparse
+import asyncio
+import itertools
+import os
+import socket
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+from Src.app.colors import *
+from Src.app.config import app_config
+from Src.app.logging_config import logger
+from Src.parser.journal import journal
+from Src.parser.jsonlib import dumps, loads
+from Src.parser.scheduler import WorkUnit
+from Src.parser.schemas import Region, City, Category, CategorySnapshot, OffersMeta, Offer
+from Src.tables.olx import OffersWriter
+
+# Максимальный размер одного сообщения (пачка объявлений одной страницы)
+MESSAGE_LIMIT = 2 ** 24
+
+
+def _address(address: str = None) -> tuple[str, int]:
+    host, port = (address or app_config.COORDINATOR).rsplit(':', 1)
+    return host, int(port)
+
+
+async def _send(writer: asyncio.StreamWriter, message: dict) -> None:
+    writer.write(dumps(message).encode('utf-8') + b'\n')
+    await writer.drain()
+
+
+def _unit_to_dict(unit: WorkUnit) -> dict:
+    return {'region': unit.region.model_dump(), 'city': unit.city.model_dump(), 'category': unit.category.model_dump()}
+
+
+def _unit_from_dict(data: dict) -> WorkUnit:
+    category = data['category']
+    return WorkUnit(
+        0, 0,
+        Region.model_construct(**data['region']),
+        City.model_construct(**data['city']),
+        Category(category['id'], category['name'], category['count'], category['parent_id']),
+    )
+
+
+@dataclass
+class Lease:
+    """Категория, выданная воркеру до `expires` (продлевается сигналами воркера)"""
+    id: str
+    unit: WorkUnit
+    worker: str
+    expires: float
+    writer: OffersWriter | None = None
+    unit_id: str | None = None
+
+
+class Coordinator:
+    """
+    Координатор распределенного сбора.
+
+    Слушает TCP `COORDINATOR` и раздает воркерам (`CrawlWorker`) единицы работы (категория города) во временное пользование.
+    Воркер продлевает аренду сигналами и отправляет объявления пачками по мере загрузки, а координатор сразу пишет их
+    в файлы (`OffersWriter`), поэтому таблицы и их объединение по городам остаются на компьютере координатора.
+    Если от воркера нет сигнала `lease_ttl` секунд или он сообщил об ошибке, то незавершенные файлы удаляются,
+    а категория возвращается в очередь (не больше `max_attempts` раз). Прогресс единиц работы и отметки категорий (`Watermark`,
+    приходят от воркера вместе с `complete`) записываются в журнал координатора (`journal`).
+
+    Протокол - JSON строки: `lease`, `heartbeat`, `offers`, `complete`, на каждый запрос один ответ с тем же `id`.
+
+    :param address: Адрес `host:port` (по умолчанию `COORDINATOR`).
+    :param lease_ttl: Время аренды в секундах (по умолчанию `LEASE_TTL`).
+    :param max_attempts: Сколько раз выдавать одну категорию.
+    """
+
+    def __init__(self, address: str = None, lease_ttl: float = None, max_attempts: int = 3):
+        self.host, self.port = _address(address)
+        self.lease_ttl = lease_ttl or app_config.LEASE_TTL
+        self.max_attempts = max_attempts
+
+        self._pending: deque[WorkUnit] = deque()
+        self._leases: dict[str, Lease] = {}
+        self._attempts: dict[str, int] = {}
+        self._results: asyncio.Queue[tuple[WorkUnit, object]] = asyncio.Queue()
+        self._connections: dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self._finished = False
+
+        self._run = None
+        self._out_dir = None
+        self._save_json = None
+        self._save_xls = None
+
+        self.workers: set[str] = set()
+        self.reassigned = 0
+
+    async def drain(self, units: list[WorkUnit], run: str = None, out_dir: str = None, save_json: bool = None, save_xls: bool = None) -> AsyncIterator[tuple[WorkUnit, object]]:
+        """
+        Раздает единицы работы воркерам и отдает (единица, результат) в порядке завершения, как `CrawlScheduler.drain`.
+        Результат - название категории и количество объявлений или None, если категорию не удалось собрать.
+        """
+        self._pending.extend(sorted(units))
+        self._run, self._out_dir, self._save_json, self._save_xls = run, out_dir, save_json, save_xls
+
+        server = await asyncio.start_server(self._serve, self.host, self.port, limit=MESSAGE_LIMIT)
+        expiry = asyncio.create_task(self._expire_loop())
+        logger.info(f"🛰  Координатор {LIGHT_YELLOW}{self.host}:{self.port}{WHITE} · Категорий: {len(units)} · Ожидание воркеров")
+
+        try:
+            for _ in range(len(units)):
+                yield await self._results.get()
+        finally:
+            self._finished = True
+            expiry.cancel()
+            await asyncio.gather(expiry, return_exceptions=True)
+            for lease in self._leases.values():
+                if lease.writer:
+                    lease.writer.abort()
+            self._leases.clear()
+            server.close()
+            # Соединения закрываются, и обработчики завершаются сами, прочитав конец потока
+            for connection in list(self._connections):
+                connection.close()
+            await asyncio.gather(*self._connections.values(), return_exceptions=True)
+            await server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while line := await reader.readline():
+                message = loads(line)
+                # Ответ несет ID запроса, чтобы воркер сопоставил его с запросом
+                await _send(writer, {**await self._dispatch(message), 'id': message.get('id')})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _dispatch(self, message: dict) -> dict:
+        op = message.get('op')
+        lease = self._leases.get(message.get('lease'))
+
+        if op == 'lease':
+            return self._lease(message.get('worker') or 'worker')
+
+        if lease is None:
+            return {'ok': False}
+
+        if op == 'heartbeat':
+            lease.expires = time.monotonic() + self.lease_ttl
+            return {'ok': True}
+
+        if op == 'offers':
+            lease.expires = time.monotonic() + self.lease_ttl
+            offers = [Offer.model_construct(**offer) for offer in message.get('offers') or []]
+            try:
+                await asyncio.to_thread(self._writer(lease, message.get('category_name')).write, offers)
+            except Exception as e:
+                # Запись не удалась: воркер перестает отправлять объявления, а категория возвращается в очередь
+                del self._leases[lease.id]
+                logger.error(f"❌  Не удалось записать объявления {lease.unit.key} · {type(e).__name__}. {e}")
+                self._release(lease, f"{type(e).__name__}. {e}")
+                return {'ok': False}
+            return {'ok': True}
+
+        if op == 'complete':
+            del self._leases[lease.id]
+            if message.get('ok'):
+                await asyncio.to_thread(self._writer(lease, message.get('category_name')).close)
+                meta = message.get('meta')
+                if lease.unit_id:
+                    journal.finish_unit(lease.unit_id)
+                # Отметка категории хранится в журнале координатора, а не на компьютере воркера
+                if message.get('newest') is not None:
+                    journal.set_watermark(lease.unit.key, message['newest'])
+                self._results.put_nowait((lease.unit, (message.get('category_name'), OffersMeta(**meta) if meta else None)))
+            else:
+                logger.warning(f"⚠️  {lease.worker} · Не удалось собрать {lease.unit.key} · {message.get('error')}")
+                self._release(lease, message.get('error'))
+            return {'ok': True}
+
+        return {'ok': False, 'error': f'unknown op {op}'}
+
+    def _lease(self, worker: str) -> dict:
+        if worker not in self.workers:
+            self.workers.add(worker)
+            logger.info(f"🛰  Подключен воркер {LIGHT_GREEN}{worker}{WHITE}")
+
+        if self._finished or not self._pending:
+            # Пока есть выданные категории, воркеры ждут: категория может вернуться в очередь
+            return {'lease': None, 'done': self._finished or not self._leases}
+
+        unit = self._pending.popleft()
+        self._attempts[unit.key] = self._attempts.get(unit.key, 0) + 1
+        lease = Lease(uuid.uuid4().hex, unit, worker, time.monotonic() + self.lease_ttl)
+        if self._run:
+            lease.unit_id = journal.start_unit(self._run, unit.key)
+        self._leases[lease.id] = lease
+        return {'lease': lease.id, 'ttl': self.lease_ttl, 'unit': _unit_to_dict(unit)}
+
+    def _writer(self, lease: Lease, category_name: str = None) -> OffersWriter:
+        """Файлы категории создаются при получении первой пачки, когда воркер уже знает название категории"""
+        if lease.writer is None:
+            unit = lease.unit
+            lease.writer = OffersWriter(unit.region.id, unit.region.name, unit.city.id, unit.city.name, unit.category.id, category_name or '', self._out_dir, self._save_json, self._save_xls)
+        return lease.writer
+
+    def _release(self, lease: Lease, error: str) -> None:
+        """Возвращает категорию в очередь или отдает ее как неудачную, если попытки закончились"""
+        if lease.writer:
+            lease.writer.abort()
+        if self._attempts[lease.unit.key] < self.max_attempts:
+            self._pending.appendleft(lease.unit)
+            self.reassigned += 1
+            return
+
+        if lease.unit_id:
+            journal.fail_unit(lease.unit_id, error or 'lease expired')
+        self._results.put_nowait((lease.unit, None))
+
+    async def _expire_loop(self) -> None:
+        while True:
+            await asyncio.sleep(max(0.1, self.lease_ttl / 4))
+            now = time.monotonic()
+            for lease in [lease for lease in self._leases.values() if lease.expires < now]:
+                del self._leases[lease.id]
+                logger.warning(f"⚠️  Воркер {lease.worker} не отвечает · {lease.unit.key} будет передан другому воркеру")
+                self._release(lease, 'lease expired')
+
+    def leased(self, worker: str) -> list[str]:
+        """Ключи категорий, которые сейчас собирает воркер"""
+        return [lease.unit.key for lease in self._leases.values() if lease.worker == worker]
+
+    def report(self) -> None:
+        logger.info(f"🛰  Воркеров: {len(self.workers)} · Передано другим воркерам: {self.reassigned}")
+
+
+class LeaseLost(Exception):
+    """Координатор забрал категорию у воркера (аренда истекла)"""
+
+
+class CrawlWorker:
+    """
+    Воркер распределенного сбора: берет у координатора (`Coordinator`) категории и собирает их обычным путем
+    `olxParser.iter_offers_from_api` со своими прокси (`proxies.txt` на этом компьютере), отправляя объявления пачками.
+    Пока категория собирается, воркер каждые треть `ttl` продлевает аренду. Если координатор отказал в продлении,
+    то сбор категории прекращается. Ответы координатора читает одна задача и сопоставляет их с запросами по `id`,
+    поэтому отмена запроса (например, сигнала при завершении категории) не сдвигает ответы следующих запросов.
+
+    :param address: Адрес координатора `host:port` (по умолчанию `COORDINATOR`).
+    :param name: Имя воркера (по умолчанию `hostname-pid`).
+    :param connect_timeout: Сколько секунд ждать запуска координатора.
+    """
+
+    def __init__(self, address: str = None, name: str = None, connect_timeout: float = 60):
+        self.host, self.port = _address(address)
+        self.name = name or f'{socket.gethostname()}-{os.getpid()}'
+        self.connect_timeout = connect_timeout
+        self.collected = 0
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._replies: dict[int, asyncio.Future] = {}
+        self._ids = itertools.count()
+        self._receiver: asyncio.Task | None = None
+
+    async def _connect(self) -> None:
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                self._reader, self._writer = await asyncio.open_connection(self.host, self.port, limit=MESSAGE_LIMIT)
+                self._receiver = asyncio.create_task(self._receive())
+                return
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(1)
+
+    async def _receive(self) -> None:
+        """Читает ответы координатора и передает их ожидающим запросам. Ответы отмененных запросов отбрасываются"""
+        try:
+            while line := await self._reader.readline():
+                reply = loads(line)
+                future = self._replies.pop(reply.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for future in self._replies.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('Координатор закрыл соединение'))
+            self._replies.clear()
+
+    async def _call(self, message: dict) -> dict:
+        if self._receiver.done():
+            raise ConnectionError('Координатор закрыл соединение')
+
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._replies[request_id] = future
+        try:
+            # Сообщение записывается в буфер целиком без ожидания, поэтому отмена не оставляет половину строки
+            self._writer.write(dumps({**message, 'id': request_id}).encode('utf-8') + b'\n')
+            await self._writer.drain()
+            return await future
+        finally:
+            self._replies.pop(request_id, None)
+
+    async def run(self) -> None:
+        # Импорт внутри функции: модуль `olx` сам импортирует этот модуль
+        from Src.parser.olx import olxParser
+        from Src.parser.session import session_pool
+
+        parser = olxParser()
+        parser.show_progress = False
+
+        await self._connect()
+        logger.info(f"🛰  Воркер {self.name} подключен к {self.host}:{self.port}")
+        try:
+            while True:
+                try:
+                    reply = await self._call({'op': 'lease', 'worker': self.name})
+                except ConnectionError:
+                    break
+                if reply.get('lease') is None:
+                    if reply.get('done'):
+                        break
+                    await asyncio.sleep(1)
+                    continue
+                await self._crawl(parser, reply)
+        finally:
+            self._writer.close()
+            self._receiver.cancel()
+            await asyncio.gather(self._receiver, return_exceptions=True)
+            await session_pool.close()
+            logger.info(f"🛰  Воркер {self.name} завершил работу · Собрано объявлений: {self.collected}")
+
+    async def _crawl(self, parser, lease: dict) -> None:
+        unit = _unit_from_dict(lease['unit'])
+        region, city, category = unit.region, unit.city, unit.category
+        crawl = asyncio.current_task()
+        lease_lost = False
+
+        async def heartbeat():
+            nonlocal lease_lost
+            while True:
+                await asyncio.sleep(lease['ttl'] / 3)
+                if not (await self._call({'op': 'heartbeat', 'lease': lease['lease']})).get('ok'):
+                    logger.warning(f"⚠️  Аренда {unit.key} потеряна")
+                    lease_lost = True
+                    crawl.cancel()
+                    return
+
+        heartbeat_task = asyncio.create_task(heartbeat())
+        try:
+            category_name = await parser._get_category_name(category.id)
+            snapshot = CategorySnapshot()
+            async for batch in parser.iter_offers_from_api(category.id, region.id, city.id, snapshot=snapshot, watermark=False):
+                reply = await self._call({'op': 'offers', 'lease': lease['lease'], 'category_name': category_name, 'offers': [offer.model_dump() for offer in batch]})
+                if not reply.get('ok'):
+                    raise LeaseLost(unit.key)
+                self.collected += len(batch)
+            heartbeat_task.cancel()
+            await self._call({'op': 'complete', 'lease': lease['lease'], 'ok': True, 'category_name': category_name,
+                              'meta': snapshot.meta.model_dump(), 'newest': snapshot.newest})
+
+        except asyncio.CancelledError:
+            # Отмена из-за потерянной аренды: воркер переходит к следующей категории. Остальные отмены (Ctrl+C) не глушатся
+            if not lease_lost:
+                raise
+            crawl.uncancel()
+
+        except LeaseLost:
+            # Категория уже передана другому воркеру: ее объявления больше не отправляются
+            logger.warning(f"⚠️  Аренда {unit.key} потеряна")
+
+        except ConnectionError:
+            raise
+
+        except Exception as e:
+            await self._call({'op': 'complete', 'lease': lease['lease'], 'ok': False, 'error': f'{type(e).__name__}. {e}'})
+
+        finally:
+            heartbeat_task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Воркер распределенного сбора объявлений OLX')
+    parser.add_argument('--coordinator', default=app_config.COORDINATOR, help='Адрес координатора <host>:<port>')
+    parser.add_argument('--name', default=None, help='Имя воркера')
+    args = parser.parse_args()
+
+    asyncio.run(CrawlWorker(args.coordinator, args.name).run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import re
+
+from Src.parser.jsonlib import loads
+
+PRERENDERED_STATE = re.compile(r'window.__PRERENDERED_STATE__= (".*?");(?:\r\n|\r|\n)', re.DOTALL)
+
+
+def _script_bounds(html: str, position: int) -> tuple[int, int] | None:
+    """
+    Границы содержимого тега `<script>`, внутри которого (или в открывающем теге которого) находится `position`
+
+    :param html: Текст страницы.
+    :param position: Позиция в тексте.
+    :return: (начало, конец) содержимого скрипта или None, если позиция не внутри `<script>`.
+    """
+    tag_start = html.rfind('<script', 0, position)
+    if tag_start == -1 or html.rfind('</script>', tag_start, position) != -1:
+        return None
+
+    content_start = html.find('>', tag_start) + 1
+    content_end = html.find('</script>', content_start)
+    if content_start == 0 or content_end == -1:
+        return None
+    return content_start, content_end
+
+
+def find_script(html: str, marker: str) -> str | None:
+    """
+    Находит первый `<script>`, в открывающем теге или содержимом которого встречается `marker`,
+    простым поиском по тексту страницы (без построения DOM)
+
+    :param html: Текст страницы.
+    :param marker: Строка для поиска, например `id="olx-init-config"` или `"@type"`.
+    :return: Содержимое скрипта (без пробелов по краям) или None.
+    """
+    if not isinstance(html, str):
+        return None
+
+    position = html.find(marker)
+    while position != -1:
+        bounds = _script_bounds(html, position)
+        if bounds:
+            return html[bounds[0]:bounds[1]].strip()
+        position = html.find(marker, position + len(marker))
+    return None
+
+
+def prerendered_state(html: str) -> dict | None:
+    """Состояние страницы `window.__PRERENDERED_STATE__` из скрипта `olx-init-config`"""
+    script_text = find_script(html, 'id="olx-init-config"')
+    if not script_text:
+        return None
+
+    match = PRERENDERED_STATE.search(script_text + '\n')
+    if not match:
+        return None
+
+    try:
+        return loads(loads(match.group(1)))
+    except ValueError:
+        return None
+
+
+def ld_json(html: str) -> dict | None:
+    """Первый JSON-LD блок (скрипт с `@type`) на странице"""
+    script_text = find_script(html, '@type')
+    if not script_text:
+        return None
+
+    try:
+        return loads(script_text)
+    except ValueError:
+        return None
@@ -0,0 +1,228 @@
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from Src.app.colors import *
+from Src.app.logging_config import logger
+from Src.parser.jsonlib import dumps, loads
+
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+
+
+@dataclass
+class Watermark:
+    """Отметка прошлого сбора категории: время самого нового объявления и ID последних объявлений"""
+    newest: str
+    ids: frozenset[int]
+
+    def is_known(self, offer: dict) -> bool:
+        """Объявление уже было собрано: его ID известен или оно старше самого нового объявления прошлого сбора"""
+        if offer.get('id') in self.ids:
+            return True
+        created = offer.get('created_time')
+        return bool(created) and datetime.fromisoformat(created) < datetime.fromisoformat(self.newest)
+
+
+class JobJournal:
+    """
+    Журнал заданий сбора в SQLite (режим WAL) в `data/common/jobs.sqlite3`.
+
+    Единица работы - категория города (`WorkUnit.key`) в рамках запуска `run` (например, `25_268` или `all_all`).
+    Для каждой единицы хранятся все страницы (ссылка и offset) с состоянием pending, running, done или failed,
+    а для загруженных страниц - объявления, пока единица не будет собрана полностью.
+    Благодаря этому после сбоя или Ctrl+C сбор продолжается с той же страницы, а повторно загружаются только
+    незавершенные и неудачные страницы. Каждое изменение записывается в отдельной транзакции.
+    Также для каждой категории хранится отметка прошлого сбора (`Watermark`) для режима сбора только новых объявлений.
+
+    :param path: Путь к базе (по умолчанию `data/common/jobs.sqlite3`).
+    """
+
+    def __init__(self, path: str = None):
+        data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'data')
+        self.path = path or os.path.join(data_dir, 'common', 'jobs.sqlite3')
+        self._conn: sqlite3.Connection | None = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            with self._conn:
+                self._conn.executescript('''
+                    CREATE TABLE IF NOT EXISTS units (
+                        id TEXT PRIMARY KEY,
+                        run TEXT NOT NULL,
+                        key TEXT NOT NULL,
+                        state TEXT NOT NULL,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        error TEXT,
+                        updated REAL
+                    );
+                    CREATE INDEX IF NOT EXISTS units_run ON units (run, state);
+                    CREATE TABLE IF NOT EXISTS pages (
+                        unit_id TEXT NOT NULL,
+                        url TEXT NOT NULL,
+                        page_offset INTEGER NOT NULL DEFAULT 0,
+                        state TEXT NOT NULL,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        body TEXT,
+                        error TEXT,
+                        updated REAL,
+                        PRIMARY KEY (unit_id, url)
+                    );
+                    CREATE TABLE IF NOT EXISTS watermarks (
+                        key TEXT PRIMARY KEY,
+                        newest TEXT NOT NULL,
+                        ids TEXT NOT NULL,
+                        updated REAL
+                    );
+                ''')
+        return self._conn
+
+    @staticmethod
+    def unit_id(run: str, key: str) -> str:
+        return f'{run}/{key}'
+
+    def start_run(self, run: str) -> None:
+        """Начало запуска: задания, которые выполнялись при прошлом сбое, снова становятся pending"""
+        with self.conn:
+            self.conn.execute('UPDATE units SET state = ? WHERE run = ? AND state = ?', (PENDING, run, RUNNING))
+            self.conn.execute(
+                'UPDATE pages SET state = ? WHERE state = ? AND unit_id IN (SELECT id FROM units WHERE run = ?)',
+                (PENDING, RUNNING, run),
+            )
+
+    def done_units(self, run: str) -> set[str]:
+        rows = self.conn.execute('SELECT key FROM units WHERE run = ? AND state = ?', (run, DONE))
+        return {key for key, in rows}
+
+    def mark_done(self, run: str, key: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO units (id, run, key, state, updated) VALUES (?, ?, ?, ?, ?)',
+                (self.unit_id(run, key), run, key, DONE, time.time()),
+            )
+
+    def start_unit(self, run: str, key: str) -> str:
+        """Отмечает единицу работы как выполняющуюся и возвращает ее ID"""
+        unit_id = self.unit_id(run, key)
+        with self.conn:
+            self.conn.execute('''
+                INSERT INTO units (id, run, key, state, attempts, updated) VALUES (?, ?, ?, ?, 1, ?)
+                ON CONFLICT (id) DO UPDATE SET state = excluded.state, attempts = attempts + 1, error = NULL, updated = excluded.updated
+            ''', (unit_id, run, key, RUNNING, time.time()))
+        return unit_id
+
+    def finish_unit(self, unit_id: str) -> None:
+        """Единица собрана полностью: объявления страниц больше не нужны"""
+        with self.conn:
+            self.conn.execute('UPDATE units SET state = ?, updated = ? WHERE id = ?', (DONE, time.time(), unit_id))
+            self.conn.execute('UPDATE pages SET body = NULL WHERE unit_id = ?', (unit_id,))
+
+    def fail_unit(self, unit_id: str, error: str) -> None:
+        with self.conn:
+            self.conn.execute('UPDATE units SET state = ?, error = ?, updated = ? WHERE id = ?', (FAILED, error, time.time(), unit_id))
+
+    def pages(self, unit_id: str) -> list[tuple[str, int, str]]:
+        """Страницы единицы работы по порядку: ссылка, offset и состояние"""
+        return self.conn.execute('SELECT url, page_offset, state FROM pages WHERE unit_id = ? ORDER BY rowid', (unit_id,)).fetchall()
+
+    def page_offers(self, unit_id: str, url: str) -> list[dict]:
+        """Объявления загруженной страницы"""
+        row = self.conn.execute('SELECT body FROM pages WHERE unit_id = ? AND url = ?', (unit_id, url)).fetchone()
+        return loads(row[0]) if row and row[0] else []
+
+    def plan_pages(self, unit_id: str, pages: list[tuple[str, int]]) -> None:
+        """Добавляет страницы (ссылка, offset) в состоянии pending. Уже записанные страницы не меняются"""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO pages (unit_id, url, page_offset, state, updated) VALUES (?, ?, ?, ?, ?)',
+                [(unit_id, url, page_offset, PENDING, now) for url, page_offset in pages],
+            )
+
+    def start_pages(self, unit_id: str, urls: list[str]) -> None:
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                'UPDATE pages SET state = ?, attempts = attempts + 1, updated = ? WHERE unit_id = ? AND url = ?',
+                [(RUNNING, now, unit_id, url) for url in urls],
+            )
+
+    def finish_page(self, unit_id: str, url: str, offers: list, page_offset: int = 0) -> None:
+        with self.conn:
+            self.conn.execute('''
+                INSERT INTO pages (unit_id, url, page_offset, state, body, updated) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (unit_id, url) DO UPDATE SET state = excluded.state, body = excluded.body, error = NULL, updated = excluded.updated
+            ''', (unit_id, url, page_offset, DONE, dumps(offers), time.time()))
+
+    def fail_page(self, unit_id: str, url: str, error: str) -> None:
+        with self.conn:
+            self.conn.execute(
+                'UPDATE pages SET state = ?, error = ?, updated = ? WHERE unit_id = ? AND url = ?',
+                (FAILED, error, time.time(), unit_id, url),
+            )
+
+    def failed_pages(self, unit_id: str) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM pages WHERE unit_id = ? AND state != ?', (unit_id, DONE)).fetchone()[0]
+
+    def clear_run(self, run: str) -> None:
+        """Удаляет записи запуска после успешного завершения (следующий запуск начнется сначала)"""
+        with self.conn:
+            self.conn.execute('DELETE FROM pages WHERE unit_id IN (SELECT id FROM units WHERE run = ?)', (run,))
+            self.conn.execute('DELETE FROM units WHERE run = ?', (run,))
+
+    def watermark(self, key: str) -> Watermark | None:
+        """Отметка прошлого сбора категории (`WorkUnit.key`) или None, если категория еще не собиралась"""
+        row = self.conn.execute('SELECT newest, ids FROM watermarks WHERE key = ?', (key,)).fetchone()
+        return Watermark(row[0], frozenset(loads(row[1]))) if row else None
+
+    def set_watermark(self, key: str, offers: list[dict], previous: Watermark = None, keep: int = 500) -> None:
+        """
+        Запоминает самое новое объявление категории и ID `keep` последних объявлений
+
+        :param key: Ключ категории (`WorkUnit.key`).
+        :param offers: Собранные объявления (сырой формат с `created_time`).
+        :param previous: Прошлая отметка, если собраны только новые объявления.
+        :param keep: Сколько ID хранить.
+        """
+        dated = sorted(
+            (o for o in offers if o.get('created_time')),
+            key=lambda o: datetime.fromisoformat(o['created_time']),
+            reverse=True,
+        )
+        ids = [o.get('id') for o in dated[:keep]]
+        if previous:
+            ids += [i for i in previous.ids if i not in ids][:keep - len(ids)]
+
+        newest = dated[0]['created_time'] if dated else None
+        if previous and (newest is None or datetime.fromisoformat(previous.newest) > datetime.fromisoformat(newest)):
+            newest = previous.newest
+        if newest is None:
+            return
+
+        with self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO watermarks (key, newest, ids, updated) VALUES (?, ?, ?, ?)',
+                (key, newest, dumps(ids), time.time()),
+            )
+
+    def report(self) -> None:
+        if self._conn is None:
+            return
+        units = dict(self.conn.execute('SELECT state, COUNT(*) FROM units GROUP BY state').fetchall())
+        pages = dict(self.conn.execute('SELECT state, COUNT(*) FROM pages GROUP BY state').fetchall())
+        logger.info(f"📒  Журнал · Категорий: {LIGHT_GREEN}{units.get(DONE, 0)}{WHITE} / {sum(units.values())} (ошибок: {units.get(FAILED, 0)}) · "
+                    f"Страниц: {LIGHT_GREEN}{pages.get(DONE, 0)}{WHITE} / {sum(pages.values())} (ошибок: {pages.get(FAILED, 0)})")
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+journal = JobJournal()
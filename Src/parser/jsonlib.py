@@ -0,0 +1,43 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+# Быстрый JSON: orjson или simdjson, если установлены, иначе стандартный `json`
+if orjson is not None:
+    backend = 'orjson'
+elif simdjson is not None:
+    backend = 'simdjson'
+else:
+    backend = 'json'
+
+
+def loads(data: bytes | str):
+    """Декодирует JSON из байтов ответа (без промежуточной строки) или из строки"""
+    if orjson is not None:
+        return orjson.loads(data)
+    if simdjson is not None:
+        return simdjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(content, indent: bool = False) -> str:
+    """
+    Кодирует объект в JSON строку (кириллица не экранируется).
+
+    Компактный JSON (сеть, журнал, сообщения воркеров) кодируется через orjson, если он установлен.
+    С `indent` - отступ 4 пробела, как и раньше у сохраненных файлов (orjson умеет только 2 пробела).
+    """
+    if orjson is not None and not indent:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+        except TypeError:
+            pass
+    return json.dumps(content, ensure_ascii=False, indent=4 if indent else None)
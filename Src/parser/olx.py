@@ -1,25 +1,41 @@
 import asyncio
+import heapq
 import json
 import os
 import sys
 import time
+from collections import deque
+from datetime import datetime
+from functools import partial
+from typing import AsyncIterator
 from urllib.parse import urlparse
 
 from bs4 import BeautifulSoup as BS
-from openpyxl import load_workbook
-from tqdm.asyncio import tqdm_asyncio
+from tqdm import tqdm
 from yarl import URL
 from yaspin import yaspin
 
 from Src.app.colors import *
 from Src.app.config import app_config
 from Src.app.logging_config import logger
-from Src.parser.constants import limit
-from Src.parser.credentials import get_token
-from Src.parser.request import get_data
-from Src.parser.schemas import OfferID, Region, City, Category, OffersMeta, Offer
-from Src.parser.utils import open_json, format_date, save_json, get_proxy_random
-from Src.tables.olx import merge_city_offers, register_styles, save_offers, process_cell
+from Src.parser.accounts import Account, account_pool
+from Src.parser.cache import response_cache
+from Src.parser.concurrency import host_limits, limiters
+from Src.parser.constants import limit, max_limit, offset
+from Src.parser.credentials import TokenManager, get_token
+from Src.parser.distributed import Coordinator
+from Src.parser.extract import ld_json, prerendered_state
+from Src.parser.journal import DONE, PENDING, Watermark, journal
+from Src.parser.jsonlib import loads
+from Src.parser.proxies import proxy_pool
+from Src.parser.request import fetch
+from Src.parser.retry import Failure, RetryPolicy, RetryQueue, retry_stats
+from Src.parser.scheduler import CrawlScheduler, WorkUnit
+from Src.parser.sharding import ShardedCrawl
+from Src.parser.schemas import OfferID, Region, City, Category, CategorySnapshot, OffersMeta, Offer
+from Src.parser.singleflight import request_flight
+from Src.parser.utils import open_json, format_date, save_json, endpoint_of, normalize_url
+from Src.tables.olx import OffersWriter, PhonesFile, merge_city_offers, save_offers, process_cell
 
 
 class olxParser:
@@ -31,7 +47,7 @@ class olxParser:
     - https://www.olx.ua/api/v1/offers/889972662/limited-phones/
     -
     """
-    __base_url = 'https://www.olx.ua'
+    __base_url = app_config.OLX_BASE_URL.rstrip('/')
     __api_offers_url = f"{__base_url}/api/v1/offers"
 
     work_dir = os.path.join(os.path.dirname(__file__))
@@ -43,6 +59,21 @@ class olxParser:
     _txt_numbers = f"🔄  Парсим номер телефонов  "
     _ascii = ' ▱▰'
 
+    # Количество объявлений по категориям меняется чаще справочников, поэтому хранится в кеше меньше
+    _counts_cache_ttl = 3600
+
+    # Сколько последних объявлений категории запоминать для сбора только новых объявлений
+    _watermark_size = 500
+
+    # Деление больших запросов на части: максимальная глубина по районам и подкатегориям, отдельно по цене,
+    # и начальный шаг диапазона цены (грн)
+    _max_partition_depth = 12
+    _max_price_depth = 48
+    _price_step = 1000
+
+    # Как часто (в секундах) выводить скорость получения номеров
+    _phones_report_interval = 10
+
     def __init__(self, Json: bool = None, Xlsx: bool = None):
         self._workers = app_config.MAX_WORKERS
         self._category_url = None
@@ -50,7 +81,11 @@ class olxParser:
         self._save_json = Json
         self._save_xls = Xlsx
 
-        self._semaphore = asyncio.Semaphore(self._workers)
+        self._retry_policy = RetryPolicy()
+        self._categories: list[Category] | None = None
+
+        # В процессах сбора (`ShardedCrawl`) прогресс-бары страниц отключены, чтобы не смешивать вывод
+        self.show_progress = True
 
         self.out_dir = os.path.join(self.data_dir)
         os.makedirs(self.out_dir, exist_ok=True)
@@ -87,8 +122,21 @@ class olxParser:
         except:
             raise
 
+    @classmethod
+    def _find_json(cls, html_text: str) -> dict | None:
+        """
+        Возвращает `__PRERENDERED_STATE__` страницы. Скрипт ищется по тексту страницы без построения DOM,
+        BeautifulSoup используется только если быстрый поиск ничего не нашел
+        """
+        data = prerendered_state(html_text)
+        if data is not None:
+            return data
+
+        logger.debug('`olx-init-config` не найден быстрым поиском, разбор через BeautifulSoup')
+        return cls._find_json_bs(cls._get_html(html_text))
+
     @staticmethod
-    def _find_json(html: BS) -> dict | None:
+    def _find_json_bs(html: BS) -> dict | None:
         script_text = next((item.get_text(strip=True) for item in html.find_all('script') if item.get('id') == 'olx-init-config'), None)
         if not script_text:
             logger.warning('`script_text` not found')
@@ -99,7 +147,7 @@ class olxParser:
             logger.warning('`__PRERENDERED_STATE__` not found')
             return None
 
-        return json.loads(json.loads(match.group(1)))
+        return loads(loads(match.group(1)))
 
     @staticmethod
     def _format_offer(data: dict) -> Offer:
@@ -132,55 +180,129 @@ class olxParser:
 
         return offer
 
-    async def _make_request(self, url: str, headers: dict = None, data: dict = None, payload: dict = None, json_response: bool = None, use_proxy: bool = False) -> str | dict | None:
+    async def _make_request(self, url: str, headers: dict = None, data: dict = None, payload: dict = None, json_response: bool = None, use_proxy: bool = False, policy: RetryPolicy = None, cache_ttl: int = None, proxies: list[str] = None, tokens: TokenManager = None) -> str | dict | None:
+        """
+        Делает запрос (см. `_request`). Одинаковые одновременные запросы объединяются в один (`request_flight`):
+        пока запрос выполняется, остальные вызовы с тем же URL, телом, токеном, прокси и временем кеша ждут его результат.
+        Запросы с одним токеном принадлежат одному аккаунту, поэтому `tokens` в ключ не входит.
+        """
+        key = (
+            normalize_url(url),
+            json.dumps(payload or data, sort_keys=True, ensure_ascii=False),
+            (headers or {}).get('authorization'),
+            json_response,
+            use_proxy,
+            tuple(proxies) if proxies is not None else None,
+            cache_ttl,
+        )
+        return await request_flight.do(key, lambda: self._request(url, headers, data, payload, json_response, use_proxy, policy, cache_ttl, proxies, tokens))
+
+    async def _request(self, url: str, headers: dict = None, data: dict = None, payload: dict = None, json_response: bool = None, use_proxy: bool = False, policy: RetryPolicy = None, cache_ttl: int = None, proxies: list[str] = None, tokens: TokenManager = None) -> str | dict | None:
         """
-        Делает запрос и проверяет статус ответа
+        Делает запрос и проверяет статус ответа.
+        Неудачные попытки повторяются по правилам `policy` (по умолчанию `self._retry_policy`) в пределах общего дедлайна запроса.
+        Количество одновременных запросов к каждой группе эндпоинтов ограничивается адаптивным лимитом (`limiters`).
+        Если передан `cache_ttl`, то JSON ответ берется из кеша на диске (`response_cache`) и сохраняется в него на `cache_ttl` секунд.
+        Если переданы `proxies`, то прокси выбирается только из них (прокси аккаунта).
+        Если передан `tokens` (`TokenManager` аккаунта, чей токен в заголовке `authorization`), то при 401 токен этого аккаунта
+        обновляется и запрос повторяется с новым токеном.
         """
         headers = headers or self._get_headers()
         cookies = self._get_cookies()
 
-        retries, delay = 5, 5
+        cache_key, cached = None, None
+        if cache_ttl and json_response:
+            cache_key = response_cache.key(url, payload)
+            cached = response_cache.get(cache_key)
+            if cached and response_cache.is_fresh(cached):
+                logger.debug(f"🗃  Ответ из кеша · {url}")
+                return cached['body']
+            if cached:
+                headers = {**headers, **response_cache.validators(cached)}
+
+        policy = policy or self._retry_policy
+        endpoint = endpoint_of(url)
+        limiter = limiters.get(endpoint)
+        retries = policy.retries
+
+        retry_stats.request(endpoint)
+        deadline = time.monotonic() + policy.deadline
+        exclude = set()
+
         for attempt in range(1, retries + 1):
-            proxy = get_proxy_random()
-            status, response = await get_data(url, headers, cookies, data, payload, proxy=proxy, Json=json_response, use_proxy=use_proxy)
+            async with host_limits.get(url), limiter, proxy_pool.slot(enabled=use_proxy, exclude=exclude, only=proxies) as proxy:
+                started = time.perf_counter()
+                reply = await fetch(url, headers, cookies, data, payload, proxy=proxy, Json=json_response, use_proxy=use_proxy)
+                elapsed = time.perf_counter() - started
+
+                status, response = reply.status, reply.body
+                failure = policy.classify(reply)
+
+                if failure in (Failure.RATE_LIMIT, Failure.CLOUDFRONT, Failure.TIMEOUT):
+                    limiter.on_congestion(failure.value)
+                elif policy.is_captcha(response):
+                    limiter.on_congestion('captcha')
+                elif failure is None:
+                    limiter.on_success(elapsed)
+
+            if failure is None:
+                proxy_pool.success(proxy, elapsed)
+
+                if status == 200:
+                    logger.debug(f"✔  Request success. Status: {LIGHT_GREEN}{status}{WHITE}")
+                    if cache_key and isinstance(response, (dict, list)) and 'error' not in response:
+                        response_cache.put(cache_key, url, response, reply.headers, cache_ttl)
+                    return response
+
+                elif status == 304 and cached:
+                    logger.debug(f"🗃  Ответ не изменился (304) · {url}")
+                    return response_cache.revalidated(cache_key, cached, cache_ttl)
+
+                elif status == 404:
+                    logger.debug(f"⚠  [{attempt}/{retries}] Объявление не найдено или удалено. Status: {MAGENTA}{status}{WHITE}")
+                    return response if json_response else None
 
-            if status == 200:
-                logger.debug(f"✔  Request success. Status: {LIGHT_GREEN}{status}{WHITE}")
-                return response
+                else:
+                    logger.debug(f"⚠  [{attempt}/{retries}] Attempt failed. Status: {YELLOW}{status}{WHITE}\n{response}")
+                    return response if json_response else {}
 
-            elif status == 404:
-                logger.debug(f"⚠  [{attempt}/{retries}] Объявление не найдено или удалено. Status: {MAGENTA}{status}{WHITE}")
-                return response if json_response else None
+            if failure == Failure.PROXY:
+                is_auth = isinstance(response, str) and '407' in response
+                proxy_pool.failure(proxy, 'auth' if is_auth else 'error')
+                if is_auth:
+                    logger.error(f"⚠  [{attempt}/{retries}] Неверные данные для авторизации прокси. Status {MAGENTA}{status}{WHITE} · {response.split('See')[0]}")
 
-            elif status == 400:
-                logger.debug(f"⚠  [{attempt}/{retries}] Attempt failed. Status: {YELLOW}{status}{WHITE}\n{response}")
-                return response if json_response else {}
+            elif failure == Failure.CLOUDFRONT:
+                proxy_pool.failure(proxy, 'blocked')
+                logger.debug(f"⚠️  [{attempt}/{retries}] Запрос был отклонен CloudFront. {policy.title(response)} · {url}")
 
-            elif status == 401:
+            elif failure in (Failure.TIMEOUT, Failure.NETWORK):
+                proxy_pool.failure(proxy, 'error')
+
+            elif failure == Failure.AUTH:
                 logger.debug(f"⚠  [{attempt}/{retries}] Token expired. Status: {YELLOW}{status}{WHITE}\n{response}")
-                await get_token()
+                if tokens and headers.get('authorization'):
+                    headers = {**headers, 'authorization': await tokens.invalidate(headers['authorization'])}
 
-            elif status == 500:
-                if '407' in response:
-                    logger.error(f"⚠  [{attempt}/{retries}] Неверные данные для авторизации прокси. Status {MAGENTA}{status}{WHITE} · {response.split('See')[0]}")
+            else:
+                # 5xx и неизвестные статусы не говорят ничего о прокси, поэтому в статистику прокси не попадают
+                logger.debug(f"⚠️  [{attempt}/{retries}] Unexpected status: {status} · {policy.title(response) or failure.value} · {url}")
 
-                if attempt == 5:
-                    logger.error(f"⚠  [{attempt}/{retries}] Не удалсоь выполнить запрос. Status: {RED}{status}{WHITE} · {response.split('See')[0]}")
-                await asyncio.sleep(delay)
+            if proxy and failure in policy.switch_proxy:
+                exclude.add(proxy)
 
-            else:
-                try:
-                    offer_id = url.strip('/').split('/')[-2]
-                    offer_url = f"https://www.olx.ua/{offer_id}"
-
-                    html = self._get_html(response)
-                    tab_title = html.select_one('title').get_text()
-                    if 'satisfied' in tab_title:
-                        logger.debug(f"⚠️  Запрос был отклонен CloudFront. {tab_title} · {offer_url}")
-                    else:
-                        logger.error(f"⚠️  {tab_title} · {offer_url}")
-                except:
-                    logger.error(f"⚠️  Unexpected status: {status} · {url}")
+            if attempt == retries:
+                logger.error(f"⚠  [{attempt}/{retries}] Не удалось выполнить запрос. Status: {RED}{status}{WHITE} · {failure.value} · {url}")
+                break
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.error(f"⚠  [{attempt}/{retries}] Истекло время на запрос ({policy.deadline:.0f}c) · {failure.value} · {url}")
+                break
+
+            delay = min(policy.backoff(failure, attempt, reply), remaining)
+            retry_stats.retry(endpoint, failure, delay)
+            if delay:
                 await asyncio.sleep(delay)
 
         return {}
@@ -191,15 +313,11 @@ class olxParser:
 
         response = await self._make_request(category_url)
 
-        html = self._get_html(response)
-
-        script_text = next((item.get_text(strip=True) for item in html.find_all('script') if item.get('id') == 'olx-init-config'), None)
-        match = re.search(r'window.__PRERENDERED_STATE__= (".*?");(?:\r\n|\r|\n)', script_text, re.DOTALL)
-        if match:
-            data = json.loads(json.loads(match.group(1)))
+        data = self._find_json(response)
+        if data:
             return data.get('listing', {}).get('listing', {}).get('totalPages', 0)
 
-    async def _get_offers_count(self, category_id: int, region_id: int = None, city_id: int = None, facet_field: str = 'region') -> OffersMeta | None:
+    async def _get_offers_count(self, category_id: int, region_id: int = None, city_id: int = None, facet_field: str = 'region', filters: dict = None) -> OffersMeta | None:
         """
         Получает общее, видимое и количество объявлений в регионах по ID Категории. И дополнительно по ID Региона и ID Города
 
@@ -207,6 +325,7 @@ class olxParser:
         :param region_id: ID Региона
         :param category_id: ID Категории
         :param facet_field: Где показывать количество, по регионам или районам (region,  district)
+        :param filters: Дополнительные фильтры запроса (район, диапазон цены)
         """
         headers = {'accept-language': 'ru'}
 
@@ -225,8 +344,10 @@ class olxParser:
             params['region_id'] = region_id
         if city_id:
             params['city_id'] = city_id
+        if filters:
+            params.update(filters)
 
-        url = str(URL('https://www.olx.ua/api/v1/offers/metadata/search/').with_query(params))
+        url = str(URL(f'{self.__base_url}/api/v1/offers/metadata/search/').with_query(params))
         response = await self._make_request(url, headers, json_response=True)
 
         if 'error' in response:
@@ -238,12 +359,12 @@ class olxParser:
 
         data = response.get('data', {})
         regions = [
-            Region(id=item.get('id'), count=item.get('count'), name=item.get('label'), url=f"https://www.olx.ua/{item.get('url').strip('/')}")
+            Region(id=item.get('id'), count=item.get('count'), name=item.get('label'), url=f"{self.__base_url}/{item.get('url').strip('/')}")
             for item
             in data.get('facets', {}).get(facet_field, [])
         ]
 
-        if self._save_json:
+        if self._save_json and not filters:
             save_json(data, os.path.join(self.out_dir, f'category_{category_id}_{region_id}_{city_id}__offers_count.json'))
         return OffersMeta(data.get('visible_total_count'), data.get('total_count'), regions)
 
@@ -261,9 +382,9 @@ class olxParser:
             'advertising_test_token': '',
         }
 
-        url = str(URL('https://www.olx.ua/api/v1/targeting/data/').with_query(params))
-        response = await self._make_request(url, json_response=True)
-        targeting = response.get('data', {}).get('targeting', [])
+        url = str(URL(f'{self.__base_url}/api/v1/targeting/data/').with_query(params))
+        response = await self._make_request(url, json_response=True, cache_ttl=app_config.CACHE_TTL)
+        targeting = response.get('data', {}).get('targeting') or {}
         return ' > '.join([v for k, v in targeting.items() if 'name' in k])
 
     async def _get_offer_id(self, url: str) -> OfferID:
@@ -276,32 +397,24 @@ class olxParser:
         """
         response = await self._make_request(url)
 
-        html = self._get_html(response)
-        script_text = next((item.get_text(strip=True) for item in html.find_all('script') if '@type' in item.text), None)
-
         try:
-            data = json.loads(script_text)
+            data = ld_json(response)
+            if data is None:
+                html = self._get_html(response)
+                script_text = next((item.get_text(strip=True) for item in html.find_all('script') if '@type' in item.text), None)
+                data = loads(script_text)
             ad_id = data.get('sku')
             return OfferID(value=ad_id)
         except Exception as e:
             logger.error(f"Failed to get ad_id. Error: {e} · {url}")
 
-    async def _offers_from_first_page(self, category_id: int, region_id: int = None, city_id: int = None) -> tuple[list, str | None]:
-        """
-        Получает объявления с первой страницы через API и возвращает ссылку на следующую страницу (если есть).
-
-        Формирует запрос с параметрами фильтрации по категории, региону и городу, отправляет его,
-        извлекает список объявлений и ссылку на следующую страницу из ответа.
-
-        :param category_id: Идентификатор категории.
-        :param region_id: (Необязательный) ID региона.
-        :param city_id: (Необязательный) ID города.
+    def _progress(self, total: int) -> tqdm:
+        return tqdm(total=total, desc=self._txt_all_offers, bar_format=self._bar, ncols=self._cols, leave=False, ascii=self._ascii, disable=not self.show_progress)
 
-        :return: Кортеж из списка объявлений (сырой формат) и URL следующей страницы (или None).
-        """
+    def _listing_params(self, category_id: int, region_id: int = None, city_id: int = None) -> dict:
+        """Параметры запроса списка объявлений по категории, региону и городу (без offset)"""
         params = {
-            'offset': '0',
-            'limit': '40',
+            'limit': str(max_limit),
             'category_id': category_id,
             'currency': 'UAH',
             'filter_refiners': 'spell_checker',
@@ -311,13 +424,229 @@ class olxParser:
             params['region_id'] = region_id
         if city_id:
             params['city_id'] = city_id
+        return params
+
+    def _listing_url(self, params: dict, page_offset: int = 0) -> str:
+        return str(URL(self.__api_offers_url).with_query({'offset': str(page_offset), **params}))
+
+    @staticmethod
+    def _page_offsets(total: int, page_limit: int = max_limit) -> list[int]:
+        """
+        Возвращает offset всех страниц после первой.
+        API не отдает объявления дальше `offset` (1000), поэтому страницы за этой границей не запрашиваются.
 
-        url = str(URL(self.__api_offers_url).with_query(params))
-        response = await self._make_request(url, json_response=True)
-        offers = response.get('data')
+        :param total: Количество видимых объявлений.
+        :param page_limit: Размер страницы.
+        """
+        return list(range(page_limit, min(total, offset), page_limit))
+
+    async def _offers_from_first_page(self, params: dict) -> tuple[list, OffersMeta, dict]:
+        """
+        Получает объявления с первой страницы через API, количество объявлений и фасеты.
 
-        next_page = response.get('links', {}).get('next', {}).get('href')
-        return offers, next_page
+        Количество берется из `metadata` ответа, а если его там нет - отдельным запросом к `/offers/metadata/search/`
+        с теми же фильтрами (район, подкатегория, диапазон цены), что и у запроса списка.
+
+        :param params: Параметры запроса (см. `_listing_params`).
+
+        :return: Кортеж из списка объявлений (сырой формат), количества объявлений (`OffersMeta`) и фасетов (district и т.д.).
+        """
+        response = await self._make_request(self._listing_url(params), json_response=True)
+        offers = response.get('data') or []
+
+        metadata = response.get('metadata') or {}
+        facets = metadata.get('facets') or {}
+        total, visible_total = metadata.get('total_elements'), metadata.get('visible_total_count')
+
+        if visible_total is None and offers:
+            filters = {key: params[key] for key in ('currency', 'district_id', 'filter_float_price:from', 'filter_float_price:to') if key in params}
+            offers_count = await self._get_offers_count(params['category_id'], params.get('region_id'), params.get('city_id'), filters=filters)
+            if offers_count:
+                # `_get_offers_count` возвращает видимое количество первым
+                total, visible_total = offers_count.visible_total, offers_count.total
+            else:
+                visible_total = len(offers)
+
+        visible_total = visible_total or 0
+        return offers, OffersMeta(total if total is not None else visible_total, visible_total, []), facets
+
+    async def _partition_children(self, params: dict, meta: OffersMeta, facets: dict, by_price_only: bool = False) -> list[dict]:
+        """
+        Делит запрос на несколько запросов меньшего размера, которые вместе покрывают исходный.
+
+        По порядку пробует: районы (фасет `district`, если районы покрывают все объявления),
+        подкатегории (по `parent_id` из `get_categories`) и диапазон цены (деление пополам).
+
+        :param params: Параметры запроса.
+        :param meta: Количество объявлений по запросу.
+        :param facets: Фасеты из ответа первой страницы.
+        :param by_price_only: Делить только по цене (глубина деления по районам и подкатегориям исчерпана).
+        :return: Список параметров дочерних запросов или пустой список, если делить больше нечего.
+        """
+        districts = facets.get('district') or []
+        if not by_price_only and 'district_id' not in params and districts and sum(d.get('count') or 0 for d in districts) >= meta.total:
+            return [{**params, 'district_id': d.get('id')} for d in districts if d.get('count')]
+
+        if not by_price_only and 'filter_float_price:from' not in params:
+            if self._categories is None:
+                try:
+                    self._categories = await self.get_categories()
+                except AttributeError:
+                    logger.warning('⚠️  Не удалось получить список категорий, подкатегории не используются')
+                    self._categories = []
+            subcategories = [c.id for c in self._categories if c.parent_id == int(params['category_id'])]
+            if subcategories:
+                return [{**params, 'category_id': category_id} for category_id in subcategories]
+
+        # Диапазоны цены полуоткрытые [from, to): в запросе верхняя граница на копейку меньше (фильтр API включает обе границы),
+        # поэтому объявление с ценой на границе попадает только в одну часть
+        price_from = float(params.get('filter_float_price:from', 0))
+        price_to = params.get('filter_float_price:to')
+
+        if price_to is None:
+            step = max(self._price_step, price_from)
+            bounds = [(price_from, price_from + step), (price_from + step, None)]
+        else:
+            price_to = round(float(price_to) + 0.01)
+            if price_to - price_from <= 1:
+                return []
+            middle = round((price_from + price_to) / 2)
+            bounds = [(price_from, middle), (middle, price_to)]
+
+        children = []
+        for low, high in bounds:
+            child = {**params, 'filter_float_price:from': f'{low:.0f}'}
+            if high is not None:
+                child['filter_float_price:to'] = f'{high - 0.01:.2f}'
+            children.append(child)
+        return children
+
+    async def _plan_partitions(self, params: dict, depth: int = 0, price_depth: int = 0) -> list[tuple[dict, list, OffersMeta]]:
+        """
+        Рекурсивно делит запрос, пока количество объявлений в каждой части не станет меньше ограничения API (`offset`).
+
+        Глубина деления по районам и подкатегориям (`_max_partition_depth`) и по цене (`_max_price_depth`) считается отдельно,
+        поэтому длинный хвост цен не упирается в общий предел. Объявления без цены (бесплатно, обмен, договорная)
+        не попадают ни в один диапазон цены, а отдельного фильтра для них в API нет, поэтому их количество
+        (разница между запросом и суммой диапазонов) только выводится в лог.
+
+        :param params: Параметры запроса.
+        :param depth: Глубина деления по районам и подкатегориям.
+        :param price_depth: Глубина деления по цене.
+        :return: Список частей: параметры запроса, объявления с первой страницы и количество объявлений.
+        """
+        offers, meta, facets = await self._offers_from_first_page(params)
+        if meta.total <= offset:
+            return [(params, offers, meta)]
+
+        by_price_only = depth >= self._max_partition_depth
+        children = await self._partition_children(params, meta, facets, by_price_only) if price_depth < self._max_price_depth else []
+        if not children:
+            logger.warning(f"⚠️  Не удалось разделить запрос, будет получено {offset} из {meta.total} объявлений · {params}")
+            return [(params, offers, meta)]
+
+        price = ('filter_float_price:from', 'filter_float_price:to')
+        by_price = any(child.get(key) != params.get(key) for child in children for key in price)
+
+        logger.debug(f"✂️  {meta.total} объявлений · Делим запрос на {len(children)} частей · {params}")
+        parts = await asyncio.gather(*[
+            self._plan_partitions(child, depth, price_depth + 1) if by_price else self._plan_partitions(child, depth + 1, price_depth)
+            for child in children
+        ])
+        leaves = [leaf for part in parts for leaf in part]
+
+        if by_price and 'filter_float_price:from' not in params:
+            missing = meta.total - sum(leaf_meta.total for _, _, leaf_meta in leaves)
+            if missing > 0:
+                logger.warning(f"⚠️  Объявлений без цены: {missing} · Они не попадают в диапазоны цены и не будут собраны · {params}")
+        return leaves
+
+    async def _new_offers(self, params: dict, since: Watermark, snapshot: CategorySnapshot = None) -> list[dict] | None:
+        """
+        Загружает объявления от новых к старым (`sort_by=created_at:desc`) по одной странице,
+        пока не встретится объявление из прошлого сбора. Платные объявления (`top_ad`) показываются вне порядка,
+        поэтому на них сбор не останавливается.
+
+        :param params: Параметры запроса (см. `_listing_params`).
+        :param since: Отметка прошлого сбора категории.
+        :param snapshot: (Необязательный) Сюда записывается количество объявлений из метаданных первой страницы.
+        :return: Новые объявления (сырой формат) или None, если новых объявлений больше, чем отдает API (`offset`).
+        """
+        params = {**params, 'sort_by': 'created_at:desc'}
+        new_offers = []
+
+        for page_offset in range(0, offset, max_limit):
+            response = await self._make_request(self._listing_url(params, page_offset), json_response=True)
+            if not isinstance(response, dict) or 'data' not in response:
+                raise RuntimeError(f"Не удалось загрузить страницу новых объявлений · offset {page_offset}")
+            if snapshot is not None:
+                snapshot.total = (response.get('metadata') or {}).get('total_elements') or snapshot.total
+                snapshot.pages += 1
+
+            offers_raw = response.get('data') or []
+            for offer in offers_raw:
+                is_known = since.is_known(offer)
+                if (offer.get('promotion') or {}).get('top_ad'):
+                    if not is_known:
+                        new_offers.append(offer)
+                    continue
+                if is_known:
+                    return self._unique(new_offers)
+                new_offers.append(offer)
+
+            if len(offers_raw) < max_limit:
+                return self._unique(new_offers)
+
+        return None
+
+    @staticmethod
+    def _unique(offers_raw: list[dict]) -> list[dict]:
+        """Убирает повторы объявлений по ID, сохраняя порядок"""
+        seen_ids = set()
+        unique = []
+        for offer in offers_raw:
+            if offer.get('id') not in seen_ids:
+                seen_ids.add(offer.get('id'))
+                unique.append(offer)
+        return unique
+
+    async def _iter_pages(self, urls: list[str], progress: tqdm = None, json_response: bool = True) -> AsyncIterator[dict | str]:
+        """
+        Загружает страницы параллельно и отдает ответы в порядке страниц.
+
+        Одновременно загружается не больше `self._workers` страниц: следующая страница ставится в работу,
+        когда отдана очередная. Если потребитель прекратил чтение, то незавершенные загрузки отменяются.
+
+        :param urls: Ссылки на страницы по порядку.
+        :param progress: Общий прогресс-бар (если не передан, то создается свой).
+        :param json_response: Ответы в JSON (True) или HTML (False).
+        """
+        pending = deque()
+        own_progress = progress is None
+        if own_progress:
+            progress = self._progress(len(urls))
+        urls = iter(urls)
+
+        def schedule():
+            url = next(urls, None)
+            if url is not None:
+                pending.append(asyncio.create_task(self._make_request(url, json_response=json_response)))
+
+        try:
+            for _ in range(self._workers):
+                schedule()
+
+            while pending:
+                response = await pending.popleft()
+                schedule()
+                progress.update()
+                yield response
+
+        finally:
+            for task in pending:
+                task.cancel()
+            if own_progress:
+                progress.close()
 
     def merge_parsed_files(self, xsls_files: list[str]):
         parts = xsls_files[0].split('\\')
@@ -327,56 +656,87 @@ class olxParser:
 
         merge_city_offers(self._bar, self.data_dir, region_name, region_id, city_name, city_id, force=True)
 
-    async def get_phone_number(self, ad_id: OfferID, response_only: bool = None) -> str | dict | Exception:
+    async def _phones_request(self, url: str, headers: dict, exclude: set[str] = None) -> tuple[dict, Account]:
+        """
+        Запрашивает номера через наименее загруженный аккаунт из `account_pool` (с его токеном и прокси)
+        и учитывает результат для статистики капчи аккаунта
+
+        :param url: Ссылка `limited-phones`.
+        :param headers: Заголовки запроса (без токена).
+        :param exclude: Аккаунты, которые не нужно использовать (если есть другие).
+        :return: Ответ API и аккаунт, через который он получен.
+        """
+        async with account_pool.lease(exclude) as account:
+            headers = {**headers, 'authorization': await account.tokens.get()}
+            data = await self._make_request(url, headers, json_response=True, use_proxy=True, proxies=account.proxies, tokens=account.tokens)
+
+        error_detail = data.get('error', {}).get('detail') if isinstance(data, dict) and 'error' in data else None
+        if data == {} or self._retry_policy.is_captcha(data):
+            account_pool.outcome(account, 'captcha')
+        elif error_detail == 'Disallowed for this user':
+            account_pool.outcome(account, 'disallowed')
+        elif error_detail == 'invalid_token':
+            account_pool.outcome(account, 'error')
+            await account.tokens.invalidate(headers['authorization'])
+        else:
+            account_pool.outcome(account, 'ok' if error_detail is None else 'error')
+
+        return data, account
+
+    async def get_phone_number(self, ad_id: OfferID, response_only: bool = None, accounts: set[str] = None) -> str | dict | Exception:
         """
         Асинхронно получает номера телефонов для объявления по его ID через API.
-        Автоматически обновляет токен, если он устарел.
+        Запросы распределяются между аккаунтами `account_pool`, токен каждого аккаунта берется из памяти и обновляется в фоне.
+        Количество одновременных запросов ограничивает `limiters` (группа phones).
+
+        :param accounts: (Необязательный) Аккаунты, через которые номер уже запрашивался. Запрос идет через другой аккаунт
+                         (если есть), а использованный аккаунт добавляется в множество.
         """
         phones = []
         url = f'{self.__base_url}/api/v1/offers/{ad_id}/limited-phones/'
 
         try:
-            async with self._semaphore:
-                headers = {
-                    'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-                    'accept-language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
-                    'authorization': await get_token(),
-                    'cache-control': 'no-cache',
-                    'pragma': 'no-cache',
-                    'priority': 'u=0, i',
-                    'sec-ch-ua': '"Google Chrome";v="137", "Chromium";v="137", "Not/A)Brand";v="24"',
-                    'sec-ch-ua-mobile': '?0',
-                    'sec-ch-ua-platform': '"Windows"',
-                    'sec-fetch-dest': 'document',
-                    'sec-fetch-mode': 'navigate',
-                    'sec-fetch-site': 'none',
-                    'sec-fetch-user': '?1',
-                    'upgrade-insecure-requests': '1',
-                    'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
-                }
-
-                data = await self._make_request(url, headers, json_response=True, use_proxy=True)
+            headers = {
+                'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+                'accept-language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
+                'cache-control': 'no-cache',
+                'pragma': 'no-cache',
+                'priority': 'u=0, i',
+                'sec-ch-ua': '"Google Chrome";v="137", "Chromium";v="137", "Not/A)Brand";v="24"',
+                'sec-ch-ua-mobile': '?0',
+                'sec-ch-ua-platform': '"Windows"',
+                'sec-fetch-dest': 'document',
+                'sec-fetch-mode': 'navigate',
+                'sec-fetch-site': 'none',
+                'sec-fetch-user': '?1',
+                'upgrade-insecure-requests': '1',
+                'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
+            }
 
-                if response_only:
-                    return data
+            data, account = await self._phones_request(url, headers, accounts)
+            if accounts is not None:
+                accounts.add(account.user)
 
-                if 'error' in data:
-                    error = data.get('error', {})
-                    error_detail = error.get('detail')
+            if response_only:
+                return data
 
-                    if error_detail in ['invalid_token', 'Disallowed for this user']:
-                        # Повторный запрос с новым токеном
-                        headers['authorization'] = await get_token(show_info=False)
-                        data_2 = await self._make_request(url, headers, json_response=True, use_proxy=True)
-                        phones = data_2.get('data', {}).get('phones', [])
+            if 'error' in data:
+                error = data.get('error', {})
+                error_detail = error.get('detail')
 
-                    else:
-                        logger.debug(f"⛔  Failed to get phone_numbers: {data}")
+                if error_detail in ['invalid_token', 'Disallowed for this user']:
+                    # Повторный запрос с новым токеном или через другой аккаунт
+                    exclude = {account.user} if error_detail == 'Disallowed for this user' else None
+                    data_2, _ = await self._phones_request(url, headers, exclude)
+                    phones = data_2.get('data', {}).get('phones', [])
 
                 else:
-                    phones = data.get('data', {}).get('phones', [])
+                    logger.debug(f"⛔  Failed to get phone_numbers: {data}")
 
-                return ' · '.join([str(p) for p in phones]) if phones else ''
+            else:
+                phones = data.get('data', {}).get('phones', [])
+
+            return ' · '.join([str(p) for p in phones]) if phones else ''
 
         except Exception as e:
             logger.debug(f"⚠️  Failed to get phone_numbers: {self.__api_offers_url}/{ad_id}")
@@ -394,8 +754,8 @@ class olxParser:
         if city_id:
             params['city_id'] = city_id
 
-        url = str(URL('https://www.olx.ua/api/v1/offers/metadata/search-categories/').with_query(params))
-        response = await self._make_request(url, headers, json_response=True)
+        url = str(URL(f'{self.__base_url}/api/v1/offers/metadata/search-categories/').with_query(params))
+        response = await self._make_request(url, headers, json_response=True, cache_ttl=min(app_config.CACHE_TTL, self._counts_cache_ttl))
         data = response.get('data', {}).get('categories', [])
 
         if sorting_by == 'id':
@@ -419,7 +779,7 @@ class olxParser:
             'query': 'query InventoryMetadata {\n  categories {\n    id\n    name\n    parent_id\n  }\n}',
         }
         url = 'https://production-graphql.eu-sharedservices.olxcdn.com/graphql'
-        response = await self._make_request(url, payload=payload, json_response=True)
+        response = await self._make_request(url, payload=payload, json_response=True, cache_ttl=app_config.CACHE_TTL)
         data = response.get('data').get('categories')
         return [Category(item.get('id'), item.get('name'), 0, item.get('parent_id')) for item in data]
 
@@ -428,7 +788,7 @@ class olxParser:
         Получает ID и TITLE категории по URL (https://www.olx.ua/nedvizhimost/kvartiry/)
         """
         breadcrumb = urlparse(url).path.strip('/').replace('/', ',')
-        url = f"https://www.olx.ua/api/v1/friendly-links/query-params/{breadcrumb}"
+        url = f"{self.__base_url}/api/v1/friendly-links/query-params/{breadcrumb}"
         data = await self._make_request(url, json_response=True)
 
         category_id = data.get('data').get('category_id')
@@ -442,9 +802,9 @@ class olxParser:
 
         :param sorting_by: Сортировка (id, name)
         """
-        url = 'https://www.olx.ua/api/v1/geo-encoder/regions/'
+        url = f'{self.__base_url}/api/v1/geo-encoder/regions/'
 
-        response = await self._make_request(url, json_response=True)
+        response = await self._make_request(url, json_response=True, cache_ttl=app_config.CACHE_TTL)
         data = response.get('data', [])
 
         if sorting_by == 'id':
@@ -465,9 +825,9 @@ class olxParser:
         :param region: ID региона 1-25
         :param sorting_by: Сортировка (id, name)
         """
-        url = f'https://www.olx.ua/api/v1/geo-encoder/regions/{region.id}/cities/?limit=5000'
+        url = f'{self.__base_url}/api/v1/geo-encoder/regions/{region.id}/cities/?limit=5000'
 
-        response = await self._make_request(url, json_response=True)
+        response = await self._make_request(url, json_response=True, cache_ttl=app_config.CACHE_TTL)
         data = response.get('data')
 
         if sorting_by == 'id':
@@ -543,7 +903,7 @@ class olxParser:
             }
         }
 
-        url = 'https://www.olx.ua/apigateway/graphql'
+        url = f'{self.__base_url}/apigateway/graphql'
         response = await self._make_request(url, payload=payload, json_response=True)
         data = response.get('data', {})
 
@@ -591,16 +951,10 @@ class olxParser:
         self._category_url = category_url
 
         total_pages = await self._pagination(category_url)
-        tasks = [
-            self._make_request(f'{category_url}/?page={page + 1}')
-            for page
-            in range(total_pages)
-        ]
+        urls = [f'{category_url}/?page={page + 1}' for page in range(total_pages)]
 
-        results = await tqdm_asyncio.gather(*tasks, desc=self._txt_all_offers, bar_format=self._bar, ncols=self._cols, leave=False, ascii=self._ascii)
-        for response in results:
-            html = self._get_html(response)
-            data = self._find_json(html)
+        async for response in self._iter_pages(urls, json_response=False):
+            data = self._find_json(response)
 
             products = data.get('listing', {}).get('listing', {}).get('ads', [])
             for n, product in enumerate(products):
@@ -618,52 +972,171 @@ class olxParser:
             await save_json(result, os.path.join(self.out_dir, 'urls.json'))
         return result
 
-    async def get_offers_from_api(self, category_id: int, region_id: int = None, city_id: int = None) -> list[Offer]:
+    async def get_offers_from_api(self, category_id: int, region_id: int = None, city_id: int = None, unit_id: str = None, incremental: bool = False, snapshot: CategorySnapshot = None) -> list[Offer]:
         """
-        Получает все объявления из API, проходя по всем страницам результата.
-
-        Выполняет первый запрос к API и получает ссылки на следующие страницы.
-        Загружает остальные страницы параллельно, собирает все результаты и форматирует их в список объектов `Offer`.
+        Получает все объявления из API, проходя по всем страницам результата (см. `iter_offers_from_api`).
 
         :param category_id: Идентификатор категории товаров.
         :param region_id: (Необязательный) Идентификатор региона.
         :param city_id: (Необязательный) Идентификатор города.
+        :param unit_id: (Необязательный) ID единицы работы в журнале.
+        :param incremental: (Необязательный) Собрать только новые объявления.
+        :param snapshot: (Необязательный) Количество объявлений и страниц категории (см. `iter_offers_from_api`).
 
         :return: Список отформатированных объявлений (`Offer`).
         """
-        all_offers_raw = []
-        page = 0
+        offers = []
+        async for batch in self.iter_offers_from_api(category_id, region_id, city_id, unit_id, incremental, snapshot):
+            offers.extend(batch)
+        return offers
 
-        offers, next_page = await self._offers_from_first_page(category_id, region_id, city_id)
-        all_offers_raw.extend(offers or [])
+    async def iter_offers_from_api(self, category_id: int, region_id: int = None, city_id: int = None, unit_id: str = None, incremental: bool = False, snapshot: CategorySnapshot = None, watermark: bool = True) -> AsyncIterator[list[Offer]]:
+        """
+        Получает все объявления из API и отдает их пачками (по странице) по мере загрузки.
 
-        page_urls = []
-        while next_page:
-            page += 1
-            page_urls.append(next_page)
-            response = await self._make_request(next_page, json_response=True)
-            next_page = response.get('links', {}).get('next', {}).get('href')
-            print(f"\r🔄  Страница {page}", end='', flush=True)
+        По первой странице определяется количество объявлений, после чего ссылки на все остальные страницы
+        строятся сразу (offset/limit с максимальным `limit`) и загружаются параллельно, каждая по одному разу.
+        Если объявлений больше, чем API отдает по одному запросу (`offset`), запрос делится на части
+        (`_plan_partitions`), части загружаются параллельно, а повторы убираются по ID объявления.
 
-        tasks = [
-            self._make_request(url, json_response=True)
-            for url
-            in page_urls
-        ]
-        results = await tqdm_asyncio.gather(*tasks, desc=self._txt_all_offers, bar_format=self._bar, ncols=self._cols, leave=False, ascii=self._ascii)
+        Загрузка и форматирование связаны ограниченной очередью: если потребитель (например, запись в файл) не успевает,
+        то загрузка новых страниц приостанавливается, поэтому в памяти одновременно находится не больше нескольких страниц
+        независимо от размера категории. JSON ответа разбирается сразу при получении (`fetch`).
 
-        for response in results:
-            all_offers_raw.extend(response.get('data', {}))
+        Если передан `unit_id`, то все страницы и их состояние записываются в журнал (`journal`): при повторном запуске
+        запрос заново не делится, загруженные страницы берутся из журнала, а загружаются только незавершенные и неудачные.
 
-        return [self._format_offer(offer) for offer in all_offers_raw]
+        После полного сбора в журнале запоминается отметка категории (`Watermark`). Если передан `incremental` и отметка есть,
+        то загружаются только объявления, появившиеся после прошлого сбора (`_new_offers`).
 
-    async def parse_phones_from_file(self, filename: str, show_info: bool = None):
+        Количество объявлений берется из метаданных первых страниц, которые все равно загружаются, поэтому отдельный запрос
+        к `/offers/metadata/search/` не нужен. Если передан `snapshot`, то в него записываются количество объявлений
+        (всего и доступных для сбора) и количество страниц. При продолжении сбора по журналу доступными считаются собранные объявления.
+
+        :param category_id: Идентификатор категории товаров.
+        :param region_id: (Необязательный) Идентификатор региона.
+        :param city_id: (Необязательный) Идентификатор города.
+        :param unit_id: (Необязательный) ID единицы работы в журнале.
+        :param incremental: (Необязательный) Собрать только новые объявления.
+        :param snapshot: (Необязательный) Количество объявлений и страниц категории, заполняется при сборе.
+        :param watermark: (Необязательный) Записать отметку категории в журнал. Воркер распределенного сбора
+                          не пишет ее в свой журнал, а отправляет координатору (`snapshot.newest`).
         """
-        Парсит номера телефонов из указанного Excel-файла.
+        snapshot = snapshot if snapshot is not None else CategorySnapshot()
+        params = self._listing_params(category_id, region_id, city_id)
+        watermark_key = f'{region_id}:{city_id}:{category_id}'
+
+        since = journal.watermark(watermark_key) if incremental else None
+        if since:
+            new_offers = await self._new_offers(params, since, snapshot)
+            if new_offers is not None:
+                snapshot.visible_total = len(new_offers)
+                journal.set_watermark(watermark_key, new_offers, since, keep=self._watermark_size)
+                if new_offers:
+                    yield [self._format_offer(offer) for offer in new_offers]
+                return
+            logger.warning(f"⚠️  Новых объявлений больше {offset}, категория будет собрана полностью · {watermark_key}")
+            snapshot.pages = 0
+
+        pages = journal.pages(unit_id) if unit_id else []
+        first_pages = {}
+        if not pages:
+            for part_params, first_page, meta in await self._plan_partitions(params):
+                snapshot.total += meta.total
+                snapshot.visible_total += min(meta.visible_total, offset)
+                first_pages[self._listing_url(part_params)] = first_page
+                pages.append((self._listing_url(part_params), 0, DONE))
+                pages.extend((self._listing_url(part_params, page_offset), page_offset, PENDING) for page_offset in self._page_offsets(meta.visible_total))
+
+            if unit_id:
+                journal.plan_pages(unit_id, [(url, page_offset) for url, page_offset, _ in pages])
+                for url, first_page in first_pages.items():
+                    journal.finish_page(unit_id, url, first_page)
+
+        snapshot.pages += len(pages)
+
+        # Страницы идут по частям запроса: каждая часть начинается с первой страницы (offset 0)
+        parts: list[list[str]] = []
+        loaded_urls = []
+        for url, page_offset, state in pages:
+            if page_offset == 0 or not parts:
+                parts.append([])
+            if state == DONE:
+                loaded_urls.append(url)
+            else:
+                parts[-1].append(url)
+
+        urls = [url for part in parts for url in part]
+        if unit_id and urls:
+            journal.start_pages(unit_id, urls)
+        progress = self._progress(len(urls))
+
+        raw_pages: asyncio.Queue[list[dict] | None] = asyncio.Queue(maxsize=self._workers * 2)
+        failed_urls = []
+
+        async def crawl(page_urls: list[str]):
+            n = 0
+            async for response in self._iter_pages(page_urls, progress):
+                url = page_urls[n]
+                n += 1
+                if isinstance(response, dict) and 'data' in response:
+                    if unit_id:
+                        journal.finish_page(unit_id, url, response.get('data') or [])
+                    await raw_pages.put(response.get('data') or [])
+                else:
+                    failed_urls.append(url)
+                    if unit_id:
+                        journal.fail_page(unit_id, url, str(response)[:200])
+
+        async def produce():
+            try:
+                for url in loaded_urls:
+                    await raw_pages.put(first_pages[url] if url in first_pages else journal.page_offers(unit_id, url))
+                await asyncio.gather(*[crawl(part) for part in parts if part])
+            except Exception:
+                await raw_pages.put(None)
+                raise
+            await raw_pages.put(None)
+
+        producer = asyncio.create_task(produce())
+        seen_ids = set()
+        newest = []
+        try:
+            while (offers_raw := await raw_pages.get()) is not None:
+                batch = []
+                for offer in offers_raw:
+                    if offer.get('id') in seen_ids:
+                        continue
+                    seen_ids.add(offer.get('id'))
+                    batch.append(self._format_offer(offer))
+
+                    # Для отметки категории достаточно самых новых объявлений
+                    if offer.get('created_time'):
+                        item = (datetime.fromisoformat(offer['created_time']), offer.get('id'), offer['created_time'])
+                        if len(newest) < self._watermark_size:
+                            heapq.heappush(newest, item)
+                        elif item > newest[0]:
+                            heapq.heapreplace(newest, item)
+                if batch:
+                    yield batch
+            await producer
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+            progress.close()
+
+        if not snapshot.visible_total:
+            snapshot.total = snapshot.visible_total = len(seen_ids)
+
+        if not failed_urls:
+            snapshot.newest = [{'id': offer_id, 'created_time': created} for _, offer_id, created in newest]
+            if watermark:
+                journal.set_watermark(watermark_key, snapshot.newest, keep=self._watermark_size)
 
-        Открывает файл, считывает данные с первого листа начиная со второй строки,
-        параллельно обрабатывает каждую строку (через `process_cell`), обновляет книгу и сохраняет изменения.
-        По завершении переименовывает файл, выводит информацию и предлагает пользователю завершить или перезапустить процесс.
+    async def parse_phones_from_file(self, filename: str, show_info: bool = None):
+        """
+        Парсит номера телефонов из указанного Excel-файла (см. `parse_phones_from_files`).
+        По завершении файл переименовывается в `+ <имя файла>`.
 
         :param filename: Имя Excel-файла для обработки (в директории `data`).
         :param show_info: Флаг для вывода информационных сообщений и прогресса.
@@ -676,154 +1149,357 @@ class olxParser:
                 logger.info(f"🔴  Использование прокси {LIGHT_RED}ОТКЛЮЧЕНО{WHITE}")
             time.sleep(3)
 
-        # Путь до merged таблицы
-        wb_path = os.path.join(self.data_dir, filename)
-
-        # Открываем файл и делаем первую страницу активной
-        with yaspin(text="Чтение файла") as spinner:
-            wb = load_workbook(wb_path)
-            ws = wb.active
-            time.sleep(1)
-            spinner.stop()
-
-        # Добавляем стили ячеек в книгу
-        register_styles(wb)
+        await self.parse_phones_from_files([filename])
 
-        # Получаем офферы из таблицы начиная со второй строки и до конца в виде списка
-        offers_data = list(ws.iter_rows(min_row=2, values_only=True))
-        counter = {'value': 0}
-
-        tasks = [
-            process_cell(self, n, item, len(offers_data), counter, ws, wb, wb_path)
-            for n, item
-            in enumerate(offers_data)
-        ]
+        if show_info:
+            os.startfile(os.path.join(self.data_dir, os.path.dirname(filename)))
 
-        for coro in asyncio.as_completed(tasks):
-            await coro
+    async def parse_phones_from_files(self, filenames: list[str]):
+        """
+        Парсит номера телефонов из нескольких Excel-файлов одним пулом воркеров.
+
+        Файлы открываются по очереди (в отдельном потоке, пока воркеры обрабатывают строки предыдущих файлов),
+        а строки всех файлов со второй строки подаются в одну ограниченную очередь. Постоянный пул из `PHONE_WORKERS`
+        воркеров обрабатывает строки (через `process_cell`), поэтому пул загружен до конца сбора всего города,
+        а количество корутин и память не зависят от размера файлов.
+        Строки с капчей или ошибкой не занимают воркера ожиданием: они откладываются с растущей паузой (`PHONE_RETRY_DELAY`)
+        и возвращаются в общую очередь вперемешку с новыми строками, повтор идет через другой аккаунт.
+        Каждый файл сохраняется пачками (`PhonesFile`), а как только все его строки обработаны (или закончились попытки,
+        `PHONE_ATTEMPTS`), сохраняется и переименовывается в `+ <имя файла>`, не дожидаясь остальных файлов.
+        Каждые `_phones_report_interval` секунд выводится скорость получения номеров.
+
+        :param filenames: Имена Excel-файлов для обработки (в директории `data`).
+        """
+        workers = app_config.PHONE_WORKERS
+        rows: asyncio.Queue[tuple[PhonesFile, int, tuple, int, set[str]] | None] = asyncio.Queue(maxsize=workers * 2)
+        retries = RetryQueue(app_config.PHONE_ATTEMPTS, app_config.PHONE_RETRY_DELAY)
+        files: list[PhonesFile] = []
+        finalizers: list[asyncio.Task] = []
+        state = {'fed': False, 'saving': 0}
+
+        def finish():
+            """Когда поданы строки всех файлов и все файлы сохранены, воркеры завершаются"""
+            if state['fed'] and all(file.done for file in files) and not state['saving']:
+                for _ in range(workers):
+                    rows.put_nowait(None)
+
+        async def save_file(file: PhonesFile):
+            try:
+                async with file.lock:
+                    await asyncio.to_thread(file.finalize)
+                print(f"💾  {LIGHT_GREEN}{file.name}{WHITE} · Номеров: {file.counter['phones']} / {file.total}")
+            finally:
+                state['saving'] -= 1
+                finish()
+
+        def finalize(file: PhonesFile):
+            # Строк файла больше нет, поэтому книга сохраняется в отдельном потоке, а воркер сразу берет следующую строку.
+            # Последнюю строку могут закрыть и `feed`, и воркер, поэтому файл завершается только один раз
+            if file.finalized:
+                return
+            file.finalized = True
+            state['saving'] += 1
+            finalizers.append(asyncio.create_task(save_file(file)))
+
+        async def feed():
+            for n_file, filename in enumerate(filenames):
+                file = await asyncio.to_thread(PhonesFile, os.path.join(self.data_dir, filename))
+                files.append(file)
+                print(f"[{LIGHT_BLUE}{n_file + 1} / {len(filenames)}{WHITE}]  {file.name} · Строк: {file.total}")
+
+                for n, item in file.rows():
+                    file.open += 1
+                    await rows.put((file, n, item, 1, set()))
+                file.fed = True
+                if file.done:
+                    finalize(file)
+            state['fed'] = True
+            finish()
+
+        async def requeue():
+            while True:
+                await rows.put(await retries.get())
+
+        async def work():
+            while (row := await rows.get()) is not None:
+                file, n, item, attempt, accounts = row
+                if await process_cell(self, n, item, file.total, file.counter, file.ws, file.wb, file.path, save_every_n=None, attempt=attempt, accounts=accounts):
+                    delay = retries.schedule((file, n, item, attempt + 1, accounts), attempt)
+                    if delay is not None:
+                        logger.debug(f"🔁  {file.name} · Строка {n + 2} · Попытка {attempt + 1} через {delay:.0f}c")
+                        continue
+                    print(f"{f'[🔁 {attempt} · {n + 2}]'.ljust(12)}  ❌{RED}  Номер не получен: {WHITE}Попытки закончились ({attempt}) · {item[10]}")
+
+                if file.resolve() and not file.done:
+                    async with file.lock:
+                        await asyncio.to_thread(file.save)
+                    await get_token(exp_time_only=True)
+                if file.done:
+                    finalize(file)
+
+        started = time.monotonic()
+
+        def phones_rate() -> str:
+            elapsed = time.monotonic() - started
+            phones = sum(file.counter['phones'] for file in files)
+            processed = sum(file.counter['value'] for file in files)
+            return (f"📞  Номеров: {LIGHT_GREEN}{phones}{WHITE} · {phones / elapsed if elapsed else 0:.1f} номеров/с · "
+                    f"Строк: {processed} · Файлов: {sum(file.done for file in files)} / {len(filenames)} · Ждут повтора: {len(retries)}")
+
+        async def report():
+            while True:
+                await asyncio.sleep(self._phones_report_interval)
+                logger.info(phones_rate())
+
+        background = [asyncio.create_task(report()), asyncio.create_task(requeue())]
+        tasks = [asyncio.create_task(feed())] + [asyncio.create_task(work()) for _ in range(workers)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in [*tasks, *background]:
+                task.cancel()
+            await asyncio.gather(*tasks, *background, return_exceptions=True)
+        await asyncio.gather(*finalizers)
+        logger.info(phones_rate())
 
-        with yaspin(text="Сохранение") as spinner:
-            wb.save(wb_path)
-            time.sleep(1)
-            spinner.stop()
+    @staticmethod
+    async def _write_offers(batches: AsyncIterator[list[Offer]], writer: OffersWriter, queue_size: int = 4) -> None:
+        """
+        Последний этап конвейера: записывает пачки объявлений в файл в отдельном потоке, пока загружаются следующие страницы.
+        Очередь между загрузкой и записью ограничена `queue_size` пачками.
+        """
+        queue: asyncio.Queue[list[Offer] | None] = asyncio.Queue(maxsize=queue_size)
 
-            completed_wb_path = os.path.join(os.path.dirname(wb_path), f"+ {os.path.basename(wb_path)}")
-            os.rename(wb_path, completed_wb_path)
+        async def write():
+            while (batch := await queue.get()) is not None:
+                await asyncio.to_thread(writer.write, batch)
 
-        if show_info:
-            os.startfile(os.path.join(self.data_dir, os.path.dirname(wb_path)))
+        writer_task = asyncio.create_task(write())
+        try:
+            async for batch in batches:
+                # Если запись упала, то загрузка останавливается сразу, а не ждет места в очереди
+                put = asyncio.create_task(queue.put(batch))
+                await asyncio.wait((put, writer_task), return_when=asyncio.FIRST_COMPLETED)
+                if writer_task.done():
+                    put.cancel()
+                    writer_task.result()
+            await queue.put(None)
+            await writer_task
+            await asyncio.to_thread(writer.close)
+        except BaseException:
+            writer_task.cancel()
+            await asyncio.gather(writer_task, return_exceptions=True)
+            # Останавливает загрузку страниц (и их запись в журнал)
+            if hasattr(batches, 'aclose'):
+                await batches.aclose()
+            writer.abort()
+            raise
 
-    async def run(self, region_id: int = None, city_id: int = None):
+    async def _crawl_category(self, unit: WorkUnit, run: str = None, incremental: bool = False) -> tuple[str, OffersMeta | None]:
         """
-        Запускает парсер объявлений по регионам, городам и категориям.
-
-        Если заданы `region_id` и `city_id`, обрабатывает только указанный регион и город.
-        Иначе последовательно обрабатывает все регионы и города, при этом показывает прогресс с помощью файла `last_indexes.json`.
-        Для каждого региона и города собирает объявления по категориям, сохраняет их и объединяет таблицы.
-        По завершении открывает папку с результатами и позволяет перезапустить или завершить программу через консоль.
-
-        :param region_id: (необязательно) Идентификатор региона для обработки.
-        :param city_id: (необязательно) Идентификатор города для обработки.
+        Собирает и сохраняет объявления одной категории города.
+        Если передан `run`, то единица работы и ее страницы записываются в журнал (`journal`), а если часть страниц
+        не загрузилась, то единица считается неудачной (при следующем запуске загрузятся только эти страницы).
+        Если передан `incremental`, то собираются только новые объявления и добавляются в уже сохраненные файлы категории.
+
+        :param unit: Единица работы (регион, город, категория).
+        :param run: (Необязательный) Ключ запуска в журнале.
+        :param incremental: (Необязательный) Собрать только новые объявления.
+        :return: Название категории и количество объявлений (по метаданным загруженных страниц, см. `iter_offers_from_api`).
         """
-        help_message = f"{'─' * 30}| 📰  {BOLD}{LIGHT_MAGENTA}Найдено{RESET} / 📚  {BOLD}{LIGHT_CYAN}Страниц{RESET} / 📥  {BOLD}{RED}Собрано{RESET}{WHITE} / 📦  Всего собрано |{'─' * 30}"
+        region, city, category = unit.region, unit.city, unit.category
+        logger.debug(f"🏷  {repr(category)}")
 
-        os.system('cls')
-        logger.info('ℹ️  Начинается сбор объявлений для выбранного региона и города')
-        time.sleep(1)
+        unit_id = journal.start_unit(run, unit.key) if run else None
+        snapshot = CategorySnapshot()
+        try:
+            category_name = await self._get_category_name(category.id)
+            if incremental:
+                offers = await self.get_offers_from_api(category.id, region.id, city.id, unit_id, incremental, snapshot)
+                # Объединение с сохраненными файлами читает и перезаписывает всю книгу, поэтому идет в отдельном потоке
+                await asyncio.to_thread(save_offers, offers, region.id, region.name, city.id, city.name, category.id, category_name, self.out_dir, self._save_json, self._save_xls, merge=True)
+            else:
+                writer = OffersWriter(region.id, region.name, city.id, city.name, category.id, category_name, self.out_dir, self._save_json, self._save_xls)
+                await self._write_offers(self.iter_offers_from_api(category.id, region.id, city.id, unit_id, snapshot=snapshot), writer)
 
-        total_collected = 0
+            failed_pages = journal.failed_pages(unit_id) if unit_id else 0
+            if failed_pages:
+                raise RuntimeError(f"Не загружено страниц: {failed_pages}")
+        except Exception as e:
+            if unit_id:
+                journal.fail_unit(unit_id, f"{type(e).__name__}. {e}")
+            raise
 
-        region_key = str(region_id) if region_id is not None else "all"
-        city_key = str(city_id) if city_id is not None else "all"
-        indexes_path = os.path.join(self.data_dir, f"last_indexes_{region_key}_{city_key}.json")
+        if unit_id:
+            journal.finish_unit(unit_id)
+        return category_name, snapshot.meta
+
+    async def _plan_units(self, scheduler: CrawlScheduler, region_id: int = None, city_id: int = None, done: set[str] = None, before: tuple[int, int, int] = None) -> dict[tuple[int, int], int]:
+        """
+        Добавляет в планировщик все (регион, город, категория) с объявлениями, кроме уже собранных
 
-        # Получаем сохранённые индексы (если есть)
-        indexes = open_json(indexes_path) if os.path.exists(indexes_path) else {"region": 0, "city": 0, "category": 0}
-        save_json(indexes, indexes_path)
+        :param done: Ключи уже собранных единиц работы (`WorkUnit.key`).
+        :param before: Позиция (регион, город, категория) из старого файла прогресса `last_indexes_*.json`.
+                       Все категории до нее (в том же порядке обхода) считаются собранными и добавляются в `done`.
+        :return: Количество запланированных категорий в каждом городе {(ID Региона, ID Города): количество}.
+        """
+        done = done if done is not None else set()
 
         regions = await self.get_regions()
         if region_id is not None:
             regions = [r for r in regions if r.id == region_id]
-            indexes["region"] = 0  # сбрасываем прогресс, чтобы начать с начала выбранного региона
-
-        for n_region, region in enumerate(regions):
-            logger.debug(f"🏷  {repr(region)}")
-
-            if n_region < indexes["region"]:
-                continue  # Пропускаем уже обработанные регионы
-
-            print(f"\n[{LIGHT_BLUE}{n_region + 1} / {len(regions)}{WHITE}] |  Регион:  {LIGHT_YELLOW}{region.name.ljust(20)}{WHITE}  🆔  {region.id}")
 
-            cities = await self.get_cities(region)
-            if city_id is not None:
-                cities = [c for c in cities if c.id == city_id]
-                indexes["city"] = 0  # сбрасываем прогресс по городам, чтобы начать с начала выбранного города
+        region_cities = await asyncio.gather(*[self.get_cities(region) for region in regions])
+        pairs = [
+            (region, city, (n_region, n_city))
+            for n_region, (region, cities) in enumerate(zip(regions, region_cities))
+            for n_city, city in enumerate(c for c in cities if city_id is None or c.id == city_id)
+        ]
 
-            if not cities:
-                print(f"❌  Не найден город с ID {city_id}")
-                break
+        city_categories = await asyncio.gather(*[self.get_items_count_for_all_categories(region.id, city.id, region.name, city.name) for region, city, _ in pairs])
 
-            for n_city, city in enumerate(cities):
-                logger.debug(f"🏷  {repr(city)}")
+        remaining = {}
+        for (region, city, position), categories in zip(pairs, city_categories):
+            for n_category, category in enumerate(categories):
+                key = WorkUnit.key_of(region, city, category)
+                if before is not None and (*position, n_category) < before:
+                    done.add(key)
+                if key in done:
+                    continue
+                scheduler.add(region, city, category)
+                remaining[(region.id, city.id)] = remaining.get((region.id, city.id), 0) + 1
 
-                if n_region == indexes["region"] and n_city < indexes["city"]:
-                    continue  # Пропускаем уже обработанные города
+        logger.debug(f"🗂  Регионов: {len(regions)} · Городов: {len(pairs)} · Категорий в очереди: {scheduler.units}")
+        return remaining
 
-                print(f"[{LIGHT_BLUE}{n_city + 1} / {len(cities)}{WHITE}] |  Город:   {LIGHT_YELLOW}{city.name.ljust(20)}{WHITE}  🆔  {city.id}", end="")
-                print()
+    async def run(self, region_id: int = None, city_id: int = None, incremental: bool = None):
+        """
+        Запускает парсер объявлений по регионам, городам и категориям.
 
-                categories = await self.get_items_count_for_all_categories(region.id, city.id, region.name, city.name)
+        Если заданы `region_id` и `city_id`, обрабатывает только указанный регион и город, иначе все регионы и города страны.
+        Все категории всех городов ставятся в очередь с приоритетом (`CrawlScheduler`) и собираются одновременно
+        (до `CATEGORY_WORKERS` категорий), результаты сохраняются по мере завершения.
+        Если `PROCESS_WORKERS` больше 1, то категории собираются в нескольких процессах (`ShardedCrawl`),
+        а если включен `DISTRIBUTED` - воркерами на других компьютерах (`Coordinator`). Прогресс (категории и страницы) хранится в журнале `journal`,
+        поэтому после сбоя или Ctrl+C сбор продолжается с места остановки.
+        Когда собраны все категории города, его таблицы объединяются.
+        В режиме `incremental` (по умолчанию `INCREMENTAL`) по каждой категории загружаются только объявления, появившиеся
+        после прошлого сбора, и добавляются в уже сохраненные файлы (обычно это несколько запросов на категорию).
+        По завершении открывает папку с результатами и позволяет перезапустить или завершить программу через консоль.
 
-                if not categories:
-                    print(" | Объявлений не найдено")
-                    if os.path.exists(indexes_path):
-                        os.remove(indexes_path)
-                    input(f"Нажмите {UNDERLINED}ENTER{RESET}{WHITE} для перезапуска")
-                    os.execl(sys.executable, sys.executable, *sys.argv)
-                    exit()
-                else:
-                    print(f"\n╭{help_message}╮")
-                    for n_category, category in enumerate(categories):
-                        logger.debug(f"🏷  {repr(category)}")
+        :param region_id: (необязательно) Идентификатор региона для обработки.
+        :param city_id: (необязательно) Идентификатор города для обработки.
+        :param incremental: (необязательно) Собрать только новые объявления.
+        """
+        if incremental is None:
+            incremental = app_config.INCREMENTAL
 
-                        if n_region == indexes["region"] and n_city == indexes["city"] and n_category < indexes["category"]:
-                            continue  # Пропускаем уже обработанные категории
+        help_message = f"{'─' * 30}| 📰  {BOLD}{LIGHT_MAGENTA}Найдено{RESET} / 📚  {BOLD}{LIGHT_CYAN}Страниц{RESET} / 📥  {BOLD}{RED}Собрано{RESET}{WHITE} / 📦  Всего собрано |{'─' * 30}"
 
-                        category_name = await self._get_category_name(category.id)
-                        offers = await self.get_offers_from_api(category.id, region.id, city.id)
-                        save_offers(offers, region_id, region.name, city.id, city.name, category.id, category_name, self.out_dir, self._save_json, self._save_xls)
+        os.system('cls')
+        logger.info('ℹ️  Начинается сбор объявлений для выбранного региона и города')
+        if incremental and app_config.DISTRIBUTED:
+            # Воркеры не знают отметок категорий (они хранятся в журнале координатора), поэтому категории собираются полностью
+            logger.warning(f"⚠️  Сбор только новых объявлений не поддерживается в распределенном режиме · Категории будут собраны полностью")
+            incremental = False
+        if incremental:
+            logger.info(f"🆕  Собираются только {LIGHT_GREEN}новые{WHITE} объявления с прошлого сбора")
+        time.sleep(1)
 
-                        offers_count = await self._get_offers_count(category.id, region.id, city.id)
-                        if not offers_count:
-                            continue
+        total_collected = 0
 
-                        total_pages = (offers_count.visible_total + limit - 1) // limit
-                        max_offers = offers_count.visible_total
+        region_key = str(region_id) if region_id is not None else "all"
+        city_key = str(city_id) if city_id is not None else "all"
+        run_key = f"{region_key}_{city_key}"
+
+        # Прогресс хранится в журнале (`data/common/jobs.sqlite3`). Незавершенные при прошлом запуске задания снова в очереди
+        journal.start_run(run_key)
+        # Старый файл прогресса: список собранных категорий или позиция (регион, город, категория), с которой продолжить.
+        # Позиция переводится в ключи категорий при планировании, и только после этого файл удаляется
+        indexes_path = os.path.join(self.data_dir, f"last_indexes_{run_key}.json")
+        before = None
+        if os.path.exists(indexes_path):
+            indexes = open_json(indexes_path)
+            for key in indexes.get("done", []):
+                journal.mark_done(run_key, key)
+            if "region" in indexes:
+                # Как и раньше, при выбранном регионе или городе их позиция считается с начала
+                before = (
+                    0 if region_id is not None else indexes.get("region", 0),
+                    0 if city_id is not None else indexes.get("city", 0),
+                    indexes.get("category", 0),
+                )
+        done = journal.done_units(run_key)
 
-                        total_collected += max_offers
-                        print(f"[{LIGHT_BLUE}{n_category + 1} / {len(categories)}{WHITE}] |   🆔  {category.id} · {YELLOW}{category_name[:70].ljust(70)}{WHITE} | "
-                              f"📰  {BOLD}{LIGHT_MAGENTA}{offers_count.total}{RESET} / "
-                              f"📚  {BOLD}{LIGHT_CYAN}{total_pages}{RESET}{WHITE} / "
-                              f"📥  {BOLD}{RED}{max_offers}{RESET}{WHITE} / "
-                              f"📦  {total_collected}")
-                        save_json({"region": n_region, "city": n_city, "category": n_category + 1}, indexes_path)
+        scheduler = CrawlScheduler()
+        with yaspin(text="Планирование категорий"):
+            remaining = await self._plan_units(scheduler, region_id, city_id, done, before)
 
-                    print(f"╰{help_message}╯")
-                    time.sleep(1)
-                    print(f"✅  Сбор объявлений по всем категориям в {LIGHT_YELLOW}{region.name}{WHITE} города {LIGHT_YELLOW}{city.name}{WHITE} завершен")
-                    merge_city_offers(self._bar, self.data_dir, region.name, region.id, city.name, city.id)
+        if os.path.exists(indexes_path):
+            for key in done:
+                journal.mark_done(run_key, key)
+            os.remove(indexes_path)
 
-                break
+        if not scheduler.units and not done:
+            print(" | Объявлений не найдено")
+            journal.clear_run(run_key)
+            input(f"Нажмите {UNDERLINED}ENTER{RESET}{WHITE} для перезапуска")
+            os.execl(sys.executable, sys.executable, *sys.argv)
+            exit()
 
-            indexes["city"] = 0
-            indexes["category"] = 0
-            save_json({"region": n_region, "city": 0, "category": 0}, indexes_path)
+        print(f"🗂  Городов: {LIGHT_YELLOW}{len(remaining)}{WHITE} · Категорий: {LIGHT_YELLOW}{scheduler.units}{WHITE} · Объявлений: {LIGHT_YELLOW}{scheduler.expected}{WHITE}")
+        print(f"\n╭{help_message}╮")
 
-            break
+        if app_config.DISTRIBUTED:
+            results = Coordinator().drain(scheduler.take_all(), run_key, self.out_dir, self._save_json, self._save_xls)
+        elif app_config.PROCESS_WORKERS > 1:
+            results = ShardedCrawl().drain(scheduler.take_all(), run_key, incremental, self._save_json, self._save_xls)
+        else:
+            results = scheduler.drain(partial(self._crawl_category, run=run_key, incremental=incremental))
+
+        # Таблицы города объединяются в отдельном потоке (по одному городу за раз), пока собираются категории других городов
+        merge_lock = asyncio.Lock()
+        merges = []
+
+        async def merge_city(region, city):
+            async with merge_lock:
+                await asyncio.to_thread(merge_city_offers, self._bar, self.data_dir, region.name, region.id, city.name, city.id)
+
+        async for unit, result in results:
+            region, city, category = unit.region, unit.city, unit.category
+            if result is None:
+                scheduler.complete(unit, ok=False)
+                continue
+
+            category_name, offers_count = result
+
+            max_offers = offers_count.visible_total if offers_count else 0
+            scheduler.complete(unit, max_offers)
+
+            if offers_count:
+                total_pages = (offers_count.visible_total + limit - 1) // limit
+                total_collected += max_offers
+                print(f"[{LIGHT_BLUE}{scheduler.done} / {scheduler.units}{WHITE}] |   🆔  {category.id} · {YELLOW}{category_name[:50].ljust(50)}{WHITE} · {city.name[:20].ljust(20)} | "
+                      f"📰  {BOLD}{LIGHT_MAGENTA}{offers_count.total}{RESET} / "
+                      f"📚  {BOLD}{LIGHT_CYAN}{total_pages}{RESET}{WHITE} / "
+                      f"📥  {BOLD}{RED}{max_offers}{RESET}{WHITE} / "
+                      f"📦  {total_collected} · {DARK_GRAY}{scheduler.status()}{WHITE}")
+
+            # Когда собраны все категории города, объединяем его таблицы
+            remaining[(region.id, city.id)] -= 1
+            if not remaining[(region.id, city.id)]:
+                print(f"✅  Сбор объявлений по всем категориям в {LIGHT_YELLOW}{region.name}{WHITE} города {LIGHT_YELLOW}{city.name}{WHITE} завершен")
+                if os.path.exists(os.path.join(self.data_dir, f"{region.name.replace(' ', '-')}_{region.id}", f"{city.name}_{city.id}")):
+                    merges.append(asyncio.create_task(merge_city(region, city)))
+
+        await asyncio.gather(*merges)
+        print(f"╰{help_message}╯")
+        if scheduler.failed:
+            print(f"⚠️  Не удалось собрать категорий: {RED}{scheduler.failed}{WHITE} · Они будут собраны при следующем запуске")
 
         print(f"✅  Парсинг завершён · Всего собрано объявлений: {BOLD}{total_collected}{RESET}{WHITE}")
-        if os.path.exists(indexes_path):
-            os.remove(indexes_path)
+        if not scheduler.failed:
+            journal.clear_run(run_key)
 
         print('\n[процесс завершил работу с кодом 0]')
         while True:
@@ -0,0 +1,166 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from Src.app.colors import *
+from Src.app.config import app_config
+from Src.app.logging_config import logger
+from Src.parser.utils import read_proxies
+
+
+@dataclass
+class ProxyState:
+    """Состояние и статистика одного прокси"""
+    url: str
+    slots: asyncio.Semaphore
+    capacity: int
+    successes: int = 0
+    failures: int = 0
+    auth_failures: int = 0
+    blocked: int = 0
+    in_flight: int = 0
+    waiting: int = 0
+    latency: float | None = None
+    strikes: int = 0
+    cooldown_until: float = field(default=0.0)
+
+    @property
+    def success_rate(self) -> float:
+        total = self.successes + self.failures
+        return self.successes / total if total else 1.0
+
+    @property
+    def load(self) -> float:
+        """Загрузка с учетом запросов, которые ждут свободного слота"""
+        return (self.in_flight + self.waiting) / self.capacity
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+
+class ProxyPool:
+    """
+    Пул прокси со статистикой здоровья.
+
+    Список прокси читается из `proxies.txt` один раз. Для каждого прокси считается доля успешных запросов,
+    EWMA задержки, ошибки авторизации (407), блокировки CloudFront и количество запросов в работе.
+    Запрос получает наименее загруженный здоровый прокси, а прокси с ошибками уходят в паузу
+    с экспоненциально растущим временем. `MAX_WORKERS` делится поровну между прокси в виде слотов.
+    """
+
+    def __init__(self, proxies: list[str] = None, workers: int = None, cooldown: float = None, max_cooldown: float = 300, alpha: float = 0.3):
+        self._proxies = proxies
+        self._workers = workers or app_config.MAX_WORKERS
+        self._cooldown = cooldown or app_config.PROXY_COOLDOWN
+        self._max_cooldown = max_cooldown
+        self._alpha = alpha
+        self._states: dict[str, ProxyState] | None = None
+
+    @property
+    def states(self) -> dict[str, ProxyState]:
+        if self._states is None:
+            proxies = [p for p in (self._proxies if self._proxies is not None else read_proxies()) if p]
+            capacity = max(1, math.ceil(self._workers / len(proxies))) if proxies else 1
+            self._states = {p: ProxyState(url=p, slots=asyncio.Semaphore(capacity), capacity=capacity) for p in proxies}
+            logger.debug(f"🌐  Загружено прокси: {len(proxies)} · Слотов на прокси: {capacity}")
+        return self._states
+
+    def restrict(self, proxies: list[str]) -> None:
+        """Оставляет в пуле только указанные прокси (например, подмножество для отдельного процесса)"""
+        self._proxies = proxies
+        self._states = None
+
+    def pick(self, exclude: set[str] = None, only: list[str] = None) -> str | None:
+        """
+        Возвращает наименее загруженный здоровый прокси.
+        Если все прокси на паузе, то возвращается тот, у которого пауза закончится раньше всех.
+
+        :param exclude: Прокси, которые не нужно выбирать (например, только что отказавший).
+        :param only: Выбирать только из этих прокси (например, прокси аккаунта).
+        """
+        states = [self.states[p] for p in only if p in self.states] if only else list(self.states.values())
+        candidates = [s for s in states if not exclude or s.url not in exclude] or states
+        if not candidates:
+            return None
+
+        now = time.monotonic()
+        healthy = [s for s in candidates if s.is_healthy(now)]
+        if not healthy:
+            return min(candidates, key=lambda s: s.cooldown_until).url
+
+        best = min(healthy, key=lambda s: (s.load, (s.latency or 0) * (2 - s.success_rate)))
+        return best.url
+
+    @asynccontextmanager
+    async def slot(self, enabled: bool = True, exclude: set[str] = None, only: list[str] = None):
+        """
+        Занимает слот у выбранного прокси на время запроса
+
+        :param enabled: Если False, то прокси не выбирается и возвращается None.
+        :param exclude: Прокси, которые не нужно выбирать.
+        :param only: Выбирать только из этих прокси.
+        """
+        proxy = self.pick(exclude, only) if enabled else None
+        if proxy is None:
+            yield None
+            return
+
+        state = self.states[proxy]
+        # Ожидающий запрос сразу учитывается в загрузке, чтобы следующие запросы выбирали другие прокси
+        state.waiting += 1
+        try:
+            wait = state.cooldown_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await state.slots.acquire()
+        finally:
+            state.waiting -= 1
+
+        state.in_flight += 1
+        try:
+            yield proxy
+        finally:
+            state.in_flight -= 1
+            state.slots.release()
+
+    def success(self, proxy: str | None, elapsed: float) -> None:
+        state = self.states.get(proxy) if proxy else None
+        if not state:
+            return
+
+        state.successes += 1
+        state.strikes = 0
+        state.latency = elapsed if state.latency is None else self._alpha * elapsed + (1 - self._alpha) * state.latency
+
+    def failure(self, proxy: str | None, reason: str = 'error') -> None:
+        """
+        Учитывает ошибку прокси и отправляет его на паузу
+
+        :param proxy: Прокси.
+        :param reason: Причина (auth - 407, blocked - CloudFront, error - ошибка соединения).
+        """
+        state = self.states.get(proxy) if proxy else None
+        if not state:
+            return
+
+        state.failures += 1
+        if reason == 'auth':
+            state.auth_failures += 1
+        elif reason == 'blocked':
+            state.blocked += 1
+
+        state.strikes += 1
+        pause = min(self._cooldown * 2 ** (state.strikes - 1), self._max_cooldown)
+        state.cooldown_until = time.monotonic() + pause
+        logger.debug(f"🌐  Прокси на паузе {pause:.0f}c · {reason} · {proxy.split('@')[-1]}")
+
+    def report(self) -> None:
+        for state in (self._states or {}).values():
+            latency = f"{state.latency:.2f}c" if state.latency is not None else '—'
+            logger.info(f"🌐  {state.url.split('@')[-1].ljust(22)} · Успешно: {LIGHT_GREEN}{state.success_rate:.0%}{WHITE} · "
+                        f"Задержка: {latency} · 407: {state.auth_failures} · CloudFront: {state.blocked}")
+
+
+proxy_pool = ProxyPool()
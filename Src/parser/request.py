@@ -1,12 +1,25 @@
-from curl_cffi import AsyncSession
+from dataclasses import dataclass, field
+
 from curl_cffi.requests.exceptions import DNSError
 
 from Src.app.config import app_config
 from Src.app.logging_config import logger
-from Src.parser.utils import get_proxy_random
+from Src.parser.jsonlib import loads
+from Src.parser.proxies import proxy_pool
+from Src.parser.session import session_pool
 
 
-async def get_data(
+@dataclass
+class Reply:
+    """Результат HTTP-запроса: статус, тело, заголовки и исключение (если запрос не удался)"""
+    status: int
+    body: dict | str
+    headers: dict = field(default_factory=dict)
+    error: Exception | None = None
+    proxy: str | None = None
+
+
+async def fetch(
         url,
         headers=None,
         cookies=None,
@@ -16,9 +29,10 @@ async def get_data(
         Json=None,
         use_proxy=None,
         proxy=None,
-) -> tuple[int, dict | str]:
+) -> Reply:
     """
-    Получает данные с указанного URL, выполняя запрос с поддержкой прокси и опций отладки.
+    Выполняет запрос с поддержкой прокси и опций отладки и возвращает полный результат (`Reply`).
+    Запрос идет через долгоживущую сессию из `session_pool`, поэтому соединение с хостом переиспользуется.
 
     :param url: URL-адрес для выполнения HTTP-запроса.
     :param headers: Заголовки запроса.
@@ -29,19 +43,15 @@ async def get_data(
     :param Json: Вернуть результат как JSON (True) или текст (False)..
     :param use_proxy: Использовать ли прокси.
     :param proxy: Конкретный прокси.
-    :return: Кортеж из текста/JSON и статуса ответа.
+    :return: `Reply` со статусом, телом и заголовками ответа.
     """
     # from curl_cffi.requests.impersonate import BrowserTypeLiteral
-    proxy = proxy or get_proxy_random()
-
     request_args = {
         'url': url,
         'headers': headers,
         'cookies': cookies,
         'params': params,
         'timeout': 10,
-        'impersonate': 'chrome',
-        'verify': False
         # 'allow_redirects': True
     }
 
@@ -56,27 +66,52 @@ async def get_data(
         use_proxy = app_config.USE_PROXY
 
     if use_proxy:
-        request_args['proxy'] = proxy
+        proxy = proxy or proxy_pool.pick()
         logger.debug(f"🌐  Using proxy: {proxy}")
+    else:
+        proxy = None
 
     try:
         logger.debug(f"{'🔵  ' if method == 'get' else '🟠  '}{method.upper()} · {url}")
 
-        async with AsyncSession() as session:
-            response = await session.get(**request_args) if method == 'get' else await session.post(**request_args)
-            status = response.status_code
+        session = session_pool.get(url, proxy)
+        response = await session.get(**request_args) if method == 'get' else await session.post(**request_args)
+        session_pool.record(response)
+        status = response.status_code
+        response_headers = {k.lower(): v for k, v in response.headers.items()}
 
-            if Json:
-                try:
-                    return status, response.json()
-                except Exception:
-                    return status, response.text
-            else:
-                return status, response.text
+        if Json:
+            try:
+                return Reply(status, loads(response.content), response_headers, proxy=proxy)
+            except Exception:
+                return Reply(status, response.text, response_headers, proxy=proxy)
+        else:
+            return Reply(status, response.text, response_headers, proxy=proxy)
 
     except DNSError as e:
         logger.error(f'🌐  Не удалось выполнить запрос, проверьте подключение к интернету · {e}')
-        return 500, f"{type(e).__name__}. {e}"
+        return Reply(500, f"{type(e).__name__}. {e}", error=e, proxy=proxy)
 
     except Exception as e:
-        return 500, f"{proxy} · {type(e).__name__}. {e}"
+        return Reply(500, f"{proxy} · {type(e).__name__}. {e}", error=e, proxy=proxy)
+
+
+async def get_data(
+        url,
+        headers=None,
+        cookies=None,
+        params=None,
+        payload=None,
+        data=None,
+        Json=None,
+        use_proxy=None,
+        proxy=None,
+) -> tuple[int, dict | str]:
+    """
+    Получает данные с указанного URL, выполняя запрос с поддержкой прокси и опций отладки.
+    Параметры такие же, как у `fetch`.
+
+    :return: Кортеж из текста/JSON и статуса ответа.
+    """
+    reply = await fetch(url, headers, cookies, params, payload, data, Json, use_proxy, proxy)
+    return reply.status, reply.body
@@ -0,0 +1,221 @@
+import asyncio
+import heapq
+import itertools
+import random
+import re
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from enum import Enum
+
+from curl_cffi.requests.exceptions import ProxyError, Timeout
+
+from Src.app.colors import *
+from Src.app.config import app_config
+from Src.app.logging_config import logger
+from Src.parser.request import Reply
+
+
+class Failure(str, Enum):
+    """Тип неудачного ответа"""
+    PROXY = 'proxy'  # 407 или прокси не отвечает
+    CLOUDFRONT = 'cloudfront'  # Request could not be satisfied
+    RATE_LIMIT = 'rate_limit'  # 429
+    AUTH = 'auth'  # 401, токен истек
+    TIMEOUT = 'timeout'
+    NETWORK = 'network'  # DNS, обрыв соединения
+    SERVER = 'server'  # 5xx от OLX
+    UNKNOWN = 'unknown'
+
+
+class RetryPolicy:
+    """
+    Политика повторов для `olxParser._make_request`.
+
+    Классифицирует ответ по статусу, исключению и заголовку HTML страницы и для каждого типа ошибки
+    считает паузу перед следующей попыткой: экспоненциальный рост с джиттером, чтобы повторы
+    разных задач не совпадали по времени. Заголовок `Retry-After` учитывается.
+    Чтобы изменить поведение для отдельного эндпоинта, достаточно передать свой экземпляр или наследника.
+
+    :param retries: Максимальное количество попыток.
+    :param deadline: Общее время на запрос со всеми повторами в секундах.
+    :param base: Базовая пауза в секундах.
+    :param cap: Максимальная пауза в секундах.
+    """
+    # Множитель базовой паузы для каждого типа ошибки. 0 - повторить сразу (на другом прокси или с новым токеном)
+    factors = {
+        Failure.PROXY: 0,
+        Failure.AUTH: 0,
+        Failure.TIMEOUT: 1,
+        Failure.NETWORK: 2,
+        Failure.SERVER: 2,
+        Failure.UNKNOWN: 2,
+        Failure.RATE_LIMIT: 4,
+        Failure.CLOUDFRONT: 10,
+    }
+
+    # Ошибки, после которых нужно сменить прокси
+    switch_proxy = {Failure.PROXY, Failure.CLOUDFRONT, Failure.TIMEOUT, Failure.NETWORK}
+
+    def __init__(self, retries: int = 5, deadline: float = None, base: float = 0.5, cap: float = 60):
+        self.retries = retries
+        self.deadline = deadline or app_config.REQUEST_DEADLINE
+        self.base = base
+        self.cap = cap
+
+    @staticmethod
+    def title(body) -> str:
+        """Возвращает заголовок HTML страницы (без построения DOM)"""
+        if not isinstance(body, str):
+            return ''
+        match = re.search(r'<title[^>]*>(.*?)</title>', body, re.IGNORECASE | re.DOTALL)
+        return match.group(1).strip() if match else ''
+
+    @staticmethod
+    def is_captcha(body) -> bool:
+        """Проверяет, является ли ответ API требованием пройти капчу"""
+        if not isinstance(body, dict) or 'error' not in body:
+            return False
+        detail = str((body.get('error') or {}).get('detail', ''))
+        return 'Невозможно продолжить' in detail or 'captcha' in detail.lower()
+
+    def classify(self, reply: Reply) -> Failure | None:
+        """Возвращает тип ошибки или None, если ответ окончательный (200, 304, 400, 404)"""
+        status, body, error = reply.status, reply.body, reply.error
+
+        if error is not None:
+            if isinstance(error, ProxyError) or (isinstance(body, str) and '407' in body):
+                return Failure.PROXY
+            if isinstance(error, Timeout):
+                return Failure.TIMEOUT
+            return Failure.PROXY if reply.proxy else Failure.NETWORK
+
+        if status in (200, 304, 400, 404):
+            return None
+        if status == 401:
+            return Failure.AUTH
+        if status == 407:
+            return Failure.PROXY
+        if status == 429:
+            return Failure.RATE_LIMIT
+        if 'satisfied' in self.title(body):
+            return Failure.CLOUDFRONT
+        if status >= 500:
+            return Failure.SERVER
+        return Failure.UNKNOWN
+
+    @staticmethod
+    def retry_after(reply: Reply) -> float | None:
+        """Возвращает паузу из заголовка `Retry-After` в секундах (число или HTTP-дата)"""
+        value = reply.headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+    def backoff(self, failure: Failure, attempt: int, reply: Reply) -> float:
+        """
+        Пауза перед следующей попыткой
+
+        :param failure: Тип ошибки.
+        :param attempt: Номер неудачной попытки (с 1).
+        :param reply: Ответ, по которому считается пауза.
+        """
+        base = self.base * self.factors.get(failure, 1)
+        delay = random.uniform(base, min(self.cap, base * 2 ** attempt)) if base else 0.0
+
+        retry_after = self.retry_after(reply)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.cap))
+        return delay
+
+
+class RetryQueue:
+    """
+    Очередь отложенных повторов (куча по времени): элемент возвращается из `get` не раньше, чем закончится его пауза.
+    Пауза растет с каждой попыткой (экспоненциально с джиттером), а после `attempts` попыток элемент больше не повторяется.
+
+    :param attempts: Максимальное количество попыток для одного элемента (вместе с первой).
+    :param base: Пауза после первой неудачной попытки в секундах.
+    :param cap: Максимальная пауза в секундах.
+    """
+
+    def __init__(self, attempts: int, base: float, cap: float = 600):
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self._heap: list[tuple[float, int, object]] = []
+        self._seq = itertools.count()
+        self._changed = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def delay(self, attempt: int) -> float:
+        """Пауза после неудачной попытки `attempt` (с 1)"""
+        base = self.base * 2 ** (attempt - 1)
+        return min(self.cap, random.uniform(base, base * 2))
+
+    def schedule(self, item, attempt: int) -> float | None:
+        """
+        Откладывает повтор элемента после неудачной попытки
+
+        :param item: Элемент.
+        :param attempt: Номер неудачной попытки (с 1).
+        :return: Пауза в секундах или None, если попытки закончились.
+        """
+        if attempt >= self.attempts:
+            return None
+        delay = self.delay(attempt)
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), item))
+        self._changed.set()
+        return delay
+
+    async def get(self):
+        """Ждет и возвращает элемент, пауза которого закончилась раньше всех"""
+        while True:
+            wait = None
+            if self._heap:
+                wait = self._heap[0][0] - time.monotonic()
+                if wait <= 0:
+                    return heapq.heappop(self._heap)[2]
+
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+
+class RetryStats:
+    """Количество повторов и потраченное на паузы время по каждому эндпоинту"""
+
+    def __init__(self):
+        self.requests = Counter()
+        self.retries = Counter()
+        self.waited = defaultdict(float)
+        self.failures = defaultdict(Counter)
+
+    def request(self, endpoint: str) -> None:
+        self.requests[endpoint] += 1
+
+    def retry(self, endpoint: str, failure: Failure, delay: float) -> None:
+        self.retries[endpoint] += 1
+        self.waited[endpoint] += delay
+        self.failures[endpoint][failure.value] += 1
+
+    def report(self) -> None:
+        for endpoint, count in self.requests.most_common():
+            failures = ', '.join(f"{k}: {v}" for k, v in self.failures[endpoint].most_common())
+            logger.info(f"🔁  {endpoint.ljust(14)} · Запросов: {count} · Повторов: {LIGHT_YELLOW}{self.retries[endpoint]}{WHITE} · "
+                        f"Ожидание: {self.waited[endpoint]:.1f}c{f' · {failures}' if failures else ''}")
+
+
+retry_stats = RetryStats()
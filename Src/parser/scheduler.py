@@ -0,0 +1,126 @@
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from Src.app.config import app_config
+from Src.app.logging_config import logger
+from Src.parser.schemas import Region, City, Category
+
+
+@dataclass(order=True)
+class WorkUnit:
+    """Единица работы: одна категория одного города. Меньше `priority` - раньше в очереди"""
+    priority: int
+    seq: int
+    region: Region = field(compare=False)
+    city: City = field(compare=False)
+    category: Category = field(compare=False)
+
+    @property
+    def key(self) -> str:
+        return self.key_of(self.region, self.city, self.category)
+
+    @staticmethod
+    def key_of(region: Region, city: City, category: Category) -> str:
+        return f'{region.id}:{city.id}:{category.id}'
+
+
+class CrawlScheduler:
+    """
+    Планировщик сбора объявлений по всей стране.
+
+    Единицы работы (регион, город, категория) кладутся в очередь с приоритетом: сначала самые большие категории,
+    чтобы долгие категории не оставались на конец сбора. `workers` задач разбирают очередь, а результаты
+    отдаются по мере завершения. Ограничения на количество запросов к каждому хосту задаются в `host_limits`.
+
+    :param workers: Количество одновременно обрабатываемых единиц (по умолчанию `CATEGORY_WORKERS`).
+    """
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or app_config.CATEGORY_WORKERS
+        self._queue: asyncio.PriorityQueue[WorkUnit] = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+
+        self.units = 0
+        self.done = 0
+        self.failed = 0
+        self.expected = 0
+        self.processed = 0
+        self.collected = 0
+        self._started: float | None = None
+
+    def add(self, region: Region, city: City, category: Category) -> WorkUnit:
+        unit = WorkUnit(-(category.count or 0), next(self._seq), region, city, category)
+        self._queue.put_nowait(unit)
+        self.units += 1
+        self.expected += category.count or 0
+        return unit
+
+    async def drain(self, handler: Callable[[WorkUnit], Awaitable[Any]]) -> AsyncIterator[tuple[WorkUnit, Any]]:
+        """
+        Разбирает очередь и отдает (единица, результат) в порядке завершения
+
+        :param handler: Обработчик единицы работы. Если он выбросил исключение, то результат None.
+        """
+        results: asyncio.Queue[tuple[WorkUnit, Any]] = asyncio.Queue()
+        count = self._queue.qsize()
+        self._started = self._started or time.monotonic()
+
+        async def worker():
+            while not self._queue.empty():
+                unit = self._queue.get_nowait()
+                try:
+                    result = await handler(unit)
+                except Exception as e:
+                    logger.error(f"⚠️  Не удалось обработать {unit.key} · {type(e).__name__}. {e}")
+                    result = None
+                await results.put((unit, result))
+
+        tasks = [asyncio.create_task(worker()) for _ in range(min(self.workers, count))]
+        try:
+            for _ in range(count):
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def take_all(self) -> list[WorkUnit]:
+        """Забирает все единицы работы из очереди по приоритету (для сбора в других процессах, см. `ShardedCrawl`)"""
+        self._started = self._started or time.monotonic()
+        units = []
+        while not self._queue.empty():
+            units.append(self._queue.get_nowait())
+        return units
+
+    def complete(self, unit: WorkUnit, collected: int = 0, ok: bool = True) -> None:
+        """Учитывает завершенную единицу работы для расчета скорости и оставшегося времени"""
+        self.done += 1
+        self.failed += 0 if ok else 1
+        self.processed += unit.category.count or 0
+        self.collected += collected
+
+    @property
+    def rate(self) -> float:
+        """Собрано объявлений в секунду"""
+        elapsed = time.monotonic() - self._started if self._started else 0
+        return self.collected / elapsed if elapsed else 0.0
+
+    @property
+    def eta(self) -> float | None:
+        """Оставшееся время в секундах (по количеству объявлений в еще не собранных категориях)"""
+        elapsed = time.monotonic() - self._started if self._started else 0
+        if not self.processed or not elapsed:
+            return None
+        return (self.expected - self.processed) / (self.processed / elapsed)
+
+    def status(self) -> str:
+        eta = self.eta
+        if eta is None:
+            eta_fmt = '—'
+        else:
+            eta = int(eta)
+            eta_fmt = f'{eta // 3600:02}:{eta % 3600 // 60:02}:{eta % 60:02}'
+        return f"⏱  {self.rate:.0f} объявл./с · Осталось: {eta_fmt}"
@@ -97,6 +97,19 @@ class OffersMeta(BaseModel):
         super().__init__(total=total, visible_total=visible_total, regions=regions)
 
 
+class CategorySnapshot(BaseModel):
+    """Количество объявлений и страниц категории по метаданным первых страниц (заполняется при сборе)"""
+    total: int = 0
+    visible_total: int = 0
+    pages: int = 0
+    # Самые новые объявления (ID и дата) для отметки категории (`Watermark`), если загружены все страницы
+    newest: list[dict] | None = None
+
+    @property
+    def meta(self) -> OffersMeta:
+        return OffersMeta(self.total, self.visible_total, [])
+
+
 class Offer(BaseModel):
     id: int | None = None
     title: str | None = None
@@ -0,0 +1,79 @@
+from urllib.parse import urlparse
+
+from curl_cffi import AsyncSession, CurlInfo
+
+from Src.app.colors import *
+from Src.app.config import app_config
+from Src.app.logging_config import logger
+
+
+class SessionPool:
+    """
+    Пул долгоживущих HTTP-сессий.
+
+    Для каждой пары (прокси, хост) создается одна `AsyncSession`, которая живет до завершения работы.
+    Благодаря этому TCP+TLS соединения (и HTTP/2 поверх них) переиспользуются между запросами,
+    а не открываются заново на каждую страницу или номер телефона.
+    """
+
+    def __init__(self, max_clients: int = None):
+        self._max_clients = max_clients or app_config.MAX_WORKERS
+        self._sessions: dict[tuple[str | None, str], AsyncSession] = {}
+        self.stats = {'requests': 0, 'reused': 0, 'connects': 0, 'sessions': 0}
+
+    @staticmethod
+    def _key(url: str, proxy: str = None) -> tuple[str | None, str]:
+        return proxy, urlparse(url).netloc
+
+    def _session_args(self, proxy: str = None) -> dict:
+        return dict(
+            proxy=proxy,
+            impersonate='chrome',
+            verify=False,
+            timeout=10,
+            discard_cookies=True,
+            curl_infos=[CurlInfo.NUM_CONNECTS],
+        )
+
+    def get(self, url: str, proxy: str = None) -> AsyncSession:
+        """
+        Возвращает асинхронную сессию для хоста из `url` и прокси `proxy`, создавая ее при первом обращении
+
+        :param url: URL запроса (используется только хост).
+        :param proxy: Прокси, через который идут запросы этой сессии.
+        """
+        key = self._key(url, proxy)
+        session = self._sessions.get(key)
+        if session is None:
+            session = AsyncSession(max_clients=self._max_clients, **self._session_args(proxy))
+            self._sessions[key] = session
+            self.stats['sessions'] += 1
+            logger.debug(f"🔌  New session · {key[1]} · {proxy}")
+        return session
+
+    def record(self, response) -> None:
+        """Учитывает, было ли для ответа открыто новое соединение или переиспользовано существующее"""
+        connects = response.infos.get(CurlInfo.NUM_CONNECTS, 0) or 0
+        self.stats['requests'] += 1
+        self.stats['connects'] += connects
+        if not connects:
+            self.stats['reused'] += 1
+
+    @property
+    def reuse_ratio(self) -> float:
+        requests_count = self.stats['requests']
+        return self.stats['reused'] / requests_count if requests_count else 0.0
+
+    def report(self) -> None:
+        logger.info(f"🔌  Сессий: {self.stats['sessions']} · Запросов: {self.stats['requests']} · "
+                    f"Новых соединений: {self.stats['connects']} · Переиспользовано: {LIGHT_GREEN}{self.reuse_ratio:.0%}{WHITE}")
+
+    async def close(self) -> None:
+        """Закрывает все сессии пула"""
+        for session in self._sessions.values():
+            await session.close()
+
+        self._sessions.clear()
+
+
+session_pool = SessionPool()
@@ -0,0 +1,134 @@
+import asyncio
+import multiprocessing
+import queue
+from functools import partial
+from typing import AsyncIterator
+
+from Src.app.config import app_config
+from Src.app.logging_config import logger
+from Src.parser.proxies import proxy_pool
+from Src.parser.scheduler import CrawlScheduler, WorkUnit
+
+
+def shard_units(units: list[WorkUnit], shards: int) -> list[list[WorkUnit]]:
+    """
+    Делит единицы работы между процессами.
+    Все категории одного города попадают в один процесс, а города распределяются так,
+    чтобы количество объявлений в процессах было примерно одинаковым (сначала самые большие города).
+
+    :param units: Единицы работы.
+    :param shards: Количество процессов.
+    :return: Список единиц работы для каждого процесса (пустые части убираются).
+    """
+    cities: dict[tuple[int, int], list[WorkUnit]] = {}
+    for unit in units:
+        cities.setdefault((unit.region.id, unit.city.id), []).append(unit)
+
+    parts = [[] for _ in range(shards)]
+    loads = [0] * shards
+    for city_units in sorted(cities.values(), key=lambda us: -sum(u.category.count or 0 for u in us)):
+        n = loads.index(min(loads))
+        parts[n].extend(city_units)
+        loads[n] += sum(u.category.count or 0 for u in city_units)
+
+    return [sorted(part) for part in parts if part]
+
+
+def _worker_main(units: list[WorkUnit], proxies: list[str], run: str, incremental: bool, save_json: bool, save_xls: bool, results) -> None:
+    """Точка входа процесса: свой цикл событий, свои сессии и свое подмножество прокси"""
+    asyncio.run(_crawl_shard(units, proxies, run, incremental, save_json, save_xls, results))
+
+
+async def _crawl_shard(units: list[WorkUnit], proxies: list[str], run: str, incremental: bool, save_json: bool, save_xls: bool, results) -> None:
+    # Импорт внутри функции: модуль `olx` сам импортирует этот модуль
+    from Src.parser.journal import journal
+    from Src.parser.olx import olxParser
+    from Src.parser.session import session_pool
+
+    proxy_pool.restrict(proxies)
+    parser = olxParser(Json=save_json, Xlsx=save_xls)
+    parser.show_progress = False
+
+    scheduler = CrawlScheduler()
+    for unit in units:
+        scheduler.add(unit.region, unit.city, unit.category)
+
+    try:
+        async for unit, result in scheduler.drain(partial(parser._crawl_category, run=run, incremental=incremental)):
+            results.put((unit.key, result))
+    finally:
+        await session_pool.close()
+        journal.close()
+
+
+class ShardedCrawl:
+    """
+    Сбор в нескольких процессах, чтобы разбор JSON, форматирование объявлений и запись таблиц не упирались в одно ядро.
+
+    Координатор (текущий процесс) делит единицы работы по городам (`shard_units`) между `processes` процессами.
+    Каждый процесс запускает свой цикл событий с `CrawlScheduler`, своими сессиями и своим подмножеством прокси
+    и отправляет результаты координатору через очередь. Прогресс единиц работы общий - журнал (`journal`) в SQLite,
+    а объединение таблиц города и удаление повторов делает координатор.
+
+    :param processes: Количество процессов (по умолчанию `PROCESS_WORKERS`).
+    """
+
+    def __init__(self, processes: int = None):
+        self.processes = processes or app_config.PROCESS_WORKERS
+
+    @staticmethod
+    def _proxies(n: int, shards: int) -> list[str]:
+        proxies = list(proxy_pool.states) if app_config.USE_PROXY else []
+        return proxies[n::shards] or ([proxies[n % len(proxies)]] if proxies else [])
+
+    async def drain(self, units: list[WorkUnit], run: str, incremental: bool = False, save_json: bool = None, save_xls: bool = None) -> AsyncIterator[tuple[WorkUnit, object]]:
+        """
+        Собирает единицы работы в процессах и отдает (единица, результат) в порядке завершения, как `CrawlScheduler.drain`.
+        Если процесс завершился с ошибкой, то его несобранные единицы отдаются с результатом None.
+        """
+        shards = shard_units(units, self.processes)
+        by_key = {unit.key: unit for unit in units}
+
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        workers = [
+            context.Process(
+                target=_worker_main,
+                args=(shard, self._proxies(n, len(shards)), run, incremental, save_json, save_xls, results),
+                name=f'olx-shard-{n}',
+                daemon=True,
+            )
+            for n, shard in enumerate(shards)
+        ]
+        for worker in workers:
+            worker.start()
+        logger.debug(f"🧩  Процессов: {len(workers)} · Единиц работы: {[len(shard) for shard in shards]}")
+
+        def receive():
+            while True:
+                try:
+                    return results.get(timeout=1)
+                except queue.Empty:
+                    if not any(worker.is_alive() for worker in workers):
+                        try:
+                            return results.get(timeout=0.1)
+                        except queue.Empty:
+                            return None
+
+        try:
+            while by_key:
+                message = await asyncio.to_thread(receive)
+                if message is None:
+                    break
+                key, result = message
+                yield by_key.pop(key), result
+
+            for unit in list(by_key.values()):
+                logger.error(f"⚠️  Процесс завершился, не собрав {unit.key}")
+                yield by_key.pop(unit.key), None
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+            results.close()
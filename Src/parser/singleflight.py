@@ -0,0 +1,76 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+from Src.app.colors import *
+from Src.app.logging_config import logger
+
+
+class _LeaderCancelled(Exception):
+    """Вызов, к которому присоединились, был отменен: ожидающие вызовы повторяются"""
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных вызовов.
+
+    Пока вызов с ключом `key` выполняется, все остальные вызовы с тем же ключом не запускаются,
+    а ждут и получают тот же результат (или то же исключение). Если выполняющий вызов отменен,
+    то ожидающие вызовы не отменяются: один из них выполняет вызов заново, а остальные ждут уже его.
+
+    :param name: Название (для статистики).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self.stats = {'calls': 0, 'shared': 0}
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable]):
+        """
+        Выполняет `factory()` или присоединяется к уже выполняющемуся вызову с тем же ключом
+
+        :param key: Ключ вызова.
+        :param factory: Функция, которая возвращает корутину для выполнения.
+        """
+        self.stats['calls'] += 1
+
+        shared = False
+        while (future := self._calls.get(key)) is not None:
+            if not shared:
+                self.stats['shared'] += 1
+                shared = True
+            try:
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                continue
+
+        if shared:
+            self.stats['shared'] -= 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            # Отмена касается только этого вызова: ожидающие вызовы выполнят его заново
+            self._calls.pop(key, None)
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Помечаем исключение полученным, если ожидающих нет
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def report(self) -> None:
+        logger.info(f"🤝  {self.name.ljust(14)} · Вызовов: {self.stats['calls']} · Сэкономлено запросов: {LIGHT_GREEN}{self.stats['shared']}{WHITE}")
+
+
+request_flight = SingleFlight('requests')
+token_flight = SingleFlight('token')
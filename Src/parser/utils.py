@@ -1,15 +1,16 @@
 import itertools
-import json
 import os
 import random
 from datetime import datetime
 from typing import Callable
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
 
 from curl_cffi import AsyncSession
 from pyfiglet import figlet_format, parse_color
 
 from Src.app.colors import *
 from Src.app.logging_config import logger
+from Src.parser.jsonlib import dumps, loads
 
 proxies_file = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.join(__file__)))), 'proxies.txt')
 
@@ -31,7 +32,7 @@ def save_html(html_text):
 
 def save_json(content: list | dict | str, filepath: str = 'data.json'):
     with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(json.dumps(content, ensure_ascii=False, indent=4))
+        f.write(dumps(content, indent=True))
     logger.debug(f"{GREEN}💾  Data saved to `{os.path.join(filepath)}`{WHITE}")
 
 
@@ -44,7 +45,7 @@ def open_json(filepath: str = 'data.json'):
         if not content:
             return {}
         else:
-            return json.loads(content)
+            return loads(content)
 
 
 def read_proxies():
@@ -124,6 +125,36 @@ async def check_ip(proxy_url):
         logger.info(f"[PROXY {proxy_url.split('@')[-1]} -> {data.get('ip')} / {data.get('country', {}).get('name')} / {data.get('region')} / {data.get('city')}]")
 
 
+def endpoint_of(url: str) -> str:
+    """Возвращает короткое имя эндпоинта OLX по URL. Используется для статистики и лимитов по эндпоинтам"""
+    path = urlparse(url).path.rstrip('/')
+
+    if path.endswith('limited-phones'):
+        return 'phones'
+    if 'graphql' in path:
+        return 'graphql'
+    if '/offers/metadata' in path:
+        return 'metadata'
+    if path.endswith('/api/v1/offers'):
+        return 'listing'
+    if 'geo-encoder' in path:
+        return 'geo'
+    if 'targeting' in path:
+        return 'targeting'
+    if 'friendly-links' in path:
+        return 'friendly-links'
+    if 'oauth2' in path:
+        return 'auth'
+    return 'html'
+
+
+def normalize_url(url: str) -> str:
+    """Приводит URL к единому виду: хост в нижнем регистре, параметры запроса отсортированы"""
+    parts = urlparse(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunparse((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', parts.params, query, ''))
+
+
 def format_date(iso_date):
     dt = datetime.fromisoformat(iso_date)
     return dt.strftime("%d.%m.%Y в %H:%M:%S")
@@ -2,8 +2,10 @@ import asyncio
 import os
 import time
 from copy import copy
+from textwrap import indent
 
 from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, NamedStyle, PatternFill
 from openpyxl.utils import get_column_letter
 from tqdm import tqdm
@@ -12,8 +14,9 @@ from yaspin import yaspin
 from Src.app.colors import *
 from Src.app.logging_config import logger
 from Src.parser.credentials import get_token
+from Src.parser.jsonlib import dumps
 from Src.parser.schemas import Offer
-from Src.parser.utils import validate_filename, clickable_file_link, save_json
+from Src.parser.utils import validate_filename, clickable_file_link, open_json, save_json
 
 lock = asyncio.Lock()
 
@@ -60,12 +63,24 @@ def register_styles(wb: Workbook):
     add_style(not_specified_status)
 
 
-def save_offers(content: list[Offer], region_id, region_name, city_id, city_name, category_id, category_name, out_dir, save_to_json, save_xls):
+def _find_offers_file(directory: str, prefix: str, extension: str) -> str | None:
+    """Ищет сохраненный файл категории (в том числе уже обработанный, с `+ ` в начале названия)"""
+    if not os.path.isdir(directory):
+        return None
+    for name in os.listdir(directory):
+        if name.removeprefix('+ ').startswith(prefix) and name.endswith(extension):
+            return os.path.join(directory, name)
+    return None
+
+
+def save_offers(content: list[Offer], region_id, region_name, city_id, city_name, category_id, category_name, out_dir, save_to_json, save_xls, merge=False):
     """
     Сохраняет список предложений (`Offer`) в указанные форматы (JSON и/или Excel) по заданной иерархии директорий.
 
     Формирует имя файла на основе ID и названия категории, создает директорию с учетом региона и города,
     а затем сохраняет данные в формате JSON и/или XLSX, если соответствующие флаги активированы.
+    Если передан `merge`, то новые предложения дописываются в уже сохраненный файл категории (без повторов),
+    а количество в названии файла обновляется.
 
     :param content: Список предложений для сохранения.
     :param region_id: Идентификатор региона.
@@ -77,17 +92,45 @@ def save_offers(content: list[Offer], region_id, region_name, city_id, city_name
     :param out_dir: Базовая директория для сохранения файлов.
     :param save_to_json: Флаг, указывающий, нужно ли сохранять данные в формате JSON.
     :param save_xls: Флаг, указывающий, нужно ли сохранять данные в формате XLSX.
+    :param merge: Флаг, указывающий, нужно ли дописать предложения в уже сохраненный файл категории.
     """
-    filename = validate_filename(f'{region_id}_{city_id}_{category_id}_{category_name}__offers({len(content)})')
+    prefix = validate_filename(f'{region_id}_{city_id}_{category_id}_')
+
+    def filename(count: int) -> str:
+        return validate_filename(f'{region_id}_{city_id}_{category_id}_{category_name}__offers({count})')
+
     file_path = os.path.join(out_dir, f"{region_name.replace(' ', '-')}_{region_id}", f"{city_name}_{city_id}")
     os.makedirs(file_path, exist_ok=True)
 
     if save_to_json:
-        save_json([item.model_dump() for item in content], os.path.join(out_dir, f'{filename}.json'))
+        existing_path = _find_offers_file(out_dir, prefix, '.json') if merge else None
+        if existing_path:
+            existing = open_json(existing_path) or []
+            seen_ids = {item.get('id') for item in existing}
+            # Новые предложения дописываются в конец, как и в XLSX
+            merged = existing + [item.model_dump() for item in content if item.id not in seen_ids]
+            merged_path = os.path.join(out_dir, f'{filename(len(merged))}.json')
+            save_json(merged, merged_path)
+            if existing_path != merged_path:
+                os.remove(existing_path)
+        else:
+            save_json([item.model_dump() for item in content], os.path.join(out_dir, f'{filename(len(content))}.json'))
 
     if save_xls:
+        existing_path = _find_offers_file(file_path, prefix, '.xlsx') if merge else None
         with yaspin(text='Сохранение') as spinner:
-            save_offers_excel(content, os.path.join(file_path, f'{filename}.xlsx'), show_info=False)
+            if existing_path:
+                wb = load_workbook(existing_path, read_only=True)
+                seen_ids = {row[0] for row in wb.active.iter_rows(min_row=2, values_only=True)}
+                wb.close()
+
+                new_offers = [item for item in content if item.id not in seen_ids]
+                if new_offers:
+                    save_offers_excel(new_offers, existing_path, show_info=False)
+                    # В файле появились строки без номеров, поэтому отметка обработки (`+ `) снимается
+                    os.replace(existing_path, os.path.join(file_path, f'{filename(len(seen_ids) + len(new_offers))}.xlsx'))
+            else:
+                save_offers_excel(content, os.path.join(file_path, f'{filename(len(content))}.xlsx'), show_info=False)
             time.sleep(1)
             spinner.stop()
 
@@ -192,6 +235,125 @@ def save_offers_excel(content: list[Offer], filepath: str, show_info: bool = Tru
         logger.error(f"Не удалось сохранить EXCEL файл: {e}")
 
 
+class OffersWriter:
+    """
+    Потоковая запись предложений (`Offer`) одной категории в XLSX и/или JSON по мере их получения.
+
+    XLSX пишется в режиме `write_only` (строки сразу уходят во временный файл openpyxl, ширина колонок задана заранее),
+    JSON - по одному объекту, поэтому память не растет с размером категории. Повторы убираются по ID.
+    Пока запись не завершена, файлы называются `*.part`, а в `close` получают такое же название, как у `save_offers`.
+
+    Параметры такие же, как у `save_offers`.
+    """
+    columns = [
+        ('ID', 14),
+        ('Объявление', 60),
+        ('Номер телефона', 20),
+        ('Продавец', 30),
+        ('Город', 20),
+        ('Описание', 100),
+        ('Стоимость USD', 16),
+        ('Стоимость UAH', 16),
+        ('Цена формат.', 20),
+        ('Дата публикации', 26),
+        ('Ссылка', 60),
+    ]
+
+    def __init__(self, region_id, region_name, city_id, city_name, category_id, category_name, out_dir, save_to_json, save_xls):
+        self._name = validate_filename(f'{region_id}_{city_id}_{category_id}_{category_name}')
+        self._out_dir = out_dir
+        self._file_path = os.path.join(out_dir, f"{region_name.replace(' ', '-')}_{region_id}", f"{city_name}_{city_id}")
+        os.makedirs(self._file_path, exist_ok=True)
+
+        self.count = 0
+        self._seen_ids = set()
+        self._json = None
+        self._wb = None
+        self._ws = None
+
+        if save_to_json:
+            self._json = open(os.path.join(self._out_dir, f'{self._name}.json.part'), 'w', encoding='utf-8')
+            self._json.write('[')
+
+        if save_xls:
+            self._wb = Workbook(write_only=True)
+            self._ws = self._wb.create_sheet("Объявления")
+            for col_num, (_, width) in enumerate(self.columns, 1):
+                self._ws.column_dimensions[get_column_letter(col_num)].width = width
+            self._ws.append([self._cell(header, font=Font(bold=True), alignment=Alignment(horizontal='center')) for header, _ in self.columns])
+
+    def _cell(self, value, font=None, alignment=None, hyperlink=None) -> WriteOnlyCell:
+        cell = WriteOnlyCell(self._ws, value=value)
+        cell.alignment = alignment or Alignment(horizontal='left')
+        if font:
+            cell.font = font
+        if hyperlink:
+            cell.hyperlink = hyperlink
+        return cell
+
+    def write(self, offers: list[Offer]) -> None:
+        for offer in offers:
+            if offer.id in self._seen_ids:
+                continue
+            self._seen_ids.add(offer.id)
+
+            if self._json:
+                # Тот же формат, что и у `save_json`: элементы списка с отступом 4 пробела
+                self._json.write(f"{',' if self.count else ''}\n{indent(dumps(offer.model_dump(), indent=True), '    ')}")
+
+            if self._ws:
+                self._ws.append([
+                    self._cell(offer.id),
+                    self._cell(offer.title, font=hlink_style, hyperlink=offer.url),
+                    self._cell(offer.phone_number),
+                    self._cell(offer.seller_name or ''),
+                    self._cell(offer.seller_city or ' '),
+                    self._cell(offer.description or ' '),
+                    self._cell(offer.price_usd or ' '),
+                    self._cell(offer.price_uah or ' '),
+                    self._cell(offer.price_str or ' '),
+                    self._cell(offer.posted_date or ''),
+                    self._cell(offer.url or '', font=hlink_style, hyperlink=offer.url),
+                ])
+
+            self.count += 1
+
+    def close(self) -> None:
+        """Завершает запись и переименовывает файлы с учетом количества предложений"""
+        filename = f'{self._name}__offers({self.count})'
+
+        if self._json:
+            self._json.write('\n]')
+            self._json.close()
+            os.replace(self._json.name, os.path.join(self._out_dir, f'{filename}.json'))
+            self._json = None
+
+        if self._wb:
+            part_path = os.path.join(self._file_path, f'{self._name}.xlsx.part')
+            try:
+                self._wb.save(part_path)
+                os.replace(part_path, os.path.join(self._file_path, f'{filename}.xlsx'))
+            except PermissionError as e:
+                logger.error(f"Не удалось сохранить EXCEL файл: {e}")
+            self._wb = None
+
+    def abort(self) -> None:
+        """Прерывает запись и удаляет незавершенные файлы"""
+        if self._json:
+            self._json.close()
+            os.remove(self._json.name)
+            self._json = None
+        if self._ws:
+            # Закрывает поток строк листа, иначе он пишет во временный файл уже после его закрытия
+            self._ws.close()
+            self._ws = None
+        if self._wb:
+            part_path = os.path.join(self._file_path, f'{self._name}.xlsx.part')
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        self._wb = None
+
+
 def merge_city_offers(bar: str, data_dir: str = None, region_name: str = None, region_id: int = None, city_name: str = None, city_id: int = None, force=None):
     print("🔄  Объединение таблиц")
     time.sleep(1)
@@ -304,25 +466,94 @@ def merge_city_offers(bar: str, data_dir: str = None, region_name: str = None, r
         logger.error(f"Не удалось сохранить EXCEL файл: {e}")
 
 
-async def process_cell(parser, n, item, total, counter, ws, wb, wb_path, save_every_n=20):
+class PhonesFile:
+    """
+    Таблица, в которую записываются номера телефонов при сборе из нескольких файлов одним пулом воркеров.
+    Хранит книгу, счетчики строк и номеров (`counter` для `process_cell`) и количество еще не обработанных строк.
+    Книга сохраняется пачками - каждые `save_every` окончательно обработанных строк, а когда обработаны все строки,
+    сохраняется последний раз и переименовывается в `+ <имя файла>`. Сохранения идут в отдельном потоке
+    по одному (`lock`), а `finalized` не дает завершить файл дважды.
+
+    :param wb_path: Путь до файла.
+    :param save_every: Сохранять книгу каждые x обработанных строк.
+    """
+
+    def __init__(self, wb_path: str, save_every: int = 500):
+        self.path = wb_path
+        self.save_every = save_every
+        self.wb = load_workbook(wb_path)
+        self.ws = self.wb.active
+        register_styles(self.wb)
+
+        self.total = max(self.ws.max_row - 1, 0)
+        self.counter = {'value': 0, 'phones': 0}
+        self.open = 0
+        self.fed = False
+        self.finalized = False
+        self.lock = asyncio.Lock()
+        self._resolved = 0
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+    @property
+    def done(self) -> bool:
+        """Все строки поданы в очередь и обработаны окончательно"""
+        return self.fed and not self.open
+
+    def rows(self):
+        """Строки листа со второй по одной (номер строки с 0 и значения)"""
+        return enumerate(self.ws.iter_rows(min_row=2, values_only=True))
+
+    def resolve(self) -> bool:
+        """Строка обработана окончательно. Возвращает True, если пора сохранить книгу"""
+        self.open -= 1
+        self._resolved += 1
+        return self._resolved % self.save_every == 0
+
+    def save(self) -> None:
+        if self.wb is None:
+            return
+        try:
+            self.wb.save(self.path)
+        except PermissionError as e:
+            logger.error(f"Не удалось сохранить EXCEL файл: {e}")
+
+    def finalize(self) -> str:
+        """Сохраняет книгу и переименовывает файл в `+ <имя файла>`. Возвращает новый путь"""
+        self.wb.save(self.path)
+        completed_path = os.path.join(os.path.dirname(self.path), f"+ {self.name}")
+        os.rename(self.path, completed_path)
+        self.wb = self.ws = None
+        return completed_path
+
+
+async def process_cell(parser, n, item, total, counter, ws, wb, wb_path, save_every_n=20, attempt=1, accounts=None) -> bool:
     """
     Обрабатывает ячейку таблицы.
-    Получает ячейку с данными об объявлении, потом получает номер телефона с OLX, и записывает телефон обратно в ячейку
+    Получает ячейку с данными об объявлении, потом получает номер телефона с OLX, и записывает телефон обратно в ячейку.
+    Если получена капча или ошибка, то ячейка не повторяется сразу, а возвращается True, чтобы повтор был отложен (`RetryQueue`)
 
     :param parser: olxParser
     :param n: Текущая итерация
     :param item: Данные объявления
     :param total: Общее количество обхявлений в файле
-    :param counter: Счетчик обраьотки ячеек
+    :param counter: Счетчик обраьотки ячеек (`value`) и полученных номеров (`phones`)
     :param ws: Рабочий лист
     :param wb: Рабочая книга
     :param wb_path: Путь до файла
     :param save_every_n: Сохранение файла каждые x итераций
-    :return:
+    :param attempt: Номер попытки (с 1)
+    :param accounts: Аккаунты, через которые номер уже запрашивался (повтор идет через другой аккаунт)
+    :return: True, если номер нужно запросить повторно
     """
-    async with lock:
-        counter['value'] += 1
-        progress = f"[{counter['value']} / {total}]"
+    if attempt == 1:
+        async with lock:
+            counter['value'] += 1
+            progress = f"[{counter['value']} / {total}]"
+    else:
+        progress = f"[🔁 {attempt} · {n + 2}]"
 
     offer_id = item[0]
     url = item[10]
@@ -335,31 +566,31 @@ async def process_cell(parser, n, item, total, counter, ws, wb, wb_path, save_ev
         number_cell.value = 'не указан'
         number_cell.style = 'not_specified_status'
         print(f"{progress}  ℹ  {DARK_GRAY}  Номер не указан {''.ljust(20)}{WHITE} · {url}")
-        return
+        return False
 
     if number_cell.value == 'не указан':
-        return
+        return False
 
     if number_cell.value == 'удален':
-        return
+        return False
 
     if number_cell.value == 'скрыт':
-        return
+        return False
 
     if digits.isdigit():
-        return
+        return False
 
-    response = await parser.get_phone_number(offer_id, response_only=True)
+    response = await parser.get_phone_number(offer_id, response_only=True, accounts=accounts)
     if isinstance(response, Exception):
         number_cell.value = 'ошибка'
         number_cell.style = 'error_status'
         print(f"{progress.ljust(12)}  ❌{RED}  Номер не получен: {WHITE}Ошибка при получении номера: {response} · {url}")
-        return
+        return True
     if response == {}:
         number_cell.value = 'Captcha'
         number_cell.style = 'error_status'
         print(f"{progress.ljust(12)}  ❌{RED}  Номер не получен: {WHITE}Captcha {''.ljust(9)} ·  {url}")
-        return
+        return True
 
     # Если ответ получен и есть ошибка, то ставим соответствующий статус в ячейку
     if 'error' in response:
@@ -384,6 +615,7 @@ async def process_cell(parser, n, item, total, counter, ws, wb, wb_path, save_ev
             if phone:
                 number_cell.value = phone
                 number_cell.style = 'success_status'
+                counter['phones'] = counter.get('phones', 0) + 1
                 print(f"{progress.ljust(12)}  ✔{GREEN}  Номер получен: {LIGHT_YELLOW}{phone.ljust(20)}{WHITE} · {url}")
             else:
                 print(f"{progress.ljust(12)}  ❌{RED}  Номер не получен: {WHITE} скрытый номер не удалось получить повторной попыткой · {url}")
@@ -396,22 +628,16 @@ async def process_cell(parser, n, item, total, counter, ws, wb, wb_path, save_ev
             phone = ' · '.join([str(p) for p in phones])
             number_cell.value = phone
             number_cell.style = 'success_status'
+            counter['phones'] = counter.get('phones', 0) + 1
             print(f"{progress.ljust(12)}  ✔{LIGHT_GREEN}  Номер получен: {LIGHT_YELLOW}{phone.ljust(20)}{WHITE} · {url}")
         else:
             print(f"{progress.ljust(12)}  ❌{DARK_GRAY}  Номер не указан {''.ljust(20)}{WHITE} · {url}")
 
-    # Если во время получения номера произошла ошибка или капча, то пытаемся еще раз получить номер
-    if number_cell.value == 'True' or number_cell.value == 'Captcha':
-        phone = await parser.get_phone_number(offer_id)
-        if phone:
-            number_cell.value = phone
-            number_cell.style = 'success_status'
-            print(f"{progress.ljust(12)}  ✔{LIGHT_CYAN}  Номер получен: {LIGHT_YELLOW}{phone.ljust(20)}{WHITE} · {url}")
-        else:
-            print(f"{progress.ljust(12)}  ❌{RED}  Номер не получен: {WHITE} Повторная попытка после получения капчи/ошибки не удалась · {url}")
-
-    # Сохраняем прогресс каждые N итераций
-    if (n + 1) % save_every_n == 0:
+    # Сохраняем прогресс каждые N итераций (при сборе через `PhonesFile` книга сохраняется пачками отдельно)
+    if save_every_n and (n + 1) % save_every_n == 0:
         async with lock:
             wb.save(wb_path)
         await get_token(exp_time_only=True)
+
+    # Если во время получения номера произошла ошибка или капча, то номер будет запрошен повторно через другой аккаунт
+    return number_cell.value in ('True', 'Captcha')
@@ -0,0 +1,99 @@
+import argparse
+import asyncio
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.olx_stub import CATEGORIES, REGIONS, serve
+from Src.parser.distributed import Coordinator
+from Src.parser.scheduler import CrawlScheduler
+from Src.parser.schemas import Region, City, Category
+
+
+def make_units(scale: float) -> list:
+    """Все категории всех городов тестового сервера"""
+    scheduler = CrawlScheduler()
+    for region_id, (region_name, cities) in REGIONS.items():
+        region = Region.model_construct(id=region_id, name=region_name, count=None, url=None)
+        for city_id, city_name in cities.items():
+            city = City(id=city_id, name=city_name)
+            for category_id, count in CATEGORIES.items():
+                scheduler.add(region, city, Category(category_id, f'Категория {category_id}', int(count * scale), None))
+    return scheduler.take_all()
+
+
+def start_workers(count: int, coordinator: str, olx_url: str) -> list[subprocess.Popen]:
+    """Запускает `count` воркеров (`python -m Src.parser.distributed`), которые ходят в тестовый сервер вместо OLX"""
+    env = {**os.environ, 'OLX_BASE_URL': olx_url, 'USE_PROXY': 'False'}
+    return [
+        subprocess.Popen([sys.executable, '-m', 'Src.parser.distributed', '--coordinator', coordinator, '--name', f'worker-{n}'], env=env)
+        for n in range(count)
+    ]
+
+
+async def crawl(units: list, coordinator: Coordinator, workers: list[subprocess.Popen], kill: bool, out_dir: str) -> tuple[int, int]:
+    """Собирает единицы работы воркерами. Если `kill`, то первый воркер завершается во время сбора категории, и она передается другому"""
+
+    async def kill_worker():
+        while not coordinator.leased('worker-0'):
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(0.5)
+        print(f'  ✖ Завершаем worker-0 (pid {workers[0].pid}) · Собирает: {coordinator.leased("worker-0")}')
+        workers[0].kill()
+
+    killer = asyncio.create_task(kill_worker()) if kill else None
+    done = failed = 0
+    async for unit, result in coordinator.drain(units, None, out_dir, False, True):
+        if result is None:
+            failed += 1
+        else:
+            done += 1
+    if killer:
+        killer.cancel()
+    return done, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Распределенный сбор на одном компьютере: тестовый сервер OLX, координатор и N воркеров')
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--scale', type=float, default=1.0, help='Множитель количества объявлений в категориях')
+    parser.add_argument('--latency', type=float, default=0.02, help='Задержка ответа тестового сервера в секундах')
+    parser.add_argument('--no-kill', action='store_true', help='Не завершать первый воркер во время сбора')
+    parser.add_argument('--lease-ttl', type=float, default=3.0)
+    parser.add_argument('--stub-port', type=int, default=8791)
+    parser.add_argument('--port', type=int, default=8780)
+    args = parser.parse_args()
+
+    stub = serve(args.stub_port, args.scale, args.latency)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    units = make_units(args.scale)
+    address = f'127.0.0.1:{args.port}'
+    coordinator = Coordinator(address, lease_ttl=args.lease_ttl)
+    workers = start_workers(args.workers, address, f'http://127.0.0.1:{args.stub_port}')
+
+    print(f'Воркеров: {args.workers} · Категорий: {len(units)} · Объявлений: {sum(u.category.count for u in units)}')
+    with tempfile.TemporaryDirectory() as out_dir:
+        start = time.perf_counter()
+        try:
+            done, failed = asyncio.run(crawl(units, coordinator, workers, not args.no_kill, out_dir))
+        finally:
+            for worker in workers:
+                worker.wait(timeout=30) if worker.poll() is None else None
+            stub.shutdown()
+        elapsed = time.perf_counter() - start
+
+        files = glob.glob(os.path.join(out_dir, '**', '*.xlsx'), recursive=True)
+        offers = sum(int(f.rsplit('(', 1)[1].split(')')[0]) for f in files if '__offers(' in f)
+
+    coordinator.report()
+    print(f'Собрано категорий: {done} (ошибок: {failed}) · Файлов: {len(files)} · Объявлений: {offers} · '
+          f'{elapsed:.1f} с · {offers / elapsed:.0f} объявл./с')
+
+
+if __name__ == '__main__':
+    main()
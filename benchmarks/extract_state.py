@@ -0,0 +1,41 @@
+from bs4 import BeautifulSoup as BS
+
+from Src.parser import extract
+from Src.parser.jsonlib import loads
+from benchmarks.json_decode import PRERENDERED_STATE, per_page
+from benchmarks.pages import html_pages
+
+
+def state_bs(html_text: str):
+    # Прежний путь: DOM целиком, затем перебор всех скриптов
+    html = BS(html_text, 'html.parser')
+    script_text = next((item.get_text(strip=True) for item in html.find_all('script') if item.get('id') == 'olx-init-config'), None)
+    match = PRERENDERED_STATE.search(script_text + '\n')
+    return loads(loads(match.group(1)))
+
+
+def ld_json_bs(html_text: str):
+    html = BS(html_text, 'html.parser')
+    script_text = next((item.get_text(strip=True) for item in html.find_all('script') if '@type' in item.text), None)
+    return loads(script_text)
+
+
+def main():
+    pages = [page.decode('utf-8') for _, page in html_pages()]
+
+    for page in pages:
+        assert extract.prerendered_state(page) == state_bs(page), 'Результаты извлечения не совпадают'
+
+    print(f'Страниц: {len(pages)} · {sum(map(len, pages)) // len(pages) // 1024} КБ/стр.')
+    for name, slow, fast in (
+            ('__PRERENDERED_STATE__', state_bs, extract.prerendered_state),
+            ('JSON-LD', ld_json_bs, extract.ld_json),
+    ):
+        before, after = per_page(slow, pages, repeat=3), per_page(fast, pages, repeat=3)
+        print(f'{name}:')
+        print(f'  BeautifulSoup: {before:8.3f} мс/стр.')
+        print(f'  extract:       {after:8.3f} мс/стр. · x{before / after:.1f}')
+
+
+if __name__ == '__main__':
+    main()
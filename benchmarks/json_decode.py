@@ -0,0 +1,57 @@
+import json
+import re
+import time
+
+from Src.parser import jsonlib
+from benchmarks.pages import html_pages, listing_pages
+
+PRERENDERED_STATE = re.compile(r'window.__PRERENDERED_STATE__= (".*?");(?:\r\n|\r|\n)', re.DOTALL)
+
+
+def per_page(func, pages: list[bytes], repeat: int = 5) -> float:
+    """Лучшее из `repeat` время обработки одной страницы в миллисекундах"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            func(page)
+        best = min(best, time.perf_counter() - start)
+    return best / len(pages) * 1000
+
+
+def api_stdlib(raw: bytes):
+    # Как `response.json()`: байты -> str -> json
+    return json.loads(raw.decode('utf-8'))
+
+
+def api_fast(raw: bytes):
+    return jsonlib.loads(raw)
+
+
+def state_stdlib(state: str):
+    return json.loads(json.loads(state))
+
+
+def state_fast(state: str):
+    return jsonlib.loads(jsonlib.loads(state))
+
+
+def main():
+    listings = [page for _, page in listing_pages()]
+    # Поиск скрипта не входит в замер, только декодирование строки состояния
+    htmls = [PRERENDERED_STATE.search(page.decode('utf-8')).group(1) for _, page in html_pages()]
+
+    print(f'JSON backend: {jsonlib.backend}')
+    print(f'API ответ:             {len(listings)} стр. · {sum(map(len, listings)) // len(listings) // 1024} КБ/стр.')
+    before, after = per_page(api_stdlib, listings), per_page(api_fast, listings)
+    print(f'  json:   {before:8.3f} мс/стр.')
+    print(f'  {jsonlib.backend}: {after:8.3f} мс/стр. · x{before / after:.1f}')
+
+    print(f'__PRERENDERED_STATE__: {len(htmls)} стр. · {sum(map(len, htmls)) // len(htmls) // 1024} КБ/стр.')
+    before, after = per_page(state_stdlib, htmls), per_page(state_fast, htmls)
+    print(f'  json:   {before:8.3f} мс/стр.')
+    print(f'  {jsonlib.backend}: {after:8.3f} мс/стр. · x{before / after:.1f}')
+
+
+if __name__ == '__main__':
+    main()
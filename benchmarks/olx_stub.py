@@ -0,0 +1,139 @@
+import argparse
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+from Src.parser.jsonlib import dumps
+from benchmarks.pages import make_offer
+
+# Регионы и города тестового сервера {ID региона: (название, {ID города: название})}
+REGIONS = {
+    1: ('Винницкая область', {101: 'Винница', 102: 'Жмеринка'}),
+    2: ('Киевская область', {201: 'Киев', 202: 'Бровары'}),
+}
+
+# Категории и количество объявлений в каждом городе. Больше 1000 - запрос делится по районам
+CATEGORIES = {1: 1800, 2: 600, 3: 240, 4: 90, 5: 30}
+DISTRICTS = 4
+LIMIT = 1000
+
+
+class StubState:
+    """Данные тестового сервера: объявления создаются один раз для каждой категории города"""
+
+    def __init__(self, scale: float = 1.0, latency: float = 0.0):
+        self.scale = scale
+        self.latency = latency
+        self.requests = 0
+        self._offers: dict[tuple[int, int], list[dict]] = {}
+
+    def offers(self, category_id: int, city_id: int) -> list[dict]:
+        key = (category_id, city_id)
+        if key not in self._offers:
+            random.seed(category_id * 1000 + city_id)
+            count = int(CATEGORIES.get(category_id, 0) * self.scale)
+            offers = []
+            for n in range(count):
+                offer = make_offer(city_id * 10_000_000 + category_id * 100_000 + n)
+                offer['created_time'] = time.strftime('%Y-%m-%dT%H:%M:%S+03:00', time.gmtime(1_750_000_000 - n * 60))
+                offer['location']['district'] = {'id': n % DISTRICTS + 1}
+                offers.append(offer)
+            self._offers[key] = offers
+        return self._offers[key]
+
+
+def _listing(state: StubState, query: dict) -> dict:
+    offers = state.offers(int(query.get('category_id', 0)), int(query.get('city_id', 0)))
+    if 'district_id' in query:
+        offers = [o for o in offers if o['location']['district']['id'] == int(query['district_id'])]
+    if query.get('sort_by') == 'created_at:desc':
+        offers = sorted(offers, key=lambda o: o['created_time'], reverse=True)
+
+    page_offset, page_limit = int(query.get('offset', 0)), int(query.get('limit', 40))
+    districts = {}
+    for offer in offers:
+        district = offer['location']['district']['id']
+        districts[district] = districts.get(district, 0) + 1
+
+    return {
+        'data': offers[page_offset:min(page_offset + page_limit, LIMIT)],
+        'metadata': {
+            'total_elements': len(offers),
+            'visible_total_count': min(len(offers), LIMIT),
+            'facets': {'district': [{'id': k, 'count': v, 'label': f'Район {k}'} for k, v in sorted(districts.items())]},
+        },
+    }
+
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            state.requests += 1
+            if state.latency:
+                time.sleep(state.latency)
+
+            url = urlparse(self.path)
+            path, query = url.path.rstrip('/'), dict(parse_qsl(url.query))
+
+            if path == '/api/v1/offers':
+                body = _listing(state, query)
+            elif path == '/api/v1/offers/metadata/search':
+                offers = state.offers(int(query.get('category_id', 0)), int(query.get('city_id', 0)))
+                body = {'data': {'total_count': len(offers), 'visible_total_count': min(len(offers), LIMIT), 'facets': {}}}
+            elif path == '/api/v1/offers/metadata/search-categories':
+                body = {'data': {'categories': [{'id': k, 'count': int(v * state.scale)} for k, v in CATEGORIES.items() if int(v * state.scale)]}}
+            elif path == '/api/v1/geo-encoder/regions':
+                body = {'data': [{'id': k, 'name': name} for k, (name, _) in REGIONS.items()]}
+            elif path.startswith('/api/v1/geo-encoder/regions/') and path.endswith('/cities'):
+                _, cities = REGIONS.get(int(path.split('/')[-2]), ('', {}))
+                body = {'data': [{'id': k, 'name': name} for k, name in cities.items()]}
+            elif path == '/api/v1/targeting/data':
+                category_id = query.get('params[category_id]')
+                body = {'data': {'targeting': {'cat_l0_name': 'Тестовые категории', 'cat_l1_name': f'Категория {category_id}'}}}
+            elif path == '/stats':
+                body = {'requests': state.requests}
+            else:
+                body = {'error': {'detail': 'Not found'}}
+
+            content = dumps(body).encode('utf-8')
+            self.send_response(404 if 'error' in body else 200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Клиент (воркер) завершился, не дочитав ответ
+        pass
+
+
+def serve(port: int, scale: float = 1.0, latency: float = 0.0) -> StubServer:
+    """Создает тестовый сервер OLX на `127.0.0.1:port` (запуск - `serve_forever`)"""
+    return StubServer(('127.0.0.1', port), make_handler(StubState(scale, latency)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Тестовый сервер API OLX (регионы, города, категории, списки объявлений)')
+    parser.add_argument('--port', type=int, default=8791)
+    parser.add_argument('--scale', type=float, default=1.0, help='Множитель количества объявлений в категориях')
+    parser.add_argument('--latency', type=float, default=0.0, help='Задержка ответа в секундах')
+    args = parser.parse_args()
+
+    print(f'OLX stub: http://127.0.0.1:{args.port} · OLX_BASE_URL=http://127.0.0.1:{args.port}')
+    serve(args.port, args.scale, args.latency).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
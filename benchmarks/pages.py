@@ -0,0 +1,94 @@
+import glob
+import json
+import os
+import random
+
+fixtures_dir = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def make_offer(offer_id: int) -> dict:
+    """Объявление в формате `/api/v1/offers/`"""
+    price = random.randint(100, 100_000)
+    return {
+        'id': offer_id,
+        'url': f'https://www.olx.ua/d/uk/obyavlenie/tovar-{offer_id}-ID{offer_id:x}.html',
+        'title': f'Товар №{offer_id} в отличном состоянии',
+        'description': 'Продам в связи с переездом.<br />Состояние отличное, торг уместен.<br />' * 8,
+        'created_time': '2025-06-01T12:00:00+03:00',
+        'last_refresh_time': '2025-06-02T12:00:00+03:00',
+        'params': [
+            {'key': 'price', 'name': 'Цена', 'type': 'price', 'value': {'value': price, 'currency': 'UAH', 'label': f'{price} грн.', 'converted_value': price // 41}},
+            {'key': 'state', 'name': 'Состояние', 'type': 'select', 'value': {'key': 'used', 'label': 'Б/у'}},
+        ],
+        'contact': {'name': 'Продавец', 'phone': True, 'chat': True, 'negotiation': True},
+        'location': {'city': {'id': 268, 'name': 'Киев'}, 'region': {'id': 25, 'name': 'Киевская область'}},
+        'photos': [{'id': offer_id * 10 + n, 'link': f'https://ireland.apollo.olxcdn.com/v1/files/{offer_id}-{n}/image;s={{width}}x{{height}}'} for n in range(8)],
+        'category': {'id': 1532, 'type': 'goods'},
+    }
+
+
+def make_listing(count: int = 50) -> dict:
+    """Страница ответа API со списком объявлений"""
+    return {
+        'data': [make_offer(1000 + n) for n in range(count)],
+        'metadata': {'total_elements': 1000, 'visible_total_count': 1000, 'promoted': []},
+        'links': {'next': {'href': 'https://www.olx.ua/api/v1/offers/?offset=50&limit=50'}},
+    }
+
+
+def make_html(count: int = 50) -> str:
+    """HTML страница со скриптом `olx-init-config` (`__PRERENDERED_STATE__`) и JSON-LD блоком"""
+    state = {
+        'listing': {'listing': {'ads': [make_offer(1000 + n) for n in range(count)], 'totalPages': 25, 'totalElements': 1000}},
+        'ad': {'ad': make_offer(999)},
+    }
+    prerendered = json.dumps(json.dumps(state, ensure_ascii=False), ensure_ascii=False)
+    ld_json = json.dumps({'@context': 'https://schema.org', '@type': 'Product', 'name': 'Товар', 'sku': '999'}, ensure_ascii=False)
+    filler = ''.join(f'<div class="css-{n}"><a href="/d/uk/obyavlenie/{n}.html"><span>Товар {n}</span></a></div>' for n in range(count * 40))
+
+    return (
+        '<!DOCTYPE html><html lang="uk"><head><meta charset="utf-8"><title>OLX</title>'
+        '<script type="text/javascript">window.dataLayer = [];</script>'
+        f'<script type="application/ld+json">{ld_json}</script>'
+        f'</head><body>{filler}'
+        '<script type="text/javascript" id="olx-init-config">\n'
+        f'window.__PRERENDERED_STATE__= {prerendered};\n'
+        'window.__TAURUS__= {};\n'
+        '</script></body></html>'
+    )
+
+
+def html_pages(count: int = 20) -> list[tuple[str, bytes]]:
+    """
+    Сохраненные страницы из `benchmarks/fixtures/*.html`, а если их нет - синтетические
+
+    :param count: Количество синтетических страниц.
+    :return: Список (название, содержимое).
+    """
+    pages = []
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.html'))):
+        with open(path, 'rb') as file:
+            pages.append((os.path.basename(path), file.read()))
+    if pages:
+        return pages
+
+    random.seed(0)
+    return [(f'synthetic_{n}.html', make_html().encode('utf-8')) for n in range(count)]
+
+
+def listing_pages(count: int = 20) -> list[tuple[str, bytes]]:
+    """
+    Сохраненные ответы API из `benchmarks/fixtures/*.json`, а если их нет - синтетические
+
+    :param count: Количество синтетических страниц.
+    :return: Список (название, содержимое).
+    """
+    pages = []
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.json'))):
+        with open(path, 'rb') as file:
+            pages.append((os.path.basename(path), file.read()))
+    if pages:
+        return pages
+
+    random.seed(0)
+    return [(f'synthetic_{n}.json', json.dumps(make_listing(), ensure_ascii=False).encode('utf-8')) for n in range(count)]
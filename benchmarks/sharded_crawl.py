@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.pages import listing_pages
+
+# Сколько раз каждая страница проходит через конвейер в одном замере
+ROUNDS = 20
+
+
+def process_shard(pages: list[bytes], out_dir: str) -> int:
+    """Работа одного процесса сбора без сети: разбор JSON, форматирование объявлений и запись XLSX/JSON"""
+    from Src.parser.jsonlib import loads
+    from Src.parser.olx import olxParser
+    from Src.tables.olx import OffersWriter
+
+    writer = OffersWriter(os.getpid(), 'bench', 1, 'city', 1, 'category', out_dir, True, True)
+    count = 0
+    for _ in range(ROUNDS):
+        for page in pages:
+            offers = [olxParser._format_offer(offer) for offer in loads(page).get('data') or []]
+            writer.write(offers)
+            count += len(offers)
+    writer.close()
+    return count
+
+
+def run(pages: list[bytes], processes: int) -> float:
+    """Объявлений в секунду при делении страниц между `processes` процессами"""
+    shards = [pages[n::processes] for n in range(processes)]
+    with tempfile.TemporaryDirectory() as out_dir, ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+        # Запуск процессов и импорт модулей не входят в замер
+        list(pool.map(process_shard, [[] for _ in range(processes)], [out_dir] * processes))
+
+        start = time.perf_counter()
+        count = sum(pool.map(process_shard, shards, [out_dir] * processes))
+        return count / (time.perf_counter() - start)
+
+
+def main():
+    cores = os.cpu_count() or 1
+    max_processes = int(sys.argv[1]) if len(sys.argv) > 1 else cores
+    pages = [page for _, page in listing_pages(count=max(40, max_processes * 4))]
+
+    print(f'Ядер: {cores} · Страниц: {len(pages)} x {ROUNDS}')
+    base = None
+    for processes in range(1, max_processes + 1):
+        rate = run(pages, processes)
+        base = base or rate
+        print(f'  процессов: {processes:2} · {rate:10.0f} объявл./с · x{rate / base:.2f}')
+
+
+if __name__ == '__main__':
+    main()
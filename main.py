@@ -8,8 +8,17 @@ from time import perf_counter
 from Src.app.colors import *
 from Src.app.logging_config import logger
 from Src.menu import banner, main_menu, choose_region, choose_city, choose_file, choose_parsed_city, authorize
-from Src.parser.credentials import get_token
+from Src.parser.accounts import account_pool
+from Src.parser.authorization import browser_pool
+from Src.parser.cache import response_cache
+from Src.parser.concurrency import limiters, loop_lag
+from Src.parser.credentials import get_token, token_managers
+from Src.parser.journal import journal
 from Src.parser.olx import olxParser
+from Src.parser.proxies import proxy_pool
+from Src.parser.retry import retry_stats
+from Src.parser.session import session_pool
+from Src.parser.singleflight import request_flight, token_flight
 from Src.parser.utils import format_proxies
 
 __version__ = 'v 1.2.0'
@@ -42,16 +51,10 @@ async def main():
             await parser.parse_phones_from_file(choosed_filename, show_info=True)
 
         elif choice == '3':
-            parsed_files = choose_parsed_city()
-            for n_file, filepath in enumerate(parsed_files):
-                filename = os.path.basename(filepath)
-
-                if os.path.basename(filename).startswith('+'):
-                    continue
-
-                await get_token(exp_time_only=True, show_info=False)
-                print(f"[{LIGHT_BLUE}{n_file + 1} / {len(parsed_files)}{WHITE}]  {filename}")
-                await parser.parse_phones_from_file(filepath, show_info=False)
+            # Все необработанные файлы города обрабатываются вместе одним пулом воркеров
+            parsed_files = [filepath for filepath in choose_parsed_city() if not os.path.basename(filepath).startswith('+')]
+            await get_token(exp_time_only=True, show_info=False)
+            await parser.parse_phones_from_files(parsed_files)
             print(f"✔️  Все файлы в обработаны")
 
         elif choice == '4':
@@ -59,7 +62,7 @@ async def main():
             parser.merge_parsed_files(parsed_files)
 
         elif choice == '5':
-            authorize()
+            await authorize()
 
         elif '-' in choice:
             parts = choice.split('-')
@@ -81,6 +84,23 @@ async def main():
     finally:
         end = perf_counter() - start
         print('\n')
+        session_pool.report()
+        proxy_pool.report()
+        retry_stats.report()
+        limiters.report()
+        response_cache.report()
+        request_flight.report()
+        token_flight.report()
+        account_pool.report()
+        journal.report()
+        for manager in token_managers.values():
+            manager.report()
+        loop_lag.report()
+        for manager in token_managers.values():
+            await manager.close()
+        await browser_pool.close()
+        await session_pool.close()
+        journal.close()
         logger.info(f"[Finished in {end:.2f}s]")
 
         print('\n[процесс завершил работу с кодом 0]')
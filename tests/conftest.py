@@ -0,0 +1,27 @@
+import os
+import sys
+import threading
+
+import pytest
+
+# Настройки до импорта модулей `Src`: адрес OLX читается при импорте `olxParser`, поэтому запросы идут в тестовый сервер
+STUB_PORT = 8795
+os.environ.setdefault('DEBUG', 'False')
+os.environ.setdefault('MAX_WORKERS', '4')
+os.environ['USE_PROXY'] = 'False'
+os.environ.setdefault('PROXY', '')
+os.environ['DISTRIBUTED'] = 'False'
+os.environ['OLX_BASE_URL'] = f'http://127.0.0.1:{STUB_PORT}'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def olx_stub():
+    """Тестовый сервер OLX (`benchmarks.olx_stub`) на время всех тестов"""
+    from benchmarks.olx_stub import serve
+
+    server = serve(STUB_PORT)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
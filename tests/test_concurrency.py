@@ -0,0 +1,58 @@
+import asyncio
+
+from Src.parser.concurrency import AdaptiveLimiter
+
+
+def test_additive_increase():
+    limiter = AdaptiveLimiter('test', initial=4, maximum=8)
+    for _ in range(40):
+        limiter.on_success(0.1)
+    assert 8 >= limiter.limit > 6
+
+    for _ in range(100):
+        limiter.on_success(0.1)
+    assert limiter.limit == 8
+
+
+def test_no_increase_when_latency_grows():
+    limiter = AdaptiveLimiter('test', initial=4)
+    limiter.on_success(0.1)
+    limit = limiter.limit
+    for _ in range(20):
+        limiter.on_success(5.0)
+    assert limiter.limit == limit
+
+
+def test_multiplicative_decrease_with_cooldown():
+    limiter = AdaptiveLimiter('test', initial=16, minimum=2, cooldown=60)
+    limiter.on_congestion('rate_limit')
+    assert limiter.limit == 8
+
+    # Повторная перегрузка из того же окна не уменьшает лимит
+    limiter.on_congestion('rate_limit')
+    assert limiter.limit == 8
+    assert limiter.cuts == 1
+
+    limiter.cooldown = 0
+    for _ in range(10):
+        limiter.on_congestion('rate_limit')
+    assert limiter.limit == 2
+
+
+def test_limit_caps_in_flight():
+    async def main():
+        limiter = AdaptiveLimiter('test', initial=3)
+        active = peak = 0
+
+        async def request():
+            nonlocal active, peak
+            async with limiter:
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*[request() for _ in range(20)])
+        return peak
+
+    assert asyncio.run(main()) == 3
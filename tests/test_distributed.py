@@ -0,0 +1,63 @@
+import asyncio
+
+from Src.parser.distributed import Coordinator
+from Src.parser.scheduler import CrawlScheduler
+from Src.parser.schemas import Region, City, Category
+
+
+def make_units(count: int) -> list:
+    scheduler = CrawlScheduler()
+    region = Region.model_construct(id=1, name='Регион', count=None, url=None)
+    for category_id in range(1, count + 1):
+        scheduler.add(region, City(id=101, name='Город'), Category(category_id, 'Категория', 10, None))
+    return scheduler.take_all()
+
+
+def test_expired_lease_goes_back_to_queue():
+    async def main():
+        coordinator = Coordinator('127.0.0.1:0', lease_ttl=0.2, max_attempts=2)
+        coordinator._pending.extend(make_units(1))
+
+        lease = coordinator._lease('worker-0')
+        assert lease['lease'] is not None
+        assert coordinator.leased('worker-0') == ['1:101:1']
+        # Пока категория выдана, другие воркеры ждут
+        assert coordinator._lease('worker-1') == {'lease': None, 'done': False}
+
+        expiry = asyncio.create_task(coordinator._expire_loop())
+        await asyncio.sleep(0.5)
+        assert coordinator.leased('worker-0') == []
+        assert coordinator.reassigned == 1
+
+        # Категория выдается другому воркеру, а после `max_attempts` попыток отдается как неудачная
+        assert coordinator._lease('worker-1')['unit'] == lease['unit']
+        await asyncio.sleep(0.5)
+        expiry.cancel()
+        await asyncio.gather(expiry, return_exceptions=True)
+        return coordinator._results.get_nowait()
+
+    unit, result = asyncio.run(main())
+    assert unit.key == '1:101:1'
+    assert result is None
+
+
+def test_heartbeat_extends_lease():
+    async def main():
+        coordinator = Coordinator('127.0.0.1:0', lease_ttl=0.3)
+        coordinator._pending.extend(make_units(1))
+        lease = coordinator._lease('worker-0')
+
+        expiry = asyncio.create_task(coordinator._expire_loop())
+        for _ in range(6):
+            await asyncio.sleep(0.1)
+            assert (await coordinator._dispatch({'op': 'heartbeat', 'lease': lease['lease']}))['ok']
+        expiry.cancel()
+        await asyncio.gather(expiry, return_exceptions=True)
+
+        # Аренда, которой больше нет, не продлевается
+        reply = await coordinator._dispatch({'op': 'heartbeat', 'lease': 'unknown'})
+        return coordinator.reassigned, reply
+
+    reassigned, reply = asyncio.run(main())
+    assert reassigned == 0
+    assert reply == {'ok': False}
@@ -0,0 +1,64 @@
+from Src.parser.journal import DONE, FAILED, PENDING, RUNNING, JobJournal
+
+
+def test_resume_after_crash(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    journal = JobJournal(path)
+    journal.start_run('all_all')
+    unit_id = journal.start_unit('all_all', '1:101:1')
+    journal.plan_pages(unit_id, [('u0', 0), ('u1', 50), ('u2', 100)])
+    journal.start_pages(unit_id, ['u0', 'u1', 'u2'])
+    journal.finish_page(unit_id, 'u0', [{'id': 1}])
+    journal.fail_page(unit_id, 'u2', 'timeout')
+    journal.close()
+
+    # Новый запуск: страницы, которые загружались во время сбоя, снова в очереди, загруженные - с объявлениями
+    journal = JobJournal(path)
+    journal.start_run('all_all')
+    assert journal.pages(unit_id) == [('u0', 0, DONE), ('u1', 50, PENDING), ('u2', 100, FAILED)]
+    assert journal.page_offers(unit_id, 'u0') == [{'id': 1}]
+    assert journal.failed_pages(unit_id) == 2
+    assert journal.done_units('all_all') == set()
+
+    # Повторное планирование не сбрасывает загруженные страницы
+    journal.plan_pages(unit_id, [('u0', 0), ('u1', 50), ('u2', 100)])
+    assert journal.pages(unit_id)[0] == ('u0', 0, DONE)
+
+    journal.finish_page(unit_id, 'u1', [])
+    journal.finish_page(unit_id, 'u2', [])
+    journal.finish_unit(unit_id)
+    assert journal.done_units('all_all') == {'1:101:1'}
+    assert journal.page_offers(unit_id, 'u0') == []
+    journal.close()
+
+
+def test_running_units_are_pending_again(tmp_path):
+    journal = JobJournal(str(tmp_path / 'jobs.sqlite3'))
+    unit_id = journal.start_unit('run', '1:1:1')
+    assert journal.conn.execute('SELECT state FROM units WHERE id = ?', (unit_id,)).fetchone()[0] == RUNNING
+
+    journal.start_run('run')
+    assert journal.conn.execute('SELECT state FROM units WHERE id = ?', (unit_id,)).fetchone()[0] == PENDING
+
+    journal.mark_done('run', '1:1:2')
+    assert journal.done_units('run') == {'1:1:2'}
+
+    journal.clear_run('run')
+    assert journal.done_units('run') == set()
+    journal.close()
+
+
+def test_watermark(tmp_path):
+    journal = JobJournal(str(tmp_path / 'jobs.sqlite3'))
+    assert journal.watermark('1:1:1') is None
+
+    journal.set_watermark('1:1:1', [
+        {'id': 1, 'created_time': '2025-06-01T10:00:00+03:00'},
+        {'id': 2, 'created_time': '2025-06-02T10:00:00+03:00'},
+    ])
+    watermark = journal.watermark('1:1:1')
+    assert watermark.newest == '2025-06-02T10:00:00+03:00'
+    assert watermark.is_known({'id': 1})
+    assert watermark.is_known({'id': 3, 'created_time': '2025-05-01T10:00:00+03:00'})
+    assert not watermark.is_known({'id': 4, 'created_time': '2025-06-03T10:00:00+03:00'})
+    journal.close()
@@ -0,0 +1,64 @@
+import asyncio
+
+from Src.parser.constants import max_limit, offset
+from Src.parser.olx import olxParser
+from Src.parser.schemas import OffersMeta
+from Src.parser.session import session_pool
+
+
+def test_page_offsets():
+    assert olxParser._page_offsets(0) == []
+    assert olxParser._page_offsets(max_limit) == []
+    assert olxParser._page_offsets(max_limit + 1) == [max_limit]
+    # Дальше `offset` API объявления не отдает
+    assert olxParser._page_offsets(5000)[-1] == offset - max_limit
+    assert len(olxParser._page_offsets(5000)) == offset // max_limit - 1
+
+
+def test_plan_partitions_against_stub(olx_stub):
+    async def main():
+        parser = olxParser(False, False)
+        try:
+            large = await parser._plan_partitions(parser._listing_params(1, 1, 101))
+            small = await parser._plan_partitions(parser._listing_params(2, 1, 101))
+        finally:
+            await session_pool.close()
+        return large, small
+
+    # Ограничители и сессии привязаны к циклу событий, поэтому оба запроса идут в одном цикле
+    large, small = asyncio.run(main())
+
+    # 1800 объявлений категории делятся на 4 района по 450
+    assert len(large) == 4
+    assert sum(meta.total for _, _, meta in large) == 1800
+    assert all(meta.total <= offset and len(first_page) == max_limit for _, first_page, meta in large)
+    assert {params['district_id'] for params, _, _ in large} == {1, 2, 3, 4}
+
+    [(params, first_page, meta)] = small
+    assert meta.total == 600
+    assert 'district_id' not in params
+
+
+def test_price_ranges_are_half_open():
+    """Объявление с ценой на границе попадает только в одну часть"""
+    prices = [None] * 30 + [float(500 * (n % 40)) for n in range(6000)]
+
+    async def first_page(params):
+        low, high = params.get('filter_float_price:from'), params.get('filter_float_price:to')
+        selected = [
+            price for price in prices
+            if (low is None and high is None) or (price is not None and price >= float(low) and (high is None or price <= float(high)))
+        ]
+        return [], OffersMeta(len(selected), min(len(selected), offset), []), {}
+
+    async def categories():
+        return []
+
+    parser = olxParser(False, False)
+    parser._offers_from_first_page = first_page
+    parser.get_categories = categories
+    leaves = asyncio.run(parser._plan_partitions({'category_id': 1}))
+
+    # Объявления без цены не попадают ни в одну часть
+    assert sum(meta.total for _, _, meta in leaves) == 6000
+    assert all(meta.total <= offset for _, _, meta in leaves)
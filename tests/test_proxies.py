@@ -0,0 +1,52 @@
+import asyncio
+
+from Src.parser.proxies import ProxyPool
+
+
+def test_pick_least_loaded():
+    pool = ProxyPool(['a', 'b'], workers=4)
+    pool.states['a'].in_flight = 2
+    assert pool.pick() == 'b'
+    assert pool.pick(exclude={'b'}) == 'a'
+    assert pool.pick(only=['a']) == 'a'
+
+
+def test_failure_puts_proxy_on_cooldown():
+    pool = ProxyPool(['a', 'b'], workers=4, cooldown=60)
+    pool.failure('a', 'blocked')
+    assert pool.states['a'].blocked == 1
+    assert pool.pick() == 'b'
+
+    # Все прокси на паузе: выбирается тот, у которого пауза закончится раньше
+    pool.failure('b')
+    pool.failure('b')
+    assert pool.pick() == 'a'
+
+
+def test_success_resets_strikes():
+    pool = ProxyPool(['a'], workers=1, cooldown=1)
+    pool.failure('a')
+    pool.failure('a')
+    assert pool.states['a'].strikes == 2
+
+    pool.success('a', 0.5)
+    assert pool.states['a'].strikes == 0
+    assert pool.states['a'].latency == 0.5
+    assert pool.states['a'].success_rate == 1 / 3
+
+
+def test_waiting_requests_count_in_load():
+    async def main():
+        pool = ProxyPool(['a', 'b', 'c', 'd', 'e'], workers=10)
+        picked = []
+
+        async def request():
+            async with pool.slot() as proxy:
+                picked.append(proxy)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[request() for _ in range(40)])
+        return picked
+
+    picked = asyncio.run(main())
+    assert sorted(picked.count(p) for p in 'abcde') == [8] * 5
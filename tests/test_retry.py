@@ -0,0 +1,48 @@
+from curl_cffi.requests.exceptions import ProxyError, Timeout
+
+from Src.parser.request import Reply
+from Src.parser.retry import Failure, RetryPolicy, RetryQueue
+
+
+def test_classify():
+    policy = RetryPolicy(deadline=10)
+    assert policy.classify(Reply(200, {})) is None
+    assert policy.classify(Reply(404, {})) is None
+    assert policy.classify(Reply(401, {})) == Failure.AUTH
+    assert policy.classify(Reply(407, '')) == Failure.PROXY
+    assert policy.classify(Reply(429, {})) == Failure.RATE_LIMIT
+    assert policy.classify(Reply(403, '<html><title>ERROR: The request could not be satisfied</title></html>')) == Failure.CLOUDFRONT
+    assert policy.classify(Reply(503, '')) == Failure.SERVER
+    assert policy.classify(Reply(418, '')) == Failure.UNKNOWN
+
+
+def test_classify_errors():
+    policy = RetryPolicy(deadline=10)
+    assert policy.classify(Reply(0, '', error=ProxyError('proxy'))) == Failure.PROXY
+    assert policy.classify(Reply(0, '', error=Timeout('timeout'))) == Failure.TIMEOUT
+    assert policy.classify(Reply(0, '', error=ConnectionError('reset'))) == Failure.NETWORK
+    assert policy.classify(Reply(0, '', error=ConnectionError('reset'), proxy='http://p')) == Failure.PROXY
+
+
+def test_backoff():
+    policy = RetryPolicy(deadline=10, base=0.5, cap=60)
+    # Ошибки прокси и токена повторяются сразу
+    assert policy.backoff(Failure.PROXY, 3, Reply(407, '')) == 0
+
+    for attempt in range(1, 6):
+        delay = policy.backoff(Failure.SERVER, attempt, Reply(503, ''))
+        assert 1.0 <= delay <= min(60, 1.0 * 2 ** attempt)
+
+
+def test_backoff_retry_after():
+    policy = RetryPolicy(deadline=10, base=0.5, cap=60)
+    assert policy.backoff(Failure.RATE_LIMIT, 1, Reply(429, {}, headers={'retry-after': '30'})) >= 30
+    assert policy.backoff(Failure.RATE_LIMIT, 1, Reply(429, {}, headers={'retry-after': '3600'})) == 60
+
+
+def test_retry_queue_attempts():
+    queue = RetryQueue(attempts=3, base=1)
+    assert queue.schedule('a', 1) is not None
+    assert queue.schedule('a', 2) is not None
+    assert queue.schedule('a', 3) is None
+    assert len(queue) == 2